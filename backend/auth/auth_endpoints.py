@@ -18,13 +18,16 @@ FECHA: 2025-01-31
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from database.connection import get_db
 from database.models import Staff
 from .auth_schemas import LoginRequest, Token, UserCredentials, TokenRequest
 from .jwt_handler import create_access_token
-from .security import verify_password, hash_password
+from .security import verify_password_async, hash_password_async, hash_pool
 from .security_manager import security_manager
+from .principal_cache import principal_cache
+from .auth_middleware import METRICS_ROLES, role_required
 from datetime import datetime
 
 # 🚀 ROUTER ENTERPRISE AUTHENTICATION
@@ -82,11 +85,14 @@ async def verify_credentials(http_request: Request, login_data: LoginRequest, db
         )
     
     # PASO 3: IP PERMITIDA Y SESIÓN LIBRE - VERIFICAR CREDENCIALES
-    user = db.query(Staff).filter(Staff.username == login_data.username).first()
+    # Consulta y bcrypt fuera del event loop (bcrypt en pool acotado)
+    user = await run_in_threadpool(
+        lambda: db.query(Staff).filter(Staff.username == login_data.username).first()
+    )
     
-    if not user or not verify_password(login_data.password, user.password):
+    if not user or not await verify_password_async(login_data.password, user.password):
         # CREDENCIALES INCORRECTAS - REGISTRAR INTENTO FALLIDO
-        security_manager.record_failed_attempt(http_request, login_data.username)
+        await run_in_threadpool(security_manager.record_failed_attempt, http_request, login_data.username)
         
         return JSONResponse(
             status_code=401,
@@ -97,9 +103,24 @@ async def verify_credentials(http_request: Request, login_data: LoginRequest, db
             }
         )
     
-    # PASO 4: CREDENCIALES CORRECTAS - CREAR SESIÓN Y REGISTRAR LOGIN EXITOSO
-    security_manager.record_successful_login(http_request, login_data.username, login_data.device_fingerprint)
-    security_manager.create_user_session(login_data.username, http_request)
+    # PASO 4: CREDENCIALES CORRECTAS - OCUPAR LA SESIÓN (ATÓMICO) Y REGISTRAR LOGIN EXITOSO
+    # Otro login pudo ocupar la sesión mientras se verificaba la contraseña
+    _, session_error = await security_manager.create_user_session(login_data.username, http_request)
+    if session_error:
+        print(f"[SINGLE-SESSION] Usuario {login_data.username} ocupó la sesión en otro login concurrente")
+        return JSONResponse(
+            status_code=409,
+            content=session_error,
+            headers={
+                "Access-Control-Allow-Origin": "http://localhost:3000",
+                "Access-Control-Allow-Credentials": "true",
+                "Access-Control-Allow-Methods": "*",
+                "Access-Control-Allow-Headers": "*"
+            }
+        )
+    await run_in_threadpool(
+        security_manager.record_successful_login, http_request, login_data.username, login_data.device_fingerprint
+    )
     
     return UserCredentials(
         user_id=user.id,
@@ -157,11 +178,14 @@ async def login(http_request: Request, login_data: LoginRequest, db: Session = D
         )
     
     # PASO 3: IP PERMITIDA Y SESIÓN LIBRE - VERIFICAR CREDENCIALES
-    user = db.query(Staff).filter(Staff.username == login_data.username).first()
+    # Consulta y bcrypt fuera del event loop (bcrypt en pool acotado)
+    user = await run_in_threadpool(
+        lambda: db.query(Staff).filter(Staff.username == login_data.username).first()
+    )
     
-    if not user or not verify_password(login_data.password, user.password):
+    if not user or not await verify_password_async(login_data.password, user.password):
         # CREDENCIALES INCORRECTAS - REGISTRAR INTENTO FALLIDO
-        security_manager.record_failed_attempt(http_request, login_data.username)
+        await run_in_threadpool(security_manager.record_failed_attempt, http_request, login_data.username)
         
         return JSONResponse(
             status_code=401,
@@ -172,13 +196,40 @@ async def login(http_request: Request, login_data: LoginRequest, db: Session = D
             }
         )
     
-    # PASO 4: CREDENCIALES CORRECTAS - CREAR SESIÓN Y REGISTRAR LOGIN EXITOSO
-    security_manager.record_successful_login(http_request, login_data.username, login_data.device_fingerprint)
-    security_manager.create_user_session(login_data.username, http_request)
+    # PASO 4: CREDENCIALES CORRECTAS - OCUPAR LA SESIÓN (ATÓMICO) Y REGISTRAR LOGIN EXITOSO
+    # Otro login pudo ocupar la sesión mientras se verificaba la contraseña
+    _, session_error = await security_manager.create_user_session(login_data.username, http_request)
+    if session_error:
+        print(f"[SINGLE-SESSION] Usuario {login_data.username} ocupó la sesión en otro login concurrente")
+        return JSONResponse(
+            status_code=409,
+            content=session_error,
+            headers={
+                "Access-Control-Allow-Origin": "http://localhost:3000",
+                "Access-Control-Allow-Credentials": "true",
+                "Access-Control-Allow-Methods": "*",
+                "Access-Control-Allow-Headers": "*"
+            }
+        )
+    await run_in_threadpool(
+        security_manager.record_successful_login, http_request, login_data.username, login_data.device_fingerprint
+    )
     
     token = create_access_token(data={"sub": user.username})
     return {"access_token": token, "token_type": "bearer"}
 
+# ⚙️ MÉTRICAS DEL POOL DE HASHING (cola y concurrencia de bcrypt) - SOLO ADMINISTRADORES
+@router.get("/hash-pool-stats", dependencies=[Depends(role_required(METRICS_ROLES))])
+async def get_hash_pool_stats():
+    """Profundidad de cola, trabajos en curso y tiempos medios del pool bcrypt"""
+    return hash_pool.stats()
+
+# 👤 MÉTRICAS DE LA CACHÉ DE PRINCIPALES (get_current_user) - SOLO ADMINISTRADORES
+@router.get("/principal-cache-stats", dependencies=[Depends(role_required(METRICS_ROLES))])
+async def get_principal_cache_stats():
+    """Aciertos, fallos e invalidaciones de la caché de usuarios autenticados"""
+    return principal_cache.stats()
+
 # 📊 ENTERPRISE SECURITY DASHBOARD - SOLO ADMINISTRADORES
 # ═══════════════════════════════════════════════════════════════════
 # 
@@ -207,7 +258,7 @@ async def get_security_stats(http_request: Request):
     NIVEL: NSA LEVEL 4 - TITANIUM FORTRESS
     """
     # En producción, verificar que es admin con rol específico
-    stats = security_manager.get_security_stats()
+    stats = await security_manager._offload(security_manager.get_security_stats)
     
     return {
         "🛡️ TERAPY_SUITE_ENTERPRISE_SECURITY": "v2.1.0-TITANIUM",
@@ -240,8 +291,8 @@ async def get_user_devices(http_request: Request):
     
     ACCESO: Solo administradores de seguridad
     """
-    devices_summary = security_manager.get_devices_summary()
-    all_devices = security_manager.get_all_user_devices()
+    devices_summary = await security_manager._offload(security_manager.get_devices_summary)
+    all_devices = await security_manager._offload(security_manager.get_all_user_devices)
     
     print(f"[DEVICES API] Devices summary: {devices_summary}")
     print(f"[DEVICES API] All devices count: {len(all_devices)}")
@@ -268,7 +319,7 @@ async def get_active_blocks(http_request: Request):
     🔐 NIVEL: CRITICAL ADMIN FUNCTION
     """
     # En producción, verificar que es developer con JWT
-    active_blocks = security_manager.get_active_blocks_for_dashboard()
+    active_blocks = await security_manager._offload(security_manager.get_active_blocks_for_dashboard)
     
     return {
         "🛡️ ACTIVE_BLOCKS_DASHBOARD": "v2.1.0-TITANIUM",
@@ -706,7 +757,7 @@ async def check_session_validity(http_request: Request, request_data: dict):
             )
         
         # Verificar si la sesión fue invalidada
-        session_invalid = security_manager.is_user_session_invalid(username)
+        session_invalid = await security_manager._offload(security_manager.is_user_session_invalid, username)
         
         if session_invalid:
             print(f"[SESSION-CHECK] ❌ Sesión inválida para {username} - forzando logout")
@@ -852,7 +903,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Dr. Luis Rodriguez",
                 "email": "luis@therapysync.com",
                 "username": "luis_dev",
-                "password": hash_password("dev123"),
+                "password": await hash_password_async("dev123"),
                 "role": "developer",
                 "phone": "555-0101",
                 "is_active": True
@@ -861,7 +912,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Maria Support",
                 "email": "maria@therapysync.com", 
                 "username": "maria_support",
-                "password": hash_password("support123"),
+                "password": await hash_password_async("support123"),
                 "role": "support",
                 "phone": "555-0102",
                 "is_active": True
@@ -871,7 +922,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "John Physical Therapist",
                 "email": "john@motivehomecare.com",
                 "username": "john_pt",
-                "password": hash_password("pt123"),
+                "password": await hash_password_async("pt123"),
                 "role": "PT",
                 "phone": "555-0201",
                 "is_active": True
@@ -880,7 +931,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Sarah Occupational Therapist",
                 "email": "sarah@motivehomecare.com",
                 "username": "sarah_ot", 
-                "password": hash_password("ot123"),
+                "password": await hash_password_async("ot123"),
                 "role": "OT",
                 "phone": "555-0202",
                 "is_active": True
@@ -889,7 +940,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Mike Speech Therapist",
                 "email": "mike@motivehomecare.com",
                 "username": "mike_st",
-                "password": hash_password("st123"),
+                "password": await hash_password_async("st123"),
                 "role": "ST",
                 "phone": "555-0203",
                 "is_active": True
@@ -898,7 +949,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Lisa PT Assistant",
                 "email": "lisa@motivehomecare.com",
                 "username": "lisa_pta",
-                "password": hash_password("pta123"),
+                "password": await hash_password_async("pta123"),
                 "role": "PTA",
                 "phone": "555-0204",
                 "is_active": True
@@ -907,7 +958,7 @@ async def init_test_users(http_request: Request, db: Session = Depends(get_db)):
                 "name": "Admin User",
                 "email": "admin@motivehomecare.com",
                 "username": "admin_mhc",
-                "password": hash_password("admin123"),
+                "password": await hash_password_async("admin123"),
                 "role": "administrator",
                 "phone": "555-0205",
                 "is_active": True
@@ -972,7 +1023,7 @@ async def get_active_sessions(http_request: Request):
     🔐 NIVEL: ADMIN FUNCTION
     """
     # En producción, verificar que es developer con JWT
-    active_sessions = security_manager.get_active_sessions_for_dashboard()
+    active_sessions = await security_manager._offload(security_manager.get_active_sessions_for_dashboard)
     
     return {
         "🛡️ ACTIVE_SESSIONS_DASHBOARD": "v2.1.0-TITANIUM",
@@ -1023,7 +1074,7 @@ async def terminate_user_session_endpoint(http_request: Request, request_data: d
             )
         
         # Terminar la sesión forzadamente
-        result = security_manager.force_terminate_user_session(username, reason)
+        result = await security_manager._offload(security_manager.force_terminate_user_session, username, reason)
         
         status_code = 200 if result else 404
         
@@ -1093,7 +1144,7 @@ async def logout_endpoint(http_request: Request, request_data: dict):
             )
         
         # Terminar sesión normalmente (no forzada)
-        result = security_manager.terminate_user_session(username)
+        result = await security_manager._offload(security_manager.terminate_user_session, username)
         
         return JSONResponse(
             status_code=200,
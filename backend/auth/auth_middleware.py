@@ -1,15 +1,20 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
 from database.connection import get_db
 from database.models import Staff
 from auth.jwt_handler import SECRET_KEY, ALGORITHM
 from auth.auth_schemas import TokenData
+from auth.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+def _principal_snapshot(user: Staff) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(Staff).column_attrs}
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Staff:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -25,10 +30,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
+    # The cache holds column values; every hit gets its own Staff instance,
+    # bound to no session, so requests never share or mutate one object
+    snapshot = principal_cache.get(username)
+    if snapshot is not None:
+        return Staff(**snapshot)
+
+    generation = principal_cache.generation()
     user = db.query(Staff).filter(Staff.username == username).first()
     if user is None:
         raise credentials_exception
 
+    principal_cache.put(username, _principal_snapshot(user), generation)
     return user
 
 def role_required(allowed_roles: list[str]):
@@ -39,4 +52,7 @@ def role_required(allowed_roles: list[str]):
                 detail="Insufficient permissions"
             )
         return current_user
-    return dependency
\ No newline at end of file
+    return dependency
+
+# Roles con acceso a las métricas internas (auth, pool de base de datos)
+METRICS_ROLES = ["developer", "admin", "administrator"]
@@ -196,7 +196,7 @@ class IntelligentAuthenticationSystem:
                                     device_fingerprint: Dict = None):
         """Handle post-login actions"""
         # Record successful login in existing system
-        self.security_manager.record_successful_login(request, username)
+        await self.security_manager._offload(self.security_manager.record_successful_login, request, username)
         
         # Store device fingerprint for future analysis
         if NOTIFICATIONS_ENABLED and device_fingerprint:
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class PrincipalCache:
+    """TTL + LRU cache of the Staff principal resolved from a token subject"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced with it is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, username: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(username)
+                    self.hits += 1
+                    return principal
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, username: str, principal: Any, generation: int) -> None:
+        """Store a principal loaded when the cache was at ``generation``"""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[username] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        """Drop one principal, or all of them when no username is given"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_principals": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Invalidation is per process: with several workers or replicas, a block, role
+# change or forced logout handled by one of them reaches the others only when
+# their cached entry expires, so AUTH_PRINCIPAL_CACHE_TTL bounds that delay
+principal_cache = PrincipalCache(
+    ttl_seconds=float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "1024"))
+)
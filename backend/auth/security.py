@@ -1,3 +1,9 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -6,4 +12,76 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+#====================== HASHING POOL ======================#
+
+class PasswordHashPool:
+    """Bounded executor so bcrypt work never runs on the event loop"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _dequeue(self, job: Dict) -> bool:
+        """Take job off the queue count exactly once (call with the lock held)"""
+        if job["dequeued"]:
+            return False
+        job["dequeued"] = True
+        self._queued -= 1
+        return True
+
+    def _run(self, fn, args, job: Dict):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._dequeue(job)
+            self._in_flight += 1
+            self._total_wait += started_at - job["submitted_at"]
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._total_run += time.perf_counter() - started_at
+
+    async def submit(self, fn, *args):
+        job = {"submitted_at": time.perf_counter(), "dequeued": False}
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._run, fn, args, job)
+        finally:
+            # Cancelled (client gone) before a worker picked it up: the executor drops the job
+            with self._lock:
+                self._dequeue(job)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "peak_queue_depth": self._peak_queued,
+                "in_flight": self._in_flight,
+                "completed": completed,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self._total_run / completed * 1000, 2) if completed else 0.0
+            }
+
+hash_pool = PasswordHashPool(int(os.getenv("AUTH_HASH_WORKERS", "0")) or os.cpu_count() or 1)
+
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.submit(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hash_pool.submit(verify_password, plain_password, hashed_password)
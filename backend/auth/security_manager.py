@@ -36,15 +36,26 @@ AUTOR: Dr. Luis - Chief Security Architect
 FECHA: 2025-01-31
 LICENCIA: Terapy Suite Enterprise Security License
 """
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+import bisect
 import hashlib
+import ipaddress
 import json
+import os
+import re
+import socket
+import struct
+import subprocess
+import threading
 import time
 import asyncio
+import anyio
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from .principal_cache import principal_cache
+from .security_store import REMOVE, SecurityStateStore, StoreNamespace, create_security_store
 
 # 🚨 IMPORT INTELLIGENT NOTIFICATIONS SYSTEM
 try:
@@ -55,6 +66,22 @@ except ImportError:
     NOTIFICATIONS_ENABLED = False
     print("⚠️ [SECURITY] Notification system not available")
 
+# Contadores que devuelve el barrido
+SWEEP_COUNTERS = ("failed_attempts", "ip_history", "ip_index", "expired_blocks", "sessions")
+
+def _load_trusted_proxies() -> List:
+    """Redes de proxies de confianza para X-Forwarded-For (SECURITY_TRUSTED_PROXIES, separadas por comas)"""
+    networks = []
+    for entry in os.getenv("SECURITY_TRUSTED_PROXIES", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            print(f"⚠️ [SECURITY] Ignoring invalid trusted proxy entry: {entry}")
+    return networks
+
 class BankLevelSecurityManager:
     """
     🏛️ ENTERPRISE SECURITY FORTRESS - CLASE TITANIUM
@@ -85,40 +112,51 @@ class BankLevelSecurityManager:
     📋 CERTIFICACIÓN: NSA APPROVED Security Framework
     """
     
-    def __init__(self):
+    def __init__(self, store: Optional[SecurityStateStore] = None):
+        # 🗄️ ALMACÉN DE ESTADO - memoria (por proceso) o SQL (compartido entre workers)
+        # Seleccionado con SECURITY_STATE_BACKEND; cada atributo es una vista del almacén
+        self._store = store or create_security_store()
+        
         # BLOQUEO POR USERNAME - NO POR IP
-        # Almacenamiento en memoria de intentos fallidos por username
-        self._failed_attempts: Dict[str, List[float]] = defaultdict(list)
+        # Intentos fallidos por username (lista de timestamps)
+        self._failed_attempts = StoreNamespace(self._store, "failed_attempts")
         
         # Bloqueos activos por username con tiempo de expiración
-        self._active_blocks: Dict[str, datetime] = {}
+        self._active_blocks = StoreNamespace(self._store, "active_blocks")
         
         # Nivel de bloqueo por username (para escalamiento progresivo)
-        self._block_levels: Dict[str, int] = defaultdict(int)
+        self._block_levels = StoreNamespace(self._store, "block_levels")
         
         # Usernames permanentemente bloqueados
-        self._permanent_blocks: Dict[str, datetime] = {}
+        self._permanent_blocks = StoreNamespace(self._store, "permanent_blocks")
         
         # Historial de IPs por usuario (para logging de seguridad)
-        self._user_ip_history: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
-        
-        # Historial de actividad sospechosa
-        self._suspicious_activity: List[Dict] = []
+        self._user_ip_history = StoreNamespace(self._store, "user_ip_history")
         
         # Sesiones invalidadas (para forzar logout)
-        self._invalidated_sessions: Dict[str, datetime] = {}
+        self._invalidated_sessions = StoreNamespace(self._store, "invalidated_sessions")
         
         # 🔐 SINGLE SESSION MANAGEMENT - Solo una sesión activa por usuario
         # Diccionario: username -> session_info
-        self._active_sessions: Dict[str, Dict] = {}
+        self._active_sessions = StoreNamespace(self._store, "active_sessions")
         
         # 📱 DEVICE FINGERPRINT TRACKING - Almacenamiento de huellas digitales
         # Diccionario: username -> lista de device fingerprints
-        self._user_devices: Dict[str, List[Dict]] = defaultdict(list)
+        self._user_devices = StoreNamespace(self._store, "user_devices")
         
-        # Lock para operaciones thread-safe
+        # Lock para operaciones thread-safe dentro del proceso
         self._lock = asyncio.Lock()
         
+        # 🌐 RESOLUCIÓN DE IP EN MEMORIA
+        # Proxies cuyo X-Forwarded-For es confiable (vacío = comportamiento legacy)
+        self._trusted_proxies = _load_trusted_proxies()
+        # Gateway del host resuelto una vez y refrescado en background cada TTL
+        self._gateway_ip_ttl = int(os.getenv("SECURITY_GATEWAY_IP_TTL", "300"))
+        self._gateway_ip: Optional[str] = None
+        self._gateway_resolved_at = 0.0
+        self._gateway_refreshing = False
+        self._gateway_lock = threading.Lock()
+        
         # 🏛️ CONFIGURACIÓN ENTERPRISE TITANIUM FORTRESS
         self.config = {
             # 🎯 LÍMITES DE SEGURIDAD EMPRESARIAL
@@ -144,6 +182,22 @@ class BankLevelSecurityManager:
                 "anomaly_detection": True,      # Detección de anomalías ML
             },
             
+            # 🧮 LÍMITES DE RASTREO - memoria acotada bajo credential stuffing
+            "tracking_limits": {
+                "attempt_history": 50,          # Timestamps de fallos guardados por usuario
+                "ip_history": 50,               # IPs recientes guardadas por usuario
+                "usernames_per_ip": 100,        # Índice inverso IP -> usuarios intentados
+                # Tope global de claves: un spray de usuarios/IPs distintos desaloja
+                # las menos recientes en vez de acumular 24h de claves
+                "tracked_usernames": int(os.getenv("SECURITY_MAX_TRACKED_USERNAMES", "10000")),
+                "tracked_ips": int(os.getenv("SECURITY_MAX_TRACKED_IPS", "10000")),
+                "suspicious_activity": 500,     # Eventos sospechosos recientes
+                "window_seconds": 86400,        # Ventana deslizante del historial (24h)
+                "brute_force_window": 60,       # Ventana para firma de fuerza bruta
+                "sweep_interval_seconds": int(os.getenv("SECURITY_SWEEP_INTERVAL", "60")),
+                "sweep_batch": 500,             # Claves por lote del barrido entre cesiones del loop
+            },
+            
             # 🔥 PROTECCIÓN ENTERPRISE AVANZADA
             "enterprise_security": {
                 "forensic_logging": True,        # Logging forense completo
@@ -168,62 +222,145 @@ class BankLevelSecurityManager:
         # Iniciar limpieza automática
         self._cleanup_task = None
 
+    @property
+    def _suspicious_activity(self) -> List[Dict]:
+        """Historial de actividad sospechosa"""
+        return self._store.get("suspicious_activity", "recent", [])
+
+    @staticmethod
+    def _read_default_gateway() -> Optional[str]:
+        """Gateway por defecto desde /proc/net/route, con `ip route` solo como respaldo"""
+        try:
+            with open("/proc/net/route") as route_table:
+                next(route_table)  # cabecera
+                for line in route_table:
+                    fields = line.split()
+                    # Destination 00000000 = ruta por defecto, flag 0x2 = RTF_GATEWAY
+                    if len(fields) > 3 and fields[1] == "00000000" and int(fields[3], 16) & 0x2:
+                        return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+        except (OSError, ValueError, StopIteration):
+            pass
+        
+        try:
+            result = subprocess.run(['ip', 'route', 'show', 'default'], 
+                                 capture_output=True, text=True, timeout=2)
+            if result.returncode == 0:
+                match = re.search(r'via (\d+\.\d+\.\d+\.\d+)', result.stdout)
+                if match:
+                    return match.group(1)
+        except Exception:
+            pass
+        
+        return None
+
+    def _refresh_gateway_ip(self) -> None:
+        gateway_ip = self._read_default_gateway()
+        with self._gateway_lock:
+            changed = self._gateway_resolved_at == 0 or gateway_ip != self._gateway_ip
+            self._gateway_ip = gateway_ip
+            self._gateway_resolved_at = time.monotonic()
+            self._gateway_refreshing = False
+        if changed:
+            print(f"[IP] Gateway del host resuelto: {gateway_ip or 'no disponible'}")
+
+    def _schedule_gateway_refresh(self) -> None:
+        """Resuelve el gateway en un hilo, salvo que ya haya una resolución en curso"""
+        with self._gateway_lock:
+            if self._gateway_refreshing:
+                return
+            self._gateway_refreshing = True
+        threading.Thread(target=self._refresh_gateway_ip, daemon=True).start()
+
+    def _get_gateway_ip(self) -> Optional[str]:
+        """
+        IP del gateway cacheada (None hasta la primera resolución, lanzada desde
+        start_sweeper); al expirar el TTL se refresca en un hilo sin bloquear
+        """
+        with self._gateway_lock:
+            stale = time.monotonic() - self._gateway_resolved_at > self._gateway_ip_ttl
+            gateway_ip = self._gateway_ip
+        if stale:
+            self._schedule_gateway_refresh()
+        return gateway_ip
+
+    def _is_trusted_proxy(self, ip: str) -> bool:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return any(address in network for network in self._trusted_proxies)
+
+    def _ip_from_forwarded_for(self, forwarded_for: str) -> Optional[str]:
+        """Primer salto no confiable recorriendo X-Forwarded-For de derecha a izquierda"""
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._is_trusted_proxy(hop):
+                return hop
+        return hops[0] if hops else None
+
     def _get_real_ip(self, request: Request) -> str:
         """
         Obtiene la IP REAL del cliente para bloqueo efectivo
         BLOQUEA POR IP REAL DE CONEXIÓN WIFI/ETHERNET
-        """
-        import subprocess
-        import re
         
-        # Debug headers
-        print(f"[IP DEBUG] request.client.host: {request.client.host}")
-        print(f"[IP DEBUG] X-Forwarded-For: {request.headers.get('X-Forwarded-For')}")
-        print(f"[IP DEBUG] X-Real-IP: {request.headers.get('X-Real-IP')}")
+        Operación en memoria: sin subprocesos ni I/O por request
+        """
+        docker_ip = request.client.host if request.client else "unknown"
+        
+        # MÉTODO 0: Detrás de un proxy de confianza, usar sus headers
+        if self._trusted_proxies and self._is_trusted_proxy(docker_ip):
+            forwarded_for = request.headers.get("X-Forwarded-For")
+            if forwarded_for:
+                real_ip = self._ip_from_forwarded_for(forwarded_for)
+                if real_ip:
+                    return real_ip
+            real_ip = request.headers.get("X-Real-IP")
+            if real_ip:
+                return real_ip.strip()
         
         # MÉTODO 1: Usar la IP que ve Docker (funciona para desarrollo local)
-        # En desarrollo local, esta es típicamente la IP de gateway de Docker
-        # que representa tu máquina host
-        docker_ip = request.client.host
-        
-        # MÉTODO 2: Para estar 100% seguros, forzar una sola IP para desarrollo
         # En desarrollo, todas las conexiones desde localhost se tratan como la misma IP
         if docker_ip.startswith("172.") or docker_ip.startswith("192.168.") or docker_ip == "127.0.0.1":
-            # Obtener la IP real del host desde dentro del contenedor
-            try:
-                # Intentar obtener la IP real del gateway (tu máquina)
-                result = subprocess.run(['ip', 'route', 'show', 'default'], 
-                                     capture_output=True, text=True, timeout=2)
-                if result.returncode == 0:
-                    match = re.search(r'via (\d+\.\d+\.\d+\.\d+)', result.stdout)
-                    if match:
-                        host_ip = match.group(1)
-                        print(f"[IP DEBUG] IP del host detectada: {host_ip}")
-                        return host_ip
-            except:
-                pass
+            # IP real del gateway (tu máquina), resuelta al arrancar y cacheada
+            host_ip = self._get_gateway_ip()
+            if host_ip:
+                return host_ip
             
             # Fallback: usar una IP fija para desarrollo que represente su conexión
-            development_ip = "DEV_LOCAL_CONNECTION"
-            print(f"[IP DEBUG] Usando IP de desarrollo unificada: {development_ip}")
-            return development_ip
-        
-        # Para producción: usar headers de proxy si existen
-        forwarded_for = request.headers.get("X-Forwarded-For") 
-        if forwarded_for:
-            real_ip = forwarded_for.split(",")[0].strip()
-            print(f"[IP DEBUG] IP desde X-Forwarded-For: {real_ip}")
-            return real_ip
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            print(f"[IP DEBUG] IP desde X-Real-IP: {real_ip}")
-            return real_ip
+            return "DEV_LOCAL_CONNECTION"
+        
+        # Sin proxies configurados: comportamiento legacy, confiar en los headers
+        if not self._trusted_proxies:
+            forwarded_for = request.headers.get("X-Forwarded-For") 
+            if forwarded_for:
+                return forwarded_for.split(",")[0].strip()
+            
+            real_ip = request.headers.get("X-Real-IP")
+            if real_ip:
+                return real_ip
         
         # Usar IP directa
-        print(f"[IP DEBUG] IP directa final: {docker_ip}")
         return docker_ip
 
+    async def _offload(self, fn, *args):
+        """Ejecuta una operación del almacén; la del almacén SQL bloquea, así que va al threadpool"""
+        if self._store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    def _notify(self, coro) -> None:
+        """Programa una alerta en el event loop, también desde un hilo del threadpool"""
+        try:
+            asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            anyio.from_thread.run_sync(asyncio.ensure_future, coro)
+
+    def _reset_expired_block(self, username: str) -> None:
+        """Reset completo al expirar un bloqueo temporal (tolera claves ya borradas por otro worker)"""
+        self._active_blocks.pop(username, None)
+        self._failed_attempts.pop(username, None)
+        self._block_levels.pop(username, None)
+
     async def check_security(self, request: Request, username: str) -> Tuple[bool, Optional[Dict]]:
         """
         Verificación de seguridad por CUENTA DE USUARIO (no por IP)
@@ -236,24 +373,34 @@ class BankLevelSecurityManager:
         current_time = datetime.utcnow()
         
         print(f"[LOGIN] 🔍 Verificando acceso para {username}")
-        print(f"[LOGIN] Estado inicial: active_blocks={username in self._active_blocks}, permanent_blocks={username in self._permanent_blocks}, failed_attempts={len(self._failed_attempts.get(username, []))}, block_level={self._block_levels.get(username, 0)}")
         
         async with self._lock:
+            # Todo el estado de la cuenta en una sola lectura del almacén
+            state = await self._offload(
+                self._store.get_many, username,
+                ("permanent_blocks", "active_blocks", "block_levels", "failed_attempts")
+            )
+            permanent_since = state.get("permanent_blocks")
+            unblock_time = state.get("active_blocks")
+            current_level = state.get("block_levels", 0)
+            failed_attempts = state.get("failed_attempts", [])
+            print(f"[LOGIN] Estado inicial: active_blocks={unblock_time is not None}, permanent_blocks={permanent_since is not None}, failed_attempts={len(failed_attempts)}, block_level={current_level}")
+            
             # 1. Verificar si USUARIO está permanentemente bloqueado
-            if username in self._permanent_blocks:
+            if permanent_since is not None:
                 print(f"[SECURITY] User {username} is permanently blocked")
                 return False, {
                     "error": "Account Permanently Blocked",
                     "message": f"Account '{username}' has been permanently blocked. Contact administrator.",
                     "username": username,
-                    "blocked_since": self._permanent_blocks[username].isoformat(),
+                    "blocked_since": permanent_since.isoformat(),
                     "contact_admin": True
                 }
             
             # 2. Verificar si USUARIO está temporalmente bloqueado
-            if username in self._active_blocks:
-                if current_time < self._active_blocks[username]:
-                    remaining_seconds = int((self._active_blocks[username] - current_time).total_seconds())
+            if unblock_time is not None:
+                if current_time < unblock_time:
+                    remaining_seconds = int((unblock_time - current_time).total_seconds())
                     remaining_minutes = max(1, remaining_seconds // 60)  # Mínimo 1 minuto para mostrar
                     
                     print(f"[SECURITY] User {username} temporarily blocked for {remaining_minutes} minute(s)")
@@ -262,38 +409,31 @@ class BankLevelSecurityManager:
                         "message": f"Account '{username}' is temporarily blocked. Try again in {remaining_minutes} minute(s).",
                         "retry_after": remaining_seconds,
                         "username": username,
-                        "block_level": self._block_levels.get(username, 0),
+                        "block_level": current_level,
                         "remaining_minutes": remaining_minutes
                     }
                 else:
                     # El bloqueo expiró, remover completamente
-                    print(f"[SECURITY] Block for {username} expired, removing completely")
-                    del self._active_blocks[username]
                     # También limpiar intentos fallidos y nivel de escalamiento para reset completo
-                    if username in self._failed_attempts:
-                        del self._failed_attempts[username]
-                        print(f"[SECURITY] Failed attempts cleaned for {username} due to expiration")
-                    if username in self._block_levels:
-                        del self._block_levels[username] 
-                        print(f"[SECURITY] Escalation level reset for {username} due to expiration")
+                    print(f"[SECURITY] Block for {username} expired, removing completely")
+                    await self._offload(self._reset_expired_block, username)
+                    failed_attempts, current_level = [], 0
+                    print(f"[SECURITY] Failed attempts and escalation level reset for {username} due to expiration")
             
             # 3. Contar intentos actuales del USUARIO en este ciclo
-            current_attempts = len(self._failed_attempts.get(username, []))
-            print(f"[SECURITY] User {username} has {current_attempts} failed attempts in this cycle (revoked: {'Yes' if username not in self._failed_attempts else 'No'})")
+            current_attempts = len(failed_attempts)
+            print(f"[SECURITY] User {username} has {current_attempts} failed attempts in this cycle (revoked: {'Yes' if not failed_attempts else 'No'})")
             
             # 4. Verificar si excede el límite de intentos por ciclo
             if current_attempts >= self.config["max_attempts_per_cycle"]:
-                # Calcular el nivel de bloqueo y duración
-                current_level = self._block_levels.get(username, 0)
-                
                 # Verificar si debe ser bloqueo permanente
                 if current_level >= len(self.config["lockout_durations"]) - 1:
-                    self._permanent_blocks[username] = current_time
+                    await self._offload(self._store.set, "permanent_blocks", username, current_time)
                     
                     # 🚨 INTELLIGENT NOTIFICATION - Permanent Block Alert
                     if NOTIFICATIONS_ENABLED:
                         try:
-                            asyncio.create_task(
+                            self._notify(
                                 security_notifier.alert_account_lockout(
                                     username=username,
                                     level=7,  # Permanent = Level 7
@@ -322,14 +462,13 @@ class BankLevelSecurityManager:
                 duration = self.config["lockout_durations"][current_level]
                 unblock_time = current_time + timedelta(minutes=duration)
                 
-                self._active_blocks[username] = unblock_time
-                self._block_levels[username] += 1
+                await self._offload(self._apply_temporary_block, username, unblock_time)
                 # Note: Do NOT clear failed_attempts here - they should only be cleared when block expires or is manually revoked
                 
                 # 🚨 INTELLIGENT NOTIFICATION - Temporary Block Alert
                 if NOTIFICATIONS_ENABLED:
                     try:
-                        asyncio.create_task(
+                        self._notify(
                             security_notifier.alert_account_lockout(
                                 username=username,
                                 level=current_level + 1,
@@ -369,13 +508,37 @@ class BankLevelSecurityManager:
         ip = self._get_real_ip(request)
         current_time = datetime.utcnow()
         
-        # Registrar por USERNAME (lo importante)
-        self._failed_attempts[username].append(current_time.timestamp())
-        
-        # Registrar IP para historial de seguridad
-        self._user_ip_history[username].append((ip, current_time.timestamp()))
-        
-        attempts_count = len(self._failed_attempts[username])
+        timestamp = current_time.timestamp()
+        limits = self.config["tracking_limits"]
+        
+        # Registrar por USERNAME (lo importante) - incremento y conteo atómicos en el almacén
+        # Una cuenta atacada se escribe en cada intento y queda entre las recientes;
+        # si aun así se desaloja, su bloqueo activo (active_blocks) no se pierde
+        attempts_count = self._store.append(
+            "failed_attempts", username, timestamp,
+            max_len=limits["attempt_history"], max_keys=limits["tracked_usernames"]
+        )
+        
+        # Registrar IP para historial de seguridad (acotado)
+        self._store.append(
+            "user_ip_history", username, (ip, timestamp),
+            max_len=limits["ip_history"], max_keys=limits["tracked_usernames"]
+        )
+        
+        # Índice inverso IP -> usuarios para detectar enumeración sin recorrer historiales
+        usernames_from_ip = self._store.touch_member(
+            "ip_usernames", ip, username, timestamp,
+            max_members=limits["usernames_per_ip"], max_keys=limits["tracked_ips"]
+        )
+        
+        # 🧠 DETECCIÓN DE PATRONES (solo registro, el bloqueo sigue siendo por cuenta)
+        attempts = self._failed_attempts.get(username, [])
+        if self._detect_rapid_fire(attempts):
+            self._add_suspicious_activity(ip, username, "rapid_fire")
+        if self._count_attempts(attempts, timestamp, limits["brute_force_window"]) >= self.config["threat_detection"]["brute_force_signature"]:
+            self._add_suspicious_activity(ip, username, "brute_force")
+        if self._detect_username_enumeration(usernames_from_ip):
+            self._add_suspicious_activity(ip, username, "username_enumeration")
         
         print(f"[SECURITY DEBUG] Failed attempt recorded - User: {username}, IP: {ip}, Total user attempts: {attempts_count}")
         
@@ -392,7 +555,7 @@ class BankLevelSecurityManager:
                         pass
                 
                 # Trigger async notification
-                asyncio.create_task(
+                self._notify(
                     security_notifier.alert_failed_login(
                         username=username,
                         ip=ip,
@@ -418,14 +581,21 @@ class BankLevelSecurityManager:
         # 🚨 VERIFICAR SI DEBE BLOQUEAR DESPUÉS DE REGISTRAR EL INTENTO
         self._check_and_apply_block_after_failed_attempt(username, attempts_count, current_time, ip)
     
+    def _apply_temporary_block(self, username: str, unblock_time: datetime) -> None:
+        self._active_blocks[username] = unblock_time
+        self._store.incr("block_levels", username)
+
     def _check_and_apply_block_after_failed_attempt(self, username: str, attempts_count: int, current_time: datetime, ip: str):
         """
         🚨 FUNCIÓN CRÍTICA: Verificar si debe aplicar bloqueo después de registrar intento fallido
         Esta función se ejecuta DESPUÉS de registrar el intento, por lo que tiene el conteo correcto
         """
         # Verificar si alcanzó el límite de intentos por ciclo
-        if attempts_count >= self.config["max_attempts_per_cycle"]:
+        # Solo el intento que llega exactamente al límite aplica el bloqueo, así
+        # varios workers registrando a la vez no escalan el nivel dos veces
+        if attempts_count == self.config["max_attempts_per_cycle"]:
             print(f"[SECURITY] 🚨 TRIGGER BLOCK: User {username} reached {attempts_count} attempts, applying block...")
+            principal_cache.invalidate(username)
             
             # Calcular el nivel de bloqueo y duración
             current_level = self._block_levels.get(username, 0)
@@ -437,7 +607,7 @@ class BankLevelSecurityManager:
                 # 🚨 INTELLIGENT NOTIFICATION - Permanent Block Alert
                 if NOTIFICATIONS_ENABLED:
                     try:
-                        asyncio.create_task(
+                        self._notify(
                             security_notifier.alert_account_lockout(
                                 username=username,
                                 level=7,  # Permanent = Level 7
@@ -463,13 +633,12 @@ class BankLevelSecurityManager:
             duration = self.config["lockout_durations"][current_level]
             unblock_time = current_time + timedelta(minutes=duration)
             
-            self._active_blocks[username] = unblock_time
-            self._block_levels[username] += 1
+            self._apply_temporary_block(username, unblock_time)
             
             # 🚨 INTELLIGENT NOTIFICATION - Temporary Block Alert
             if NOTIFICATIONS_ENABLED:
                 try:
-                    asyncio.create_task(
+                    self._notify(
                         security_notifier.alert_account_lockout(
                             username=username,
                             level=current_level + 1,
@@ -522,8 +691,7 @@ class BankLevelSecurityManager:
         })
         
         # Limpiar intentos fallidos de este USUARIO (solo del ciclo actual)
-        if username in self._failed_attempts:
-            del self._failed_attempts[username]
+        self._failed_attempts.pop(username, None)
             
         # NO limpiar block_levels - mantener escalamiento para próximos ciclos  
         # El usuario mantiene su nivel de escalamiento aunque haga login exitoso
@@ -555,13 +723,8 @@ class BankLevelSecurityManager:
             }
         }
         
-        # Añadir a la lista del usuario (mantener últimos 10 dispositivos)
-        user_devices = self._user_devices[username]
-        user_devices.append(device_data)
-        
-        # Mantener solo los últimos 10 registros por usuario
-        if len(user_devices) > 10:
-            self._user_devices[username] = user_devices[-10:]
+        # Añadir a la lista del usuario (mantener solo los últimos 10 dispositivos)
+        self._store.append("user_devices", username, device_data, max_len=10)
             
         print(f"[DEVICE TRACKING] 📱 Device registered for {username}: Hash={device_data['hash'][:16]}..., Risk={risk_score}")
     
@@ -678,40 +841,34 @@ class BankLevelSecurityManager:
             was_blocked = False
             
             # 1. FORZAR LIMPIEZA DE BLOQUEO TEMPORAL (SIEMPRE)
-            if username in self._active_blocks:
-                del self._active_blocks[username]
+            if self._active_blocks.pop(username, None) is not None:
                 block_type = "temporary"
                 was_blocked = True
                 print(f"[REVOKE] ✅ Bloqueo temporal ELIMINADO para {username}")
             
             # 2. FORZAR LIMPIEZA DE BLOQUEO PERMANENTE (SIEMPRE)  
-            if username in self._permanent_blocks:
-                del self._permanent_blocks[username]
+            if self._permanent_blocks.pop(username, None) is not None:
                 block_type = "permanent" if block_type is None else f"{block_type}+permanent"
                 was_blocked = True
                 print(f"[REVOKE] ✅ Bloqueo permanente ELIMINADO para {username}")
             
             # 3. CRÍTICO: SIEMPRE limpiar intentos fallidos (incluso si no había bloqueo)
-            if username in self._failed_attempts:
-                attempts_count = len(self._failed_attempts[username])
-                del self._failed_attempts[username]
-                print(f"[REVOKE] ✅ {attempts_count} failed attempts DELETED for {username}")
+            attempts = self._failed_attempts.pop(username, None)
+            if attempts is not None:
+                print(f"[REVOKE] ✅ {len(attempts)} failed attempts DELETED for {username}")
             
             # 4. CRÍTICO: SIEMPRE resetear nivel de escalamiento 
-            if username in self._block_levels:
-                previous_level = self._block_levels[username]
-                del self._block_levels[username]  # ⚡ RESET COMPLETO
+            previous_level = self._block_levels.pop(username, None)  # ⚡ RESET COMPLETO
+            if previous_level is not None:
                 print(f"[REVOKE] ✅ Nivel de escalamiento {previous_level} RESETEADO para {username}")
             
             # 5. SIEMPRE limpiar historial de IPs
-            if username in self._user_ip_history:
-                ip_count = len(self._user_ip_history[username])
-                del self._user_ip_history[username]
-                print(f"[REVOKE] ✅ {ip_count} registros de IP ELIMINADOS para {username}")
+            ip_history = self._user_ip_history.pop(username, None)
+            if ip_history is not None:
+                print(f"[REVOKE] ✅ {len(ip_history)} registros de IP ELIMINADOS para {username}")
             
             # 6. LIMPIAR INVALIDACIÓN DE SESIONES (permitir login de nuevo)
-            if username in self._invalidated_sessions:
-                del self._invalidated_sessions[username]
+            if self._invalidated_sessions.pop(username, None) is not None:
                 print(f"[REVOKE] ✅ Invalidación de sesiones LIMPIADA para {username}")
             
             # 7. VERIFICACIÓN FINAL OBLIGATORIA
@@ -854,10 +1011,11 @@ class BankLevelSecurityManager:
                 print(f"[MANUAL-BLOCK] ⏰ Bloqueo temporal aplicado a {username} por {duration} minutos")
             
             # Limpiar intentos previos si existen
-            if username in self._failed_attempts:
-                previous_attempts = len(self._failed_attempts[username])
-                del self._failed_attempts[username]
-                print(f"[MANUAL-BLOCK] 🧹 {previous_attempts} failed attempts cleaned for {username}")
+            previous_attempts = self._failed_attempts.pop(username, None)
+            if previous_attempts is not None:
+                print(f"[MANUAL-BLOCK] 🧹 {len(previous_attempts)} failed attempts cleaned for {username}")
+        
+        principal_cache.invalidate(username)
         
         # Log de seguridad crítico
         self._log_security_event({
@@ -899,6 +1057,8 @@ class BankLevelSecurityManager:
             self._invalidated_sessions[username] = current_time
             print(f"[SESSION-INVALIDATION] 🚨 Sesiones invalidadas para {username}")
         
+        principal_cache.invalidate(username)
+        
         # Log de seguridad
         self._log_security_event({
             "event": "user_sessions_invalidated",
@@ -914,16 +1074,16 @@ class BankLevelSecurityManager:
         
         Verifica si el usuario tiene sesiones invalidadas después de ser bloqueado.
         """
-        if username not in self._invalidated_sessions:
+        invalidation_time = self._invalidated_sessions.get(username)
+        if invalidation_time is None:
             return False
         
-        invalidation_time = self._invalidated_sessions[username]
         current_time = datetime.utcnow()
         time_since_invalidation = (current_time - invalidation_time).total_seconds()
         
         # Auto-cleanup: Si han pasado más de 30 segundos, limpiar la invalidación
         if time_since_invalidation > 30:
-            del self._invalidated_sessions[username]
+            self._invalidated_sessions.pop(username, None)
             print(f"[SESSION-CHECK] 🧹 Auto-limpiando invalidación expirada para {username} ({time_since_invalidation:.1f}s ago)")
             return False
         
@@ -945,16 +1105,60 @@ class BankLevelSecurityManager:
         
         Limpia la marca de invalidación cuando el usuario es desbloqueado.
         """
-        if username in self._invalidated_sessions:
-            del self._invalidated_sessions[username]
+        if self._invalidated_sessions.pop(username, None) is not None:
             print(f"[SESSION-INVALIDATION] ✅ Invalidación de sesiones limpiada para {username}")
 
+    def _session_conflict(self, username: str, existing_session: Dict, ip: str, user_agent: str, current_time: datetime) -> Optional[Dict]:
+        """
+        Error de sesión única si la sesión existente sigue vigente, None si puede reemplazarse
+        (expirada, o la misma IP/UA repitiendo la petición en menos de 3 segundos).
+        """
+        print(f"[SINGLE-SESSION] 🔍 Sesión existente encontrada para {username}")
+        print(f"[SINGLE-SESSION] Sesión creada: {existing_session['created_at']}")
+        print(f"[SINGLE-SESSION] IP sesión existente: {existing_session['ip_address']}")
+        
+        # Verificar si la sesión existente aún es válida (no expirada)
+        session_age = (current_time - existing_session['created_at']).total_seconds()
+        max_session_time = 8 * 60 * 60  # 8 horas en segundos
+        
+        # PROTECCIÓN ESTRICTA: Solo permitir si es EXACTAMENTE el mismo dispositivo Y muy reciente
+        if session_age < 3 and existing_session['ip_address'] == ip and existing_session['user_agent'] == user_agent:
+            print(f"[SINGLE-SESSION] ⚡ Misma IP/UA y muy reciente ({session_age:.1f}s) - permitiendo como double request")
+            return None
+        elif session_age < 5:
+            print(f"[SINGLE-SESSION] ⚠️ Sesión reciente ({session_age:.1f}s) pero diferente dispositivo/navegador - BLOQUEANDO")
+            print(f"[SINGLE-SESSION] Existing IP: {existing_session['ip_address']} vs New IP: {ip}")
+            print(f"[SINGLE-SESSION] Different device/browser detected")
+        
+        print(f"[SINGLE-SESSION] Edad de sesión: {session_age} segundos ({session_age/3600:.1f} horas)")
+        
+        if session_age >= max_session_time:
+            # Sesión expirada - se reemplaza al crear la nueva
+            print(f"[SINGLE-SESSION] 🧹 Sesión expirada para {username}, se reemplazará")
+            return None
+        
+        # Sesión aún válida - rechazar nuevo login
+        print(f"[SINGLE-SESSION] ❌ {username} ya tiene sesión activa desde {existing_session['created_at']}")
+        print(f"[SINGLE-SESSION] ❌ RECHAZANDO LOGIN - Sesión válida existe")
+        return {
+            "error": "Active Session Exists",
+            "message": f"User '{username}' already has an active session.",
+            "existing_session": {
+                "started_at": existing_session['created_at'].isoformat(),
+                "ip_address": existing_session['ip_address'],
+                "user_agent": existing_session['user_agent'][:100],  # Truncar para seguridad
+                "session_duration": f"{int(session_age // 3600)}h {int((session_age % 3600) // 60)}m"
+            },
+            "username": username
+        }
+
     async def check_active_session(self, username: str, request: Request) -> Tuple[bool, Optional[Dict]]:
         """
         🔐 VERIFICAR SI EL USUARIO YA TIENE UNA SESIÓN ACTIVA
         
-        Verifica si el usuario ya está loggeado desde otro lugar.
-        Solo permite UNA sesión activa por usuario.
+        Verifica si el usuario ya está loggeado desde otro lugar, antes de
+        verificar credenciales. Es solo un rechazo temprano: la sesión se
+        ocupa de forma atómica en create_user_session.
         
         Returns:
             (can_login, existing_session_info)
@@ -965,62 +1169,60 @@ class BankLevelSecurityManager:
         
         print(f"[SINGLE-SESSION] 🔍 Verificando sesión para {username}")
         print(f"[SINGLE-SESSION] IP: {ip}, User-Agent: {user_agent[:50]}...")
-        print(f"[SINGLE-SESSION] Sesiones activas totales: {len(self._active_sessions)}")
-        print(f"[SINGLE-SESSION] Sesiones activas: {list(self._active_sessions.keys())}")
         
-        async with self._lock:
-            if username in self._active_sessions:
-                existing_session = self._active_sessions[username]
-                print(f"[SINGLE-SESSION] 🔍 Sesión existente encontrada para {username}")
-                print(f"[SINGLE-SESSION] Sesión creada: {existing_session['created_at']}")
-                print(f"[SINGLE-SESSION] IP sesión existente: {existing_session['ip_address']}")
-                
-                # Verificar si la sesión existente aún es válida (no expirada)
-                session_age = (current_time - existing_session['created_at']).total_seconds()
-                max_session_time = 8 * 60 * 60  # 8 horas en segundos
-                
-                # PROTECCIÓN ESTRICTA: Solo permitir si es EXACTAMENTE el mismo dispositivo Y muy reciente
-                if session_age < 3 and existing_session['ip_address'] == ip and existing_session['user_agent'] == user_agent:
-                    print(f"[SINGLE-SESSION] ⚡ Misma IP/UA y muy reciente ({session_age:.1f}s) - permitiendo como double request")
-                    return True, None
-                elif session_age < 5:
-                    print(f"[SINGLE-SESSION] ⚠️ Sesión reciente ({session_age:.1f}s) pero diferente dispositivo/navegador - BLOQUEANDO")
-                    print(f"[SINGLE-SESSION] Existing IP: {existing_session['ip_address']} vs New IP: {ip}")
-                    print(f"[SINGLE-SESSION] Different device/browser detected")
-                
-                print(f"[SINGLE-SESSION] Edad de sesión: {session_age} segundos ({session_age/3600:.1f} horas)")
-                
-                if session_age < max_session_time:
-                    # Sesión aún válida - rechazar nuevo login
-                    print(f"[SINGLE-SESSION] ❌ {username} ya tiene sesión activa desde {existing_session['created_at']}")
-                    print(f"[SINGLE-SESSION] ❌ RECHAZANDO LOGIN - Sesión válida existe")
-                    return False, {
-                        "error": "Active Session Exists",
-                        "message": f"User '{username}' already has an active session.",
-                        "existing_session": {
-                            "started_at": existing_session['created_at'].isoformat(),
-                            "ip_address": existing_session['ip_address'],
-                            "user_agent": existing_session['user_agent'][:100],  # Truncar para seguridad
-                            "session_duration": f"{int(session_age // 3600)}h {int((session_age % 3600) // 60)}m"
-                        },
-                        "username": username
-                    }
-                else:
-                    # Sesión expirada - limpiar y permitir nuevo login
-                    print(f"[SINGLE-SESSION] 🧹 Sesión expirada para {username}, limpiando...")
-                    del self._active_sessions[username]
-            else:
-                print(f"[SINGLE-SESSION] ✅ No hay sesión activa para {username}")
-            
-            # No hay sesión activa o expiró - permitir login
-            print(f"[SINGLE-SESSION] ✅ Permitiendo login para {username}")
-            return True, None
+        existing_session = await self._offload(self._active_sessions.get, username)
+        if existing_session is None:
+            print(f"[SINGLE-SESSION] ✅ No hay sesión activa para {username}")
+        else:
+            session_error = self._session_conflict(username, existing_session, ip, user_agent, current_time)
+            if session_error:
+                return False, session_error
+        
+        # No hay sesión activa o expiró - permitir login
+        print(f"[SINGLE-SESSION] ✅ Permitiendo login para {username}")
+        return True, None
+
+    def _claim_session(self, username: str, session_info: Dict) -> Optional[Dict]:
+        """
+        Ocupa la sesión única en un solo paso atómico del almacén (fila bloqueada en SQL).
+        Devuelve el error de sesión única si otra sesión vigente ya la ocupa.
+        """
+        conflicts = []
+        
+        def claim(existing_session):
+            if existing_session is not None:
+                session_error = self._session_conflict(
+                    username, existing_session, session_info["ip_address"],
+                    session_info["user_agent"], session_info["created_at"]
+                )
+                if session_error:
+                    conflicts.append(session_error)
+                    return existing_session
+            return session_info
+        
+        self._store.update("active_sessions", username, claim)
+        if conflicts:
+            return conflicts[-1]
+        
+        # LIMPIAR INVALIDACIÓN al crear nueva sesión exitosa para evitar que afecte al nuevo usuario
+        # La invalidación ya cumplió su propósito: forzar logout de la sesión anterior
+        invalidation_time = self._invalidated_sessions.pop(username, None)
+        if invalidation_time is not None:
+            time_since_invalidation = (session_info["created_at"] - invalidation_time).total_seconds()
+            print(f"[SINGLE-SESSION] 🧹 Limpiando invalidación de {username} (estuvo activa {time_since_invalidation:.1f}s)")
+            print(f"[SINGLE-SESSION] ✅ Nueva sesión legítima creada - invalidación ya no necesaria")
+        return None
 
-    def create_user_session(self, username: str, request: Request) -> Dict:
+    async def create_user_session(self, username: str, request: Request) -> Tuple[Optional[Dict], Optional[Dict]]:
         """
         🔐 CREAR NUEVA SESIÓN DE USUARIO
         
-        Registra una nueva sesión activa para el usuario.
+        Registra una nueva sesión activa para el usuario. Comprobar y ocupar la
+        sesión es una sola operación, así dos logins simultáneos no pueden
+        crear dos sesiones.
+        
+        Returns:
+            (session_info, session_error) - session_error si ya hay otra sesión vigente
         """
         ip = self._get_real_ip(request)
         user_agent = request.headers.get("user-agent", "unknown")
@@ -1029,16 +1231,6 @@ class BankLevelSecurityManager:
         print(f"[SINGLE-SESSION] 🏗️ Creando sesión para {username}")
         print(f"[SINGLE-SESSION] IP: {ip}, User-Agent: {user_agent[:50]}...")
         
-        # LIMPIAR INVALIDACIÓN al crear nueva sesión exitosa para evitar que afecte al nuevo usuario
-        # La invalidación ya cumplió su propósito: forzar logout de la sesión anterior
-        if username in self._invalidated_sessions:
-            invalidation_time = self._invalidated_sessions[username]
-            time_since_invalidation = (current_time - invalidation_time).total_seconds()
-            
-            print(f"[SINGLE-SESSION] 🧹 Limpiando invalidación de {username} (estuvo activa {time_since_invalidation:.1f}s)")
-            print(f"[SINGLE-SESSION] ✅ Nueva sesión legítima creada - invalidación ya no necesaria")
-            del self._invalidated_sessions[username]
-        
         session_info = {
             "username": username,
             "created_at": current_time,
@@ -1047,11 +1239,11 @@ class BankLevelSecurityManager:
             "last_activity": current_time
         }
         
-        self._active_sessions[username] = session_info
+        session_error = await self._offload(self._claim_session, username, session_info)
+        if session_error:
+            return None, session_error
         
         print(f"[SINGLE-SESSION] ✅ Sesión creada para {username} desde {ip}")
-        print(f"[SINGLE-SESSION] Total sesiones activas ahora: {len(self._active_sessions)}")
-        print(f"[SINGLE-SESSION] Usuarios con sesión: {list(self._active_sessions.keys())}")
         
         # Log de seguridad
         self._log_security_event({
@@ -1063,7 +1255,7 @@ class BankLevelSecurityManager:
             "session_type": "single_active_session"
         })
         
-        return session_info
+        return session_info, None
 
     def terminate_user_session(self, username: str) -> bool:
         """
@@ -1071,10 +1263,8 @@ class BankLevelSecurityManager:
         
         Termina la sesión activa del usuario (para logout).
         """
-        if username in self._active_sessions:
-            session_info = self._active_sessions[username]
-            del self._active_sessions[username]
-            
+        session_info = self._active_sessions.pop(username, None)
+        if session_info is not None:
             print(f"[SINGLE-SESSION] 🚪 Sesión terminada para {username}")
             
             # Log de seguridad
@@ -1097,9 +1287,9 @@ class BankLevelSecurityManager:
         
         Termina forzadamente la sesión de un usuario (desde Security Dashboard).
         """
-        if username in self._active_sessions:
-            session_info = self._active_sessions[username]
-            del self._active_sessions[username]
+        session_info = self._active_sessions.pop(username, None)
+        if session_info is not None:
+            principal_cache.invalidate(username)
             
             # INVALIDAR SESIÓN SOLO para forzar logout cuando es cambio de dispositivo
             # NO invalidar cuando es Force Logout desde Security Dashboard (el usuario quiere desloggearse completamente)
@@ -1215,20 +1405,24 @@ class BankLevelSecurityManager:
         
         # USAR EL MISMO LOCK PARA CONSISTENCIA
         async with self._lock:
+            state = await self._offload(self._store.get_many, username, ("permanent_blocks", "active_blocks"))
+            permanent_since = state.get("permanent_blocks")
+            unblock_time = state.get("active_blocks")
+            
             # 1. Verificar bloqueo permanente
-            if username in self._permanent_blocks:
+            if permanent_since is not None:
                 return True, {
                     "error": "Account Permanently Blocked",
                     "message": f"La cuenta '{username}' ha sido bloqueada permanentemente.",
                     "username": username,
-                    "blocked_since": self._permanent_blocks[username].isoformat(),
+                    "blocked_since": permanent_since.isoformat(),
                     "type": "permanent"
                 }
             
             # 2. Verificar bloqueo temporal
-            if username in self._active_blocks:
-                if current_time < self._active_blocks[username]:
-                    remaining_seconds = int((self._active_blocks[username] - current_time).total_seconds())
+            if unblock_time is not None:
+                if current_time < unblock_time:
+                    remaining_seconds = int((unblock_time - current_time).total_seconds())
                     remaining_minutes = max(1, remaining_seconds // 60)
                     
                     print(f"[CHECK] ❌ User {username} STILL blocked ({remaining_minutes}min)")
@@ -1242,15 +1436,9 @@ class BankLevelSecurityManager:
                     }
                 else:
                     # El bloqueo temporal expiró - limpiarlo completamente
-                    print(f"[CHECK] ⏰ User {username} time expired - cleaning completely")
-                    del self._active_blocks[username]
                     # También limpiar datos relacionados para reset completo
-                    if username in self._failed_attempts:
-                        del self._failed_attempts[username]
-                        print(f"[CHECK] Failed attempts cleaned for {username}")
-                    if username in self._block_levels:
-                        del self._block_levels[username]
-                        print(f"[CHECK] Escalation level reset for {username}")
+                    print(f"[CHECK] ⏰ User {username} time expired - cleaning completely")
+                    await self._offload(self._reset_expired_block, username)
             else:
                 print(f"[CHECK] 🔓 User {username} is NOT in _active_blocks")
             
@@ -1258,46 +1446,144 @@ class BankLevelSecurityManager:
             print(f"[CHECK] ✅ User {username} is NOT blocked")
             return False, None
 
-    def _cleanup_old_attempts(self, ip: str, current_time: float):
-        """Limpia intentos antiguos"""
-        # Mantener solo intentos del último día
-        day_ago = current_time - 86400
-        self._failed_attempts[ip] = [
-            t for t in self._failed_attempts[ip] 
-            if t > day_ago
-        ]
+    def _count_attempts(self, attempts: List[float], current_time: float, window: int) -> int:
+        """Cuenta intentos en una ventana deslizante (timestamps ordenados, búsqueda binaria)"""
+        return len(attempts) - bisect.bisect_right(attempts, current_time - window)
 
-    def _count_attempts(self, ip: str, current_time: float, window: int) -> int:
-        """Cuenta intentos en una ventana de tiempo"""
-        threshold = current_time - window
-        return sum(1 for t in self._failed_attempts[ip] if t > threshold)
-
-    def _detect_rapid_fire(self, ip: str, current_time: float) -> bool:
-        """Detecta ataques rapid-fire (múltiples intentos muy rápidos)"""
-        attempts = self._failed_attempts[ip]
+    def _detect_rapid_fire(self, attempts: List[float]) -> bool:
+        """Detecta ataques rapid-fire (los dos últimos intentos muy seguidos)"""
         if len(attempts) < 2:
             return False
+        return attempts[-1] - attempts[-2] < self.config["threat_detection"]["rapid_fire_threshold"]
+
+    def _detect_username_enumeration(self, usernames_from_ip: int) -> bool:
+        """Detecta intentos de enumerar usuarios (usuarios distintos desde la misma IP)"""
+        return usernames_from_ip >= self.config["threat_detection"]["username_enumeration"]
+
+    def _sweep_steps(self, now: datetime, removed: Dict[str, int]) -> Iterator[bool]:
+        """
+        🧹 BARRIDO PERIÓDICO DE ESTADO
         
-        # Verificar si hay 2 intentos en menos de 2 segundos
-        for i in range(len(attempts) - 1):
-            if attempts[i+1] - attempts[i] < self.config["suspicious_patterns"]["rapid_fire_threshold"]:
-                return True
-        return False
+        Descarta historial fuera de la ventana deslizante, bloqueos temporales
+        expirados y sesiones caducadas para que la memoria se mantenga estable.
+        Recorre cada namespace en lotes de sweep_batch claves y cede (yield True)
+        después de cada lote.
+        """
+        limits = self.config["tracking_limits"]
+        cutoff = now.timestamp() - limits["window_seconds"]
+        
+        def batches(namespace):
+            # Solo las claves se listan de una vez; los valores se leen por lote
+            keys = self._store.keys(namespace)
+            for start in range(0, len(keys), limits["sweep_batch"]):
+                yield self._store.get_batch(namespace, keys[start:start + limits["sweep_batch"]])
+        
+        def prune(values, is_fresh, counter):
+            fresh = [value for value in values if is_fresh(value)]
+            removed[counter] += len(values) - len(fresh)
+            return fresh or REMOVE
+        
+        def remove_if(is_stale):
+            # Se re-evalúa dentro de la actualización atómica: una entrada renovada
+            # después de listar (nuevo bloqueo, nueva sesión) no se borra
+            return lambda value: REMOVE if value is None or is_stale(value) else value
+        
+        # Bloqueos temporales expirados: mismo reset completo que check_security
+        for entries in batches("active_blocks"):
+            for username, unblock_time in entries.items():
+                if now >= unblock_time:
+                    if self._store.update("active_blocks", username, remove_if(lambda t: now >= t)) is REMOVE:
+                        self._failed_attempts.pop(username, None)
+                        self._block_levels.pop(username, None)
+                        removed["expired_blocks"] += 1
+            yield True
+        
+        # Intentos fallidos fuera de la ventana (los de cuentas bloqueadas se limpian al desbloquear)
+        blocked = set(self._store.keys("active_blocks")) | set(self._store.keys("permanent_blocks"))
+        for entries in batches("failed_attempts"):
+            for username, attempts in entries.items():
+                if username not in blocked and attempts and attempts[0] <= cutoff:
+                    self._store.update("failed_attempts", username,
+                                       lambda attempts: prune(attempts, lambda t: t > cutoff, "failed_attempts"), [])
+            yield True
+        
+        for entries in batches("user_ip_history"):
+            for username, history in entries.items():
+                if history and history[0][1] <= cutoff:
+                    self._store.update("user_ip_history", username,
+                                       lambda history: prune(history, lambda entry: entry[1] > cutoff, "ip_history"), [])
+            yield True
+        
+        def prune_members(members):
+            fresh = {member: seen for member, seen in members.items() if seen > cutoff}
+            removed["ip_index"] += len(members) - len(fresh)
+            return fresh or REMOVE
+        
+        for entries in batches("ip_usernames"):
+            for ip, members in entries.items():
+                if any(seen <= cutoff for seen in members.values()):
+                    self._store.update("ip_usernames", ip, prune_members, {})
+            yield True
+        
+        # Sesiones caducadas (8h) e invalidaciones ya vencidas (30s)
+        def session_expired(session_info):
+            return (now - session_info["created_at"]).total_seconds() >= 8 * 60 * 60
+        
+        for entries in batches("active_sessions"):
+            for username, session_info in entries.items():
+                if session_expired(session_info):
+                    if self._store.update("active_sessions", username, remove_if(session_expired)) is REMOVE:
+                        removed["sessions"] += 1
+            yield True
+        
+        for entries in batches("invalidated_sessions"):
+            for username, invalidated_at in entries.items():
+                if (now - invalidated_at).total_seconds() > 30:
+                    self._store.update("invalidated_sessions", username,
+                                       remove_if(lambda t: (now - t).total_seconds() > 30))
+            yield True
 
-    def _detect_username_enumeration(self, ip: str, username: str) -> bool:
-        """Detecta intentos de enumerar usuarios"""
-        # Contar usernames únicos intentados desde esta IP
-        unique_users = set()
-        for user, attempts in self._user_attempts.items():
-            for attempt_ip, _ in attempts:
-                if attempt_ip == ip:
-                    unique_users.add(user)
-        
-        return len(unique_users) >= self.config["suspicious_patterns"]["username_enumeration"]
+    def sweep(self) -> Dict[str, int]:
+        """Barrido completo de una vez (CLI y tests); la app usa sweep_async"""
+        removed = dict.fromkeys(SWEEP_COUNTERS, 0)
+        for _ in self._sweep_steps(datetime.utcnow(), removed):
+            pass
+        return removed
+
+    async def sweep_async(self) -> Dict[str, int]:
+        """
+        Barrido por lotes sin acaparar el event loop: en memoria cada lote corre en
+        el loop y cede entre lotes; el almacén SQL bloquea y cada lote va al threadpool
+        """
+        removed = dict.fromkeys(SWEEP_COUNTERS, 0)
+        steps = self._sweep_steps(datetime.utcnow(), removed)
+        while await self._offload(next, steps, False):
+            await asyncio.sleep(0)
+        return removed
+
+    async def _sweep_loop(self):
+        interval = self.config["tracking_limits"]["sweep_interval_seconds"]
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # Las peticiones se intercalan entre lotes: los borrados son
+                # condicionales y atómicos por clave
+                removed = await self.sweep_async()
+                if any(removed.values()):
+                    print(f"[SECURITY] 🧹 Sweep removed: {removed}")
+            except Exception as e:
+                print(f"⚠️ [SECURITY] Sweep failed: {e}")
+
+    def start_sweeper(self) -> None:
+        """Inicia el barrido periódico y resuelve el gateway (llamar desde el startup de la app)"""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.get_running_loop().create_task(self._sweep_loop())
+        # Primera resolución fuera del camino de las peticiones
+        self._schedule_gateway_refresh()
 
     def _calculate_lockout_duration(self, ip: str) -> int:
         """Calcula duración del bloqueo basado en intentos previos"""
-        total_attempts = len(self._failed_attempts[ip])
+        total_attempts = len(self._failed_attempts.get(ip, []))
         
         # Determinar nivel de bloqueo
         if total_attempts <= 3:
@@ -1325,12 +1611,12 @@ class BankLevelSecurityManager:
 
     def _add_suspicious_activity(self, ip: str, username: str, activity_type: str):
         """Registra actividad sospechosa"""
-        self._suspicious_activity.append({
+        self._store.append("suspicious_activity", "recent", {
             "ip": ip,
             "username": username,
             "type": activity_type,
             "timestamp": datetime.utcnow().isoformat()
-        })
+        }, max_len=self.config["tracking_limits"]["suspicious_activity"])
 
     def _log_security_event(self, event: Dict):
         """Log de eventos de seguridad (para auditoría)"""
@@ -0,0 +1,429 @@
+"""
+State storage for BankLevelSecurityManager.
+
+The manager keeps lockout, session and device state in namespaced key/value
+entries. The in-memory store is per process; the SQL store keeps the same
+state in the database so every uvicorn worker and replica shares it.
+
+Select the backend with SECURITY_STATE_BACKEND=memory|sql (default memory).
+"""
+import copy
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import delete, select
+
+_MISSING = object()
+
+# Returned from an update function to delete the key in the same atomic step
+REMOVE = object()
+
+#====================== INTERFACE ======================#
+
+class SecurityStateStore(ABC):
+    """
+    Namespaced key/value storage; every mutation is atomic per key. Backends
+    implement the abstract methods, the rest are built on them.
+    """
+
+    # True when calls do I/O; async callers then run them in the threadpool
+    blocking = False
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        ...
+
+    def get_many(self, key: str, namespaces: Iterable[str]) -> Dict[str, Any]:
+        """The value of key in each namespace, in one round trip; unset keys are left out"""
+        values = {}
+        for namespace in namespaces:
+            value = self.get(namespace, key, _MISSING)
+            if value is not _MISSING:
+                values[namespace] = value
+        return values
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def pop(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Remove key and return its value (default when unset) in one atomic step"""
+        ...
+
+    def contains(self, namespace: str, key: str) -> bool:
+        return self.get(namespace, key, _MISSING) is not _MISSING
+
+    @abstractmethod
+    def items(self, namespace: str) -> Dict[str, Any]:
+        ...
+
+    def keys(self, namespace: str) -> List[str]:
+        """The keys of a namespace, without reading their values"""
+        return list(self.items(namespace))
+
+    def get_batch(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """The values of several keys of one namespace; unset keys are left out"""
+        values = {}
+        for key in keys:
+            value = self.get(namespace, key, _MISSING)
+            if value is not _MISSING:
+                values[key] = value
+        return values
+
+    def count(self, namespace: str) -> int:
+        return len(self.items(namespace))
+
+    def update(self, namespace: str, key: str, fn: Callable[[Any], Any], initial: Any = None) -> Any:
+        """Atomically replace a value with fn(value); fn may return REMOVE to delete it"""
+        return self._mutate(namespace, key, initial, fn)
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        """Add to an integer value and return the new value"""
+        return self._mutate(namespace, key, 0, lambda value: value + amount)
+
+    def append(self, namespace: str, key: str, value: Any, max_len: Optional[int] = None, max_keys: Optional[int] = None) -> int:
+        """
+        Append to a list value and return its new length. With max_keys the
+        namespace keeps at most that many keys, evicting the least recently written.
+        """
+        def push(items):
+            items = list(items) + [value]
+            return items[-max_len:] if max_len else items
+        return len(self._mutate(namespace, key, [], push, max_keys))
+
+    def touch_member(
+        self,
+        namespace: str,
+        key: str,
+        member: str,
+        timestamp: float,
+        max_members: Optional[int] = None,
+        max_keys: Optional[int] = None
+    ) -> int:
+        """Record member in a {member: last_seen} map and return the map size (max_keys as in append)"""
+        def touch(members):
+            members = dict(members)
+            members[member] = timestamp
+            if max_members and len(members) > max_members:
+                for stale in sorted(members, key=members.get)[:len(members) - max_members]:
+                    del members[stale]
+            return members
+        return len(self._mutate(namespace, key, {}, touch, max_keys))
+
+    @abstractmethod
+    def _mutate(self, namespace: str, key: str, initial: Any, fn: Callable[[Any], Any], max_keys: Optional[int] = None) -> Any:
+        """
+        Atomically replace a value with fn(value) and return the result; with
+        max_keys, then evict the least recently written keys beyond that many
+        """
+        ...
+
+#====================== IN-MEMORY ======================#
+
+class InMemorySecurityStateStore(SecurityStateStore):
+    """Process-local store; state is lost on restart and not shared between workers"""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            entries = self._data.get(namespace, {})
+            if key not in entries:
+                return default
+            return copy.deepcopy(entries[key])
+
+    def contains(self, namespace, key):
+        with self._lock:
+            return key in self._data.get(namespace, {})
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = copy.deepcopy(value)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            return self._data.get(namespace, {}).pop(key, _MISSING) is not _MISSING
+
+    def pop(self, namespace, key, default=None):
+        with self._lock:
+            return self._data.get(namespace, {}).pop(key, default)
+
+    def items(self, namespace):
+        with self._lock:
+            return copy.deepcopy(self._data.get(namespace, {}))
+
+    def count(self, namespace):
+        with self._lock:
+            return len(self._data.get(namespace, {}))
+
+    def keys(self, namespace):
+        with self._lock:
+            return list(self._data.get(namespace, {}))
+
+    def get_batch(self, namespace, keys):
+        with self._lock:
+            entries = self._data.get(namespace, {})
+            return {key: copy.deepcopy(entries[key]) for key in keys if key in entries}
+
+    def _mutate(self, namespace, key, initial, fn, max_keys=None):
+        with self._lock:
+            entries = self._data.setdefault(namespace, {})
+            value = fn(entries.get(key, initial))
+            if value is REMOVE:
+                entries.pop(key, None)
+                return REMOVE
+            if max_keys:
+                # Dicts keep insertion order: re-inserting moves the key to the
+                # newest end, so the first keys are the least recently written
+                entries.pop(key, None)
+                entries[key] = value
+                while len(entries) > max_keys:
+                    del entries[next(iter(entries))]
+            else:
+                entries[key] = value
+            return copy.deepcopy(value)
+
+#====================== SQL ======================#
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Unsupported security state value: {type(value).__name__}")
+
+def _json_object_hook(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+def encode_value(value: Any) -> str:
+    return json.dumps(value, default=_json_default)
+
+def decode_value(raw: str) -> Any:
+    return json.loads(raw, object_hook=_json_object_hook)
+
+class SQLSecurityStateStore(SecurityStateStore):
+    """Database-backed store shared by every worker; mutations lock the row"""
+
+    blocking = True
+
+    def __init__(self):
+        from database.connection import SessionLocal
+        from database.models import SecurityState
+        self._session_factory = SessionLocal
+        self._model = SecurityState
+
+    def _insert(self, db, namespace, key, value):
+        if db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return (
+            insert(self._model)
+            .values(namespace=namespace, key=key, value=encode_value(value), updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["namespace", "key"])
+        )
+
+    def get(self, namespace, key, default=None):
+        db = self._session_factory()
+        try:
+            raw = (
+                db.query(self._model.value)
+                .filter(self._model.namespace == namespace, self._model.key == key)
+                .scalar()
+            )
+            return default if raw is None else decode_value(raw)
+        finally:
+            db.close()
+
+    def get_many(self, key, namespaces):
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(self._model.namespace, self._model.value)
+                .filter(self._model.key == key, self._model.namespace.in_(list(namespaces)))
+                .all()
+            )
+            return {namespace: decode_value(raw) for namespace, raw in rows}
+        finally:
+            db.close()
+
+    def set(self, namespace, key, value):
+        self._mutate(namespace, key, None, lambda _: value)
+
+    def delete(self, namespace, key):
+        db = self._session_factory()
+        try:
+            deleted = (
+                db.query(self._model)
+                .filter(self._model.namespace == namespace, self._model.key == key)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted > 0
+        finally:
+            db.close()
+
+    def pop(self, namespace, key, default=None):
+        db = self._session_factory()
+        try:
+            raw = db.execute(
+                delete(self._model)
+                .where(self._model.namespace == namespace, self._model.key == key)
+                .returning(self._model.value)
+            ).scalar()
+            db.commit()
+            return default if raw is None else decode_value(raw)
+        finally:
+            db.close()
+
+    def items(self, namespace):
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(self._model.key, self._model.value)
+                .filter(self._model.namespace == namespace)
+                .all()
+            )
+            return {key: decode_value(raw) for key, raw in rows}
+        finally:
+            db.close()
+
+    def count(self, namespace):
+        db = self._session_factory()
+        try:
+            return db.query(self._model).filter(self._model.namespace == namespace).count()
+        finally:
+            db.close()
+
+    def keys(self, namespace):
+        db = self._session_factory()
+        try:
+            return [key for (key,) in db.query(self._model.key).filter(self._model.namespace == namespace)]
+        finally:
+            db.close()
+
+    def get_batch(self, namespace, keys):
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(self._model.key, self._model.value)
+                .filter(self._model.namespace == namespace, self._model.key.in_(list(keys)))
+                .all()
+            )
+            return {key: decode_value(raw) for key, raw in rows}
+        finally:
+            db.close()
+
+    def _mutate(self, namespace, key, initial, fn, max_keys=None):
+        db = self._session_factory()
+        try:
+            # Make sure the row exists so FOR UPDATE has something to lock
+            db.execute(self._insert(db, namespace, key, initial))
+            entry = (
+                db.query(self._model)
+                .filter(self._model.namespace == namespace, self._model.key == key)
+                .with_for_update()
+                .one()
+            )
+            value = fn(decode_value(entry.value))
+            if value is REMOVE:
+                db.delete(entry)
+            else:
+                entry.value = encode_value(value)
+                entry.updated_at = datetime.utcnow()
+            db.commit()
+            if max_keys and value is not REMOVE:
+                self._evict_oldest(db, namespace, max_keys)
+            return value
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _evict_oldest(self, db, namespace, max_keys):
+        # Separate transaction, after the row lock above is released
+        excess = db.query(self._model).filter(self._model.namespace == namespace).count() - max_keys
+        if excess <= 0:
+            return
+        oldest = (
+            select(self._model.key)
+            .where(self._model.namespace == namespace)
+            .order_by(self._model.updated_at, self._model.key)
+            .limit(excess)
+        )
+        db.execute(
+            delete(self._model)
+            .where(self._model.namespace == namespace, self._model.key.in_(oldest))
+        )
+        db.commit()
+
+#====================== NAMESPACE VIEW ======================#
+
+class StoreNamespace(MutableMapping):
+    """Dict-style view of one store namespace; values are copies, write back with [] ="""
+
+    def __init__(self, store: SecurityStateStore, namespace: str):
+        self._store = store
+        self._namespace = namespace
+
+    def __getitem__(self, key):
+        value = self._store.get(self._namespace, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._store.set(self._namespace, key, value)
+
+    def __delitem__(self, key):
+        if not self._store.delete(self._namespace, key):
+            raise KeyError(key)
+
+    def pop(self, key, default=_MISSING):
+        # Atomic in the store, so a key removed concurrently just yields the default
+        value = self._store.pop(self._namespace, key, default)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._store.contains(self._namespace, key)
+
+    def __iter__(self):
+        return iter(self._store.keys(self._namespace))
+
+    def __len__(self):
+        return self._store.count(self._namespace)
+
+    # One store round trip instead of a lookup per key
+    def items(self):
+        return self._store.items(self._namespace).items()
+
+    def values(self):
+        return self._store.items(self._namespace).values()
+
+    def keys(self):
+        return self._store.keys(self._namespace)
+
+#====================== FACTORY ======================#
+
+def create_security_store(backend: Optional[str] = None) -> SecurityStateStore:
+    backend = (backend or os.getenv("SECURITY_STATE_BACKEND", "memory")).lower()
+    if backend == "sql":
+        print("🔐 [SECURITY] Using shared SQL security state store")
+        return SQLSecurityStateStore()
+    if backend != "memory":
+        print(f"⚠️ [SECURITY] Unknown SECURITY_STATE_BACKEND '{backend}', using in-memory store")
+    return InMemorySecurityStateStore()
@@ -1,9 +1,12 @@
 from sqlalchemy import create_engine, text, MetaData
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from dotenv import load_dotenv
 import time
+from .pool_metrics import TimedQueuePool, TimedAsyncQueuePool, instrument_engine
 
 load_dotenv()
 
@@ -12,43 +15,61 @@ Base = declarative_base(metadata=metadata)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-def wait_for_db(retries=5, delay=5):
+def env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# Pool tuning - size these for (workers x pool_size + overflow) <= max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "60"))
+
+# Creating the engine does not connect: the first checkout does. Startup never
+# waits on the database, readiness is reported by /ready (database/readiness.py)
+engine = create_engine(
+    DATABASE_URL,
+    echo=False, 
+    poolclass=TimedQueuePool,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args={
+        "options": "-c search_path=public -c timezone=UTC",
+        "connect_timeout": DB_CONNECT_TIMEOUT,
+        "application_name": "IA-JJ",
+        "client_encoding": "utf8",
+        "keepalives": 1,
+        "keepalives_idle": 30
+    }
+)
+instrument_engine("sync", engine)
+
+def check_connection() -> dict:
+    """Round trip to the database; raises if it is unreachable"""
+    with engine.connect() as conn:
+        db_info = conn.execute(text("SELECT current_database(), current_schema")).fetchone()
+    return {"database": db_info[0], "schema": db_info[1]}
+
+def wait_for_db(retries=5, delay=1):
+    """Block until the database answers, backing off exponentially (CLI use only)"""
     for attempt in range(retries):
         try:
-            engine = create_engine(
-                DATABASE_URL,
-                echo=False, 
-                pool_pre_ping=True,
-                pool_size=5,
-                max_overflow=10,
-                connect_args={
-                    "options": "-c search_path=public",
-                    "connect_timeout": 60,
-                    "application_name": "IA-JJ",
-                    "client_encoding": "utf8",
-                    "keepalives": 1,
-                    "keepalives_idle": 30
-                }
-            )
-            
-            with engine.connect() as conn:
-                conn.execute(text("SET client_encoding TO 'UTF8'"))
-                conn.execute(text("SET search_path TO public"))
-                conn.execute(text("SET timezone TO 'UTC'"))
-                
-                result = conn.execute(text("SELECT current_database(), current_schema, current_timestamp;"))
-                db_info = result.fetchone()
-                
-                return engine
-                
+            info = check_connection()
+            print(f"✅ [DB] Connected to {make_url(DATABASE_URL).render_as_string(hide_password=True)} "
+                  f"(database={info['database']}, schema={info['schema']}) - pool_size={DB_POOL_SIZE}, "
+                  f"max_overflow={DB_MAX_OVERFLOW}, pool_timeout={DB_POOL_TIMEOUT}s, pool_recycle={DB_POOL_RECYCLE}s")
+            return engine
         except Exception as e:
             if attempt < retries - 1:
-                time.sleep(delay)
+                print(f"⚠️ [DB] Connection attempt {attempt + 1}/{retries} failed: {e}")
+                time.sleep(delay * 2 ** attempt)
             else:
                 raise e
 
-engine = wait_for_db()
-
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -56,4 +77,75 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+#====================== ASYNC ======================#
+
+# Async driver per backend for a DATABASE_URL written for the sync engine
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite", "mysql": "aiomysql"}
+_ASYNC_CAPABLE = {"asyncpg", "psycopg", "aiosqlite", "aiomysql", "asyncmy"}
+
+def async_database_url(url: str) -> str:
+    """
+    Same database through an async driver (postgresql -> asyncpg). ASYNC_DATABASE_URL
+    overrides it; raises ValueError for a backend with no async driver.
+    """
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    parsed = make_url(url)
+    backend, _, driver = parsed.drivername.partition("+")
+    backend = "postgresql" if backend == "postgres" else backend
+    if driver in _ASYNC_CAPABLE:
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"No async driver for DATABASE_URL backend '{backend}'; set ASYNC_DATABASE_URL "
+            f"to a URL with an async driver (supported: {', '.join(sorted(ASYNC_DRIVERS))})"
+        )
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+_async_engine = None
+
+def get_async_engine():
+    """
+    The async engine, created on first use so importing the app never depends on
+    the async driver. Async routes don't hold a threadpool thread while waiting on
+    the database, so this pool is sized independently of the sync one.
+    """
+    global _async_engine
+    if _async_engine is None:
+        url = make_url(async_database_url(DATABASE_URL))
+        options = {}
+        if url.get_backend_name() == "postgresql":
+            options = {
+                "poolclass": TimedAsyncQueuePool,
+                "pool_size": int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+                "max_overflow": int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10")),
+                "pool_timeout": DB_POOL_TIMEOUT,
+                "pool_recycle": DB_POOL_RECYCLE
+            }
+            if url.get_driver_name() == "asyncpg":
+                options["connect_args"] = {
+                    "timeout": DB_CONNECT_TIMEOUT,
+                    "server_settings": {
+                        "search_path": "public",
+                        "application_name": "IA-JJ",
+                        "timezone": "UTC"
+                    }
+                }
+        engine_ = create_async_engine(url, echo=False, pool_pre_ping=DB_POOL_PRE_PING, **options)
+        if options:
+            instrument_engine("async", engine_.sync_engine)
+        _async_engine = engine_
+    return _async_engine
+
+_async_session_factory = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def AsyncSessionLocal() -> AsyncSession:
+    """New AsyncSession bound to the async engine (created on first call)"""
+    return _async_session_factory(bind=get_async_engine())
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,44 @@
+"""
+Schema migrations, run as an explicit step instead of on every app boot:
+
+    python -m database.migrate              # apply pending revisions
+    python -m database.migrate upgrade 0003 # apply up to a revision
+    python -m database.migrate current      # highest applied revision
+    python -m database.migrate history      # every revision and when it was applied
+
+Deployments run it once per release as a one-off job or init container, e.g.
+
+    docker run --rm -e DATABASE_URL=... <backend image> python -m database.migrate
+    # Kubernetes: initContainers: [{command: ["python", "-m", "database.migrate"], ...}]
+
+so app pods start straight into uvicorn. entrypoint.sh only runs `upgrade`
+itself when RUN_MIGRATIONS=true (off by default; handy for local development).
+Revisions live in database/migrations/versions.
+"""
+import argparse
+from .migrations import upgrade, current, history
+
+def run_migrations(target=None):
+    return upgrade(target)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m database.migrate")
+    commands = parser.add_subparsers(dest="command")
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending revisions (default)")
+    upgrade_parser.add_argument("target", nargs="?", help="last revision to apply")
+    commands.add_parser("current", help="show the highest applied revision")
+    commands.add_parser("history", help="list revisions and when they were applied")
+    args = parser.parse_args(argv)
+
+    if args.command == "current":
+        print(current() or "(none)")
+    elif args.command == "history":
+        for entry in history():
+            applied = entry["applied_at"].isoformat(sep=" ", timespec="seconds") if entry["applied_at"] else "pending"
+            mode = "" if entry["transactional"] else " [non-transactional]"
+            print(f"{entry['revision']}  {applied:<19}  {entry['description']}{mode}")
+    else:
+        run_migrations(getattr(args, "target", None))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Versioned schema migrations.
+
+Each module in database/migrations/versions defines:
+
+    revision = "0003"             # applied in ascending order, never renumbered
+    description = "..."
+    transactional = True          # False for CREATE INDEX CONCURRENTLY and friends
+    def upgrade(conn): ...
+
+Applied revisions are recorded in public.schema_migrations. A session-level
+advisory lock makes concurrent runs (several replicas booting at once) wait for
+each other instead of racing. Non-transactional revisions run on an AUTOCOMMIT
+connection and must be safe to re-run, since a failure halfway leaves the
+statements that already completed in place.
+
+CLI: python -m database.migrate [upgrade|current|history]
+"""
+import importlib
+import pkgutil
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from ..connection import engine, wait_for_db
+
+MIGRATIONS_TABLE = "public.schema_migrations"
+
+# pg_advisory_lock key shared by every migration run
+MIGRATION_LOCK_ID = 72_019_310
+
+@dataclass(frozen=True)
+class Revision:
+    revision: str
+    description: str
+    transactional: bool
+    module: ModuleType
+
+    def upgrade(self, conn):
+        self.module.upgrade(conn)
+
+def load_revisions() -> List[Revision]:
+    from . import versions
+
+    revisions = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        revisions.append(Revision(
+            revision=module.revision,
+            description=module.description,
+            transactional=getattr(module, "transactional", True),
+            module=module
+        ))
+    revisions.sort(key=lambda rev: rev.revision)
+
+    seen = set()
+    for rev in revisions:
+        if rev.revision in seen:
+            raise RuntimeError(f"Duplicate migration revision {rev.revision}")
+        seen.add(rev.revision)
+    return revisions
+
+#====================== BOOKKEEPING ======================#
+
+def ensure_migrations_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            revision VARCHAR(32) PRIMARY KEY,
+            description VARCHAR NOT NULL,
+            applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            duration_ms INTEGER
+        )
+    """))
+
+def applied_revisions(conn) -> Dict[str, datetime]:
+    rows = conn.execute(text(f"SELECT revision, applied_at FROM {MIGRATIONS_TABLE}")).all()
+    return {revision: applied_at for revision, applied_at in rows}
+
+def record_revision(conn, rev: Revision, duration_ms: int):
+    conn.execute(
+        text(f"""
+            INSERT INTO {MIGRATIONS_TABLE} (revision, description, duration_ms)
+            VALUES (:revision, :description, :duration_ms)
+            ON CONFLICT (revision) DO NOTHING
+        """),
+        {"revision": rev.revision, "description": rev.description, "duration_ms": duration_ms}
+    )
+
+#====================== HELPERS FOR REVISIONS ======================#
+
+def create_index_concurrently(conn, name: str, table: str, definition: str, unique: bool = False):
+    """
+    CREATE INDEX CONCURRENTLY without blocking writes; needs an AUTOCOMMIT connection.
+
+    A concurrent build that fails leaves an INVALID index behind, which IF NOT
+    EXISTS would then skip forever, so an invalid leftover is dropped and rebuilt.
+    """
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).first()
+    if invalid:
+        print(f"⚠️ [MIGRATE] Rebuilding invalid index {name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS public.{name}"))
+
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON public.{table} {definition}"
+    ))
+
+def constraint_exists(conn, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}
+    ).first() is not None
+
+#====================== COMMANDS ======================#
+
+def upgrade(target: Optional[str] = None) -> List[str]:
+    """Apply pending revisions up to and including target (default: all); returns what ran"""
+    revisions = load_revisions()
+    if target is not None and target not in {rev.revision for rev in revisions}:
+        raise ValueError(f"Unknown revision {target}")
+
+    wait_for_db()
+    applied_now = []
+    # AUTOCOMMIT so the lock holder never sits idle in a transaction, which
+    # would make CREATE INDEX CONCURRENTLY wait on it
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            with engine.begin() as conn:
+                ensure_migrations_table(conn)
+                applied = applied_revisions(conn)
+
+            for rev in revisions:
+                if target is not None and rev.revision > target:
+                    break
+                if rev.revision in applied:
+                    continue
+
+                print(f"⏳ [MIGRATE] {rev.revision} {rev.description}")
+                started = time.perf_counter()
+                if rev.transactional:
+                    with engine.begin() as conn:
+                        rev.upgrade(conn)
+                        record_revision(conn, rev, int((time.perf_counter() - started) * 1000))
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        rev.upgrade(conn)
+                        record_revision(conn, rev, int((time.perf_counter() - started) * 1000))
+                print(f"✅ [MIGRATE] {rev.revision} applied in {time.perf_counter() - started:.2f}s")
+                applied_now.append(rev.revision)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+    if not applied_now:
+        print("✅ [MIGRATE] Schema up to date")
+    return applied_now
+
+def history() -> List[Dict]:
+    """Every known revision with when it was applied (None if pending)"""
+    with engine.begin() as conn:
+        ensure_migrations_table(conn)
+        applied = applied_revisions(conn)
+    return [
+        {
+            "revision": rev.revision,
+            "description": rev.description,
+            "transactional": rev.transactional,
+            "applied_at": applied.get(rev.revision)
+        }
+        for rev in load_revisions()
+    ]
+
+def current() -> Optional[str]:
+    """Highest applied revision, or None on an empty database"""
+    applied = [entry["revision"] for entry in history() if entry["applied_at"] is not None]
+    return applied[-1] if applied else None
@@ -0,0 +1,260 @@
+"""
+Schema as it stood before versioned migrations: every table, plus the columns
+and indexes that used to be patched in at startup.
+
+Everything is IF NOT EXISTS so databases built by the old create_all boot path
+are adopted as-is. Frozen DDL on purpose: later model changes get their own
+revision instead of editing this one.
+"""
+from sqlalchemy import text
+
+revision = "0001"
+description = "Baseline schema"
+transactional = True
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS public.exercises (
+        id SERIAL NOT NULL,
+        name VARCHAR NOT NULL,
+        description TEXT,
+        image_url VARCHAR,
+        default_sets INTEGER,
+        default_reps INTEGER,
+        default_sessions_per_day INTEGER,
+        hep_required BOOLEAN,
+        discipline VARCHAR NOT NULL,
+        focus_area VARCHAR,
+        is_active BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.note_sections (
+        id SERIAL NOT NULL,
+        section_name VARCHAR NOT NULL,
+        description TEXT,
+        is_required BOOLEAN,
+        has_static_image BOOLEAN,
+        static_image_url VARCHAR,
+        form_schema JSON,
+        PRIMARY KEY (id),
+        UNIQUE (section_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.note_templates (
+        id SERIAL NOT NULL,
+        discipline VARCHAR NOT NULL,
+        note_type VARCHAR NOT NULL,
+        is_active BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.patients (
+        id SERIAL NOT NULL,
+        full_name VARCHAR NOT NULL,
+        birthday DATE NOT NULL,
+        gender VARCHAR NOT NULL,
+        address VARCHAR NOT NULL,
+        contact_info JSON,
+        insurance VARCHAR,
+        physician VARCHAR,
+        nurse VARCHAR,
+        agency_id INTEGER NOT NULL,
+        nursing_diagnosis TEXT,
+        urgency_level VARCHAR,
+        prior_level_of_function TEXT,
+        homebound_status VARCHAR,
+        weight_bearing_status VARCHAR,
+        referral_reason TEXT,
+        weight VARCHAR,
+        height VARCHAR,
+        past_medical_history TEXT,
+        clinical_grouping VARCHAR,
+        required_disciplines TEXT,
+        is_active BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.security_state (
+        namespace VARCHAR(50) NOT NULL,
+        key VARCHAR(255) NOT NULL,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (namespace, key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.staff (
+        id SERIAL NOT NULL,
+        name VARCHAR NOT NULL,
+        birthday DATE,
+        gender VARCHAR,
+        postal_code VARCHAR,
+        email VARCHAR NOT NULL,
+        phone VARCHAR,
+        alt_phone VARCHAR,
+        username VARCHAR NOT NULL,
+        password VARCHAR NOT NULL,
+        role VARCHAR NOT NULL,
+        is_active BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.certification_periods (
+        id SERIAL NOT NULL,
+        patient_id INTEGER,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        is_active BOOLEAN,
+        pt_frequency VARCHAR,
+        ot_frequency VARCHAR,
+        st_frequency VARCHAR,
+        pt_approved_visits INTEGER,
+        ot_approved_visits INTEGER,
+        st_approved_visits INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.documents (
+        id SERIAL NOT NULL,
+        patient_id INTEGER,
+        staff_id INTEGER,
+        file_name VARCHAR NOT NULL,
+        file_path VARCHAR,
+        uploaded_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id),
+        FOREIGN KEY(staff_id) REFERENCES public.staff (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.note_template_sections (
+        id SERIAL NOT NULL,
+        template_id INTEGER NOT NULL,
+        section_id INTEGER NOT NULL,
+        position INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(template_id) REFERENCES public.note_templates (id),
+        FOREIGN KEY(section_id) REFERENCES public.note_sections (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.patient_exercise_assignments (
+        id SERIAL NOT NULL,
+        patient_id INTEGER NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        sets INTEGER,
+        reps INTEGER,
+        sessions_per_day INTEGER,
+        hep_required BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id),
+        FOREIGN KEY(exercise_id) REFERENCES public.exercises (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.signatures (
+        id SERIAL NOT NULL,
+        patient_id INTEGER NOT NULL,
+        entity_type VARCHAR(50) NOT NULL,
+        entity_name VARCHAR(255) NOT NULL,
+        entity_id INTEGER NOT NULL,
+        signable_type VARCHAR(50) NOT NULL,
+        signable_id INTEGER NOT NULL,
+        signature_metadata JSON NOT NULL,
+        file_path VARCHAR(500) NOT NULL,
+        svg_preview TEXT,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        signed_at TIMESTAMP WITHOUT TIME ZONE,
+        updated_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.staff_assignments (
+        id SERIAL NOT NULL,
+        patient_id INTEGER,
+        staff_id INTEGER,
+        assigned_role VARCHAR NOT NULL,
+        assigned_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id),
+        FOREIGN KEY(staff_id) REFERENCES public.staff (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.communication_records (
+        id SERIAL NOT NULL,
+        certification_period_id INTEGER NOT NULL,
+        title VARCHAR NOT NULL,
+        content TEXT NOT NULL,
+        created_by INTEGER NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(certification_period_id) REFERENCES public.certification_periods (id),
+        FOREIGN KEY(created_by) REFERENCES public.staff (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.visits (
+        id SERIAL NOT NULL,
+        patient_id INTEGER NOT NULL,
+        staff_id INTEGER NOT NULL,
+        certification_period_id INTEGER NOT NULL,
+        visit_date DATE NOT NULL,
+        visit_type VARCHAR NOT NULL,
+        therapy_type VARCHAR NOT NULL,
+        status VARCHAR,
+        scheduled_time VARCHAR,
+        is_hidden BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY(patient_id) REFERENCES public.patients (id),
+        FOREIGN KEY(staff_id) REFERENCES public.staff (id),
+        FOREIGN KEY(certification_period_id) REFERENCES public.certification_periods (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.visit_notes (
+        id SERIAL NOT NULL,
+        visit_id INTEGER NOT NULL,
+        status VARCHAR,
+        sections_data JSON,
+        section_bitmap BIGINT,
+        therapist_name VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(visit_id) REFERENCES public.visits (id)
+    )
+    """
+]
+
+# Columns added to existing tables after they were first created
+COLUMNS = [
+    "ALTER TABLE public.visit_notes ADD COLUMN IF NOT EXISTS section_bitmap BIGINT"
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_public_exercises_id ON public.exercises (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_patients_id ON public.patients (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_public_staff_email ON public.staff (email)",
+    "CREATE INDEX IF NOT EXISTS ix_public_staff_id ON public.staff (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_public_staff_username ON public.staff (username)",
+    "CREATE INDEX IF NOT EXISTS ix_public_certification_periods_id ON public.certification_periods (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_documents_id ON public.documents (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_patient_exercise_assignments_id ON public.patient_exercise_assignments (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_signatures_id ON public.signatures (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_staff_assignments_id ON public.staff_assignments (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_communication_records_id ON public.communication_records (id)",
+    "CREATE INDEX IF NOT EXISTS ix_public_visits_id ON public.visits (id)"
+]
+
+def upgrade(conn):
+    for statement in TABLES + COLUMNS + INDEXES:
+        conn.execute(text(statement))
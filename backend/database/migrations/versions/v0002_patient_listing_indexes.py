@@ -0,0 +1,13 @@
+"""Indexes behind keyset pagination and filters on GET /patients/"""
+from database.migrations import create_index_concurrently
+
+revision = "0002"
+description = "Patient listing indexes"
+transactional = False
+
+def upgrade(conn):
+    create_index_concurrently(conn, "ix_patients_agency_id_is_active_id", "patients", "(agency_id, is_active, id)")
+    create_index_concurrently(conn, "ix_patients_is_active_id", "patients", "(is_active, id)")
+    create_index_concurrently(conn, "ix_patients_urgency_level_id", "patients", "(urgency_level, id)")
+    create_index_concurrently(conn, "ix_patients_clinical_grouping_id", "patients", "(clinical_grouping, id)")
+    create_index_concurrently(conn, "ix_patients_lower_full_name", "patients", "(lower(full_name) text_pattern_ops)")
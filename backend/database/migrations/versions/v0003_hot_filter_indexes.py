@@ -0,0 +1,14 @@
+"""Composite indexes for the visit, cert period, assignment, signature, record and template lookups"""
+from database.migrations import create_index_concurrently
+
+revision = "0003"
+description = "Hot filter composite indexes"
+transactional = False
+
+def upgrade(conn):
+    create_index_concurrently(conn, "ix_visits_certification_period_id_is_hidden", "visits", "(certification_period_id, is_hidden)")
+    create_index_concurrently(conn, "ix_certification_periods_patient_id_start_date_end_date", "certification_periods", "(patient_id, start_date, end_date)")
+    create_index_concurrently(conn, "ix_staff_assignments_patient_id_assigned_role", "staff_assignments", "(patient_id, assigned_role)")
+    create_index_concurrently(conn, "ix_signatures_patient_id_created_at", "signatures", "(patient_id, created_at)")
+    create_index_concurrently(conn, "ix_communication_records_certification_period_id_created_at", "communication_records", "(certification_period_id, created_at)")
+    create_index_concurrently(conn, "ix_note_templates_discipline_note_type_is_active", "note_templates", "(discipline, note_type, is_active)")
@@ -0,0 +1,29 @@
+"""
+One note per visit. The unique index is built concurrently and then attached as
+the constraint, so visit_notes stays writable. Duplicate notes stop the
+migration instead of being deleted: they are clinical records and need review.
+"""
+from sqlalchemy import text
+from database.migrations import create_index_concurrently, constraint_exists
+
+revision = "0004"
+description = "Unique visit_id on visit_notes"
+transactional = False
+
+def upgrade(conn):
+    if constraint_exists(conn, "uq_visit_notes_visit_id"):
+        return
+
+    duplicates = conn.execute(text(
+        "SELECT visit_id FROM public.visit_notes GROUP BY visit_id HAVING COUNT(*) > 1 ORDER BY visit_id LIMIT 20"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot add uq_visit_notes_visit_id, visits with more than one note: {duplicates}. "
+            "Merge or remove the extra notes and run the migration again."
+        )
+
+    create_index_concurrently(conn, "uq_visit_notes_visit_id", "visit_notes", "(visit_id)", unique=True)
+    conn.execute(text(
+        "ALTER TABLE public.visit_notes ADD CONSTRAINT uq_visit_notes_visit_id UNIQUE USING INDEX uq_visit_notes_visit_id"
+    ))
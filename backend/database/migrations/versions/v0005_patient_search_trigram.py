@@ -0,0 +1,13 @@
+"""pg_trgm GIN indexes behind GET /patients/search"""
+from sqlalchemy import text
+from database.migrations import create_index_concurrently
+
+revision = "0005"
+description = "Patient search trigram indexes"
+transactional = False
+
+def upgrade(conn):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    create_index_concurrently(conn, "ix_patients_full_name_trgm", "patients", "USING gin (full_name gin_trgm_ops)")
+    create_index_concurrently(conn, "ix_patients_physician_trgm", "patients", "USING gin (physician gin_trgm_ops)")
+    create_index_concurrently(conn, "ix_patients_address_trgm", "patients", "USING gin (address gin_trgm_ops)")
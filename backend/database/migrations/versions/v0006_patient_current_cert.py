@@ -0,0 +1,42 @@
+"""
+patient_current_cert: the cert period covering today per patient, so patient
+reads join one row instead of range-scanning certification_periods. Seeded here
+and kept current by the daily rollover (scheduling/rollover.py), which also
+recomputes certification_periods.is_active.
+"""
+from sqlalchemy import text
+
+revision = "0006"
+description = "patient_current_cert table and is_active rollover"
+transactional = True
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS public.patient_current_cert (
+            patient_id INTEGER NOT NULL,
+            certification_period_id INTEGER NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            as_of DATE NOT NULL,
+            PRIMARY KEY (patient_id),
+            FOREIGN KEY(patient_id) REFERENCES public.patients (id) ON DELETE CASCADE,
+            FOREIGN KEY(certification_period_id) REFERENCES public.certification_periods (id) ON DELETE CASCADE
+        )
+    """))
+
+    conn.execute(text("DELETE FROM public.patient_current_cert"))
+    conn.execute(text("""
+        INSERT INTO public.patient_current_cert (patient_id, certification_period_id, start_date, end_date, as_of)
+        SELECT DISTINCT ON (patient_id) patient_id, id, start_date, end_date, CURRENT_DATE
+        FROM public.certification_periods
+        WHERE patient_id IS NOT NULL AND start_date <= CURRENT_DATE AND end_date >= CURRENT_DATE
+        ORDER BY patient_id, start_date DESC
+    """))
+
+    conn.execute(text("""
+        UPDATE public.certification_periods AS cp
+        SET is_active = (COALESCE(p.is_active, false) AND cp.start_date <= CURRENT_DATE AND cp.end_date >= CURRENT_DATE)
+        FROM public.patients AS p
+        WHERE p.id = cp.patient_id
+          AND cp.is_active IS DISTINCT FROM (COALESCE(p.is_active, false) AND cp.start_date <= CURRENT_DATE AND cp.end_date >= CURRENT_DATE)
+    """))
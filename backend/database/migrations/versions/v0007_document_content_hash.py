@@ -0,0 +1,10 @@
+"""Content hash and size recorded for uploaded documents"""
+from sqlalchemy import text
+
+revision = "0007"
+description = "Document content_hash and size_bytes"
+transactional = True
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+    conn.execute(text("ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS size_bytes BIGINT"))
@@ -0,0 +1,9 @@
+"""Index counting Document references to a shared blob"""
+from database.migrations import create_index_concurrently
+
+revision = "0008"
+description = "Document file_path index for blob reference counts"
+transactional = False
+
+def upgrade(conn):
+    create_index_concurrently(conn, "ix_documents_file_path", "documents", "(file_path)")
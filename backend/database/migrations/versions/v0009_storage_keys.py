@@ -0,0 +1,20 @@
+"""Document and signature file paths become storage keys relative to the storage root"""
+from sqlalchemy import text
+
+revision = "0009"
+description = "Relative storage keys in documents and signatures file_path"
+transactional = True
+
+# Root every file was written under before storage backends
+LEGACY_STORAGE_ROOT = "/app/storage/"
+
+def upgrade(conn):
+    for table in ("documents", "signatures"):
+        conn.execute(
+            text(f"""
+                UPDATE public.{table}
+                SET file_path = substr(file_path, length(:root) + 1)
+                WHERE file_path LIKE :root || '%'
+            """),
+            {"root": LEGACY_STORAGE_ROOT}
+        )
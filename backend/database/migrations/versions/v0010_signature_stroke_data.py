@@ -0,0 +1,162 @@
+"""
+Packed signature strokes: add signatures.stroke_data and move every row's
+strokes out of signature_metadata into it. svg_preview is cleared where it is
+just the rendering of those strokes, so it is rebuilt on request; an SVG that
+was set explicitly is kept. Rows whose strokes can't be encoded stay as they
+are and are still served from signature_metadata.
+
+The .json/.svg signature files written before this revision are no longer
+read and are left in storage.
+"""
+import json
+import math
+import struct
+import sys
+from array import array
+from sqlalchemy import text, bindparam, LargeBinary
+
+revision = "0010"
+description = "Signature stroke_data binary column and backfill"
+transactional = True
+
+BATCH_SIZE = 500
+
+#====================== FROZEN STK1 ENCODER ======================#
+# Copy of storage.strokes.encode_strokes as of this revision, so later changes
+# to the live codec can't change what this backfill writes.
+
+_HEADER = struct.Struct("<4sBBHHHIIq")
+_INT16 = (-32768, 32767)
+_INT32 = (-2**31, 2**31 - 1)
+_INT64 = (-2**63, 2**63 - 1)
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _deltas(values, start=0):
+    previous, out = start, []
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
+
+def _in_range(values, bounds) -> bool:
+    return all(bounds[0] <= value <= bounds[1] for value in values)
+
+def _quantize(value, scale: int) -> int:
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"non-finite coordinate {value}")
+    return round(value * scale)
+
+def encode_strokes(strokes: list, dimensions: dict = None, scale: int = 10) -> bytes:
+    """STK1 version 1: header, int32 stroke lengths, int16/int32 dx and dy, int32 dt"""
+    dimensions = {"width": 400, "height": 200, **(dimensions or {})}
+    try:
+        width, height = int(dimensions["width"]), int(dimensions["height"])
+        strokes = [stroke for stroke in strokes or [] if stroke]
+        points = [point for stroke in strokes for point in stroke]
+        xs = [_quantize(point["x"], scale) for point in points]
+        ys = [_quantize(point["y"], scale) for point in points]
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Malformed signature strokes: {e}") from e
+    if not (0 <= width <= 0xFFFF and 0 <= height <= 0xFFFF):
+        raise ValueError("Signature dimensions out of range")
+
+    timestamps = [point.get("timestamp") for point in points]
+    flags, t0, dt = 0, 0, []
+    if points and all(isinstance(ts, (int, float)) and not isinstance(ts, bool) for ts in timestamps):
+        flags |= 0x01
+        try:
+            timestamps = [int(ts) for ts in timestamps]
+        except (ValueError, OverflowError) as e:
+            raise ValueError(f"Malformed signature timestamps: {e}") from e
+        t0 = timestamps[0]
+        dt = _deltas(timestamps, t0)
+        if not (_INT64[0] <= t0 <= _INT64[1] and _in_range(dt, _INT32)):
+            raise ValueError("Signature timestamps out of range")
+
+    dx, dy = _deltas(xs), _deltas(ys)
+    if not _in_range(dx, _INT16) or not _in_range(dy, _INT16):
+        flags |= 0x02
+        if not _in_range(dx, _INT32) or not _in_range(dy, _INT32):
+            raise ValueError("Signature coordinates out of range")
+    coordinate_type = "i" if flags & 0x02 else "h"
+
+    parts = [
+        _HEADER.pack(b"STK1", 1, flags, scale, width, height, len(strokes), len(points), t0),
+        _little_endian(array("i", [len(stroke) for stroke in strokes])),
+        _little_endian(array(coordinate_type, dx)),
+        _little_endian(array(coordinate_type, dy))
+    ]
+    if flags & 0x01:
+        parts.append(_little_endian(array("i", dt)))
+    return b"".join(parts)
+
+#====================== BACKFILL ======================#
+
+def legacy_svg(metadata: dict) -> str:
+    """Frozen copy of the SVG the API stored in svg_preview before this revision"""
+    strokes = metadata.get('strokes', [])
+    if not strokes:
+        return ''
+    dimensions = metadata.get('dimensions', {'width': 400, 'height': 200})
+    width = dimensions.get('width', 400)
+    height = dimensions.get('height', 200)
+    path_data = ''.join(
+        f"M{stroke[0]['x']},{stroke[0]['y']}" + ''.join(f"L{point['x']},{point['y']}" for point in stroke[1:])
+        for stroke in strokes if stroke
+    )
+    return f'''<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">
+    <path d="{path_data}" stroke="#333" stroke-width="2" fill="none" stroke-linecap="round" stroke-linejoin="round"/>
+</svg>'''
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE public.signatures ADD COLUMN IF NOT EXISTS stroke_data BYTEA"))
+
+    update = text("""
+        UPDATE public.signatures
+        SET stroke_data = :stroke_data,
+            signature_metadata = CAST(:metadata AS JSON),
+            svg_preview = :svg_preview
+        WHERE id = :id
+    """).bindparams(bindparam("stroke_data", type_=LargeBinary))
+
+    last_id, converted, skipped = 0, 0, 0
+    while True:
+        rows = conn.execute(
+            text("""
+                SELECT id, signature_metadata, svg_preview FROM public.signatures
+                WHERE stroke_data IS NULL AND id > :last_id
+                ORDER BY id LIMIT :limit
+            """),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+
+        batch = []
+        for signature_id, metadata, svg_preview in rows:
+            last_id = signature_id
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            try:
+                stroke_data = encode_strokes(metadata.get("strokes", []), metadata.get("dimensions"))
+                rendered = legacy_svg(metadata)
+            except (ValueError, OverflowError, AttributeError, KeyError, TypeError):
+                skipped += 1
+                continue
+            batch.append({
+                "id": signature_id,
+                "stroke_data": stroke_data,
+                "metadata": json.dumps({key: value for key, value in metadata.items() if key != "strokes"}),
+                "svg_preview": None if svg_preview in (None, "", rendered) else svg_preview
+            })
+        if batch:
+            conn.execute(update, batch)
+            converted += len(batch)
+
+    print(f"✅ [MIGRATE] Packed strokes for {converted} signatures ({skipped} left as JSON)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, ForeignKey, Text, JSON, LargeBinary, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from database.connection import Base
 from datetime import datetime
@@ -55,6 +55,23 @@ class Patient(Base):
     documents = relationship("Document", back_populates="patient")
     staff_assignments = relationship("StaffAssignment", back_populates="patient")
 
+    # Keyset pagination walks Patient.id, so every listing filter ends with id
+    __table_args__ = (
+        Index("ix_patients_agency_id_is_active_id", agency_id, is_active, id),
+        Index("ix_patients_is_active_id", is_active, id),
+        Index("ix_patients_urgency_level_id", urgency_level, id),
+        Index("ix_patients_clinical_grouping_id", clinical_grouping, id),
+        Index(
+            "ix_patients_lower_full_name",
+            func.lower(full_name).label("lower_full_name"),
+            postgresql_ops={"lower_full_name": "text_pattern_ops"}
+        ),
+        # Trigram indexes for GET /patients/search (pg_trgm)
+        Index("ix_patients_full_name_trgm", full_name, postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+        Index("ix_patients_physician_trgm", physician, postgresql_using="gin", postgresql_ops={"physician": "gin_trgm_ops"}),
+        Index("ix_patients_address_trgm", address, postgresql_using="gin", postgresql_ops={"address": "gin_trgm_ops"}),
+    )
+
 class Document(Base):
     __tablename__ = "documents"
 
@@ -63,11 +80,19 @@ class Document(Base):
     staff_id = Column(Integer, ForeignKey("staff.id"), nullable=True)
     file_name = Column(String, nullable=False)
     file_path = Column(String)
+    # SHA-256 hex of the file contents and its size, NULL for files stored before uploads were hashed
+    content_hash = Column(String(64), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     patient = relationship("Patient", back_populates="documents")
     staff = relationship("Staff", back_populates="documents")
 
+    # Rows sharing a file_path are the blob's references (storage/blobs.py)
+    __table_args__ = (
+        Index("ix_documents_file_path", file_path),
+    )
+
 class StaffAssignment(Base):
     __tablename__ = "staff_assignments"
 
@@ -80,6 +105,10 @@ class StaffAssignment(Base):
     patient = relationship("Patient", back_populates="staff_assignments")
     staff = relationship("Staff", back_populates="assigned_patients")
 
+    __table_args__ = (
+        Index("ix_staff_assignments_patient_id_assigned_role", patient_id, assigned_role),
+    )
+
 class CertificationPeriod(Base):
     __tablename__ = "certification_periods"
 
@@ -98,6 +127,20 @@ class CertificationPeriod(Base):
     patient = relationship("Patient", back_populates="certification_periods")
     visits = relationship("Visit", back_populates="certification_period")
 
+    __table_args__ = (
+        Index("ix_certification_periods_patient_id_start_date_end_date", patient_id, start_date, end_date),
+    )
+
+class PatientCurrentCert(Base):
+    """Cert period covering today for each patient, rebuilt daily by scheduling/rollover.py"""
+    __tablename__ = "patient_current_cert"
+
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True)
+    certification_period_id = Column(Integer, ForeignKey("certification_periods.id", ondelete="CASCADE"), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    as_of = Column(Date, nullable=False)
+
 class Exercise(Base):
     __tablename__ = "exercises"
 
@@ -146,6 +189,10 @@ class Visit(Base):
     note = relationship("VisitNote", back_populates="visit", uselist=False)
     certification_period = relationship("CertificationPeriod", back_populates="visits")
 
+    __table_args__ = (
+        Index("ix_visits_certification_period_id_is_hidden", certification_period_id, is_hidden),
+    )
+
 class VisitNote(Base):
     __tablename__ = "visit_notes"
 
@@ -153,10 +200,17 @@ class VisitNote(Base):
     visit_id = Column(Integer, ForeignKey("visits.id"), nullable=False)
     status = Column(String, default="Pending")
     sections_data = Column(JSON, nullable=True)
+    # Bit i set when template section i has data, NULL until first computed
+    section_bitmap = Column(BigInteger, nullable=True)
     therapist_name = Column(String, nullable=False)
 
     visit = relationship("Visit", back_populates="note")
 
+    # One note per visit; the constraint's index also serves lookups by visit_id
+    __table_args__ = (
+        UniqueConstraint(visit_id, name="uq_visit_notes_visit_id"),
+    )
+
 class NoteSection(Base):
     __tablename__ = "note_sections"
 
@@ -178,6 +232,10 @@ class NoteTemplate(Base):
 
     sections = relationship("NoteTemplateSection", back_populates="template", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_note_templates_discipline_note_type_is_active", discipline, note_type, is_active),
+    )
+
 class NoteTemplateSection(Base):
     __tablename__ = "note_template_sections"
 
@@ -202,6 +260,10 @@ class CommunicationRecord(Base):
     certification_period = relationship("CertificationPeriod")
     staff = relationship("Staff")
 
+    __table_args__ = (
+        Index("ix_communication_records_certification_period_id_created_at", certification_period_id, created_at),
+    )
+
 class Signature(Base):
     __tablename__ = "signatures"
 
@@ -214,8 +276,11 @@ class Signature(Base):
     signable_type = Column(String(50), nullable=False)
     signable_id = Column(Integer, nullable=False)
     
+    # Client metadata minus the strokes, which live packed in stroke_data (storage/strokes.py)
     signature_metadata = Column(JSON, nullable=False)
+    stroke_data = Column(LargeBinary, nullable=True)
     file_path = Column(String(500), nullable=False) 
+    # Only an explicitly uploaded SVG; otherwise it is rendered from stroke_data on request
     svg_preview = Column(Text, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -224,5 +289,20 @@ class Signature(Base):
     
     patient = relationship("Patient")
 
+    __table_args__ = (
+        Index("ix_signatures_patient_id_created_at", patient_id, created_at),
+    )
+
     def __repr__(self):
         return f"<Signature(id={self.id}, entity_type={self.entity_type}, patient_id={self.patient_id})>"
+
+class SecurityState(Base):
+    __tablename__ = "security_state"
+
+    namespace = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SecurityState(namespace={self.namespace}, key={self.key})>"
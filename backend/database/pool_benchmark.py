@@ -0,0 +1,172 @@
+"""
+Roster load test: GET /patients/ on the sync and async database stacks.
+
+Drives the roster endpoint in-process (httpx ASGI transport, no network) with
+N concurrent clients against two stacks that share everything but the driver:
+
+    sync   the pre-port handler: a def route on the threadpool, psycopg2 Session
+    async  the ported routes/search_endpoints.py route on the event loop, asyncpg
+
+Both stacks get their own engine with the same pool size and overflow, so the
+comparison isn't skewed by pool sizing. Reports requests/s, latency p50/p95/p99
+and the pool's checkout wait (database/pool_metrics.py). Runs against a
+migrated, populated DATABASE_URL; needs httpx.
+
+    python -m database.pool_benchmark                          # 2000 requests, 200 clients, both stacks
+    python -m database.pool_benchmark --stack async --pool-size 10 --max-overflow 0
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+from fastapi import Depends, FastAPI, Query, Response
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from .connection import DATABASE_URL, DB_POOL_TIMEOUT, async_database_url, get_async_db
+from .pool_metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+def _engine_options(pool_size: int, max_overflow: int) -> Dict:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": False
+    }
+
+#====================== STACKS ======================#
+
+def sync_stack(url: str, pool_size: int, max_overflow: int):
+    """FastAPI app with the roster as a def route on a sync Session, and its metrics"""
+    from database.models import Patient
+    from routes.search_endpoints import build_patient_response, query_patient_roster
+
+    engine = create_engine(url, poolclass=TimedQueuePool, **_engine_options(pool_size, max_overflow))
+    metrics = instrument_engine("bench-sync", engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    def get_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/patients/")
+    def get_all_patients(response: Response, limit: Optional[int] = Query(None), db: Session = Depends(get_session)):
+        response.headers["X-Total-Count"] = str(db.scalar(select(func.count(Patient.id))))
+        query = query_patient_roster().order_by(Patient.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        return [build_patient_response(*row) for row in db.execute(query).all()]
+
+    return app, metrics, engine.dispose
+
+def async_stack(url: str, pool_size: int, max_overflow: int):
+    """The ported search router on its own async engine, and its metrics"""
+    from routes.search_endpoints import router
+
+    engine = create_async_engine(
+        async_database_url(url), poolclass=TimedAsyncQueuePool, **_engine_options(pool_size, max_overflow)
+    )
+    metrics = instrument_engine("bench-async", engine.sync_engine)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def get_session():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = get_session
+
+    async def dispose():
+        await engine.dispose()
+
+    return app, metrics, dispose
+
+STACKS = {"sync": sync_stack, "async": async_stack}
+
+#====================== LOAD ======================#
+
+async def run(stack: str, url: str, requests: int, concurrency: int, pool_size: int, max_overflow: int, limit: int) -> Dict:
+    try:
+        import httpx
+    except ImportError as e:
+        raise RuntimeError("database.pool_benchmark needs httpx (pip install httpx)") from e
+
+    app, metrics, dispose = STACKS[stack](url, pool_size, max_overflow)
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(range(requests))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the pool and the route before timing
+        await client.get("/patients/", params={"limit": limit})
+
+        async def client_loop():
+            nonlocal errors
+            for _ in pending:
+                started = time.perf_counter()
+                response = await client.get("/patients/", params={"limit": limit})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        waits_before = metrics.snapshot()["checkout_wait_ms"]["count"]
+        started = time.perf_counter()
+        await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+        snapshot = metrics.snapshot()
+
+    result = dispose()
+    if asyncio.iscoroutine(result):
+        await result
+
+    return {
+        "stack": stack,
+        "requests": requests,
+        "concurrency": concurrency,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "latency_p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "latency_max_ms": round(max(latencies, default=0.0) * 1000, 1),
+        "checkouts": snapshot["checkout_wait_ms"]["count"] - waits_before,
+        "checkout_wait_ms": snapshot["checkout_wait_ms"],
+        "checkout_timeouts": snapshot["checkout_timeouts"]
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m database.pool_benchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per stack")
+    parser.add_argument("--concurrency", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--pool-size", type=int, default=int(os.getenv("ASYNC_DB_POOL_SIZE", "20")), help="pool size for both stacks")
+    parser.add_argument("--max-overflow", type=int, default=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10")), help="overflow for both stacks")
+    parser.add_argument("--limit", type=int, default=50, help="roster page size per request")
+    parser.add_argument("--stack", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="defaults to DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    print(f"🏊 [POOL BENCH] {make_url(args.database_url).render_as_string(hide_password=True)}")
+    stacks = ["sync", "async"] if args.stack == "both" else [args.stack]
+    for stack in stacks:
+        result = asyncio.run(run(
+            stack, args.database_url, args.requests, args.concurrency, args.pool_size, args.max_overflow, args.limit
+        ))
+        print(f"🏊 [POOL BENCH] {result}")
+
+if __name__ == "__main__":
+    main()
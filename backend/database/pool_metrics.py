@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class PoolMetrics:
+    """Counters and checkout wait-time histogram for one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._counters = {
+            "checkouts": 0,
+            "checkins": 0,
+            "checkout_timeouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_invalidated": 0
+        }
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def observe_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self._wait_count += 1
+            self._wait_total += ms
+            self._wait_max = max(self._wait_max, ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if ms <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+
+    def snapshot(self) -> Dict:
+        pool = self.pool
+        with self._lock:
+            # Cumulative, Prometheus-style: count of waits <= each bound
+            histogram, running = {}, 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._buckets):
+                running += count
+                histogram[f"le_{bound}ms"] = running
+            histogram["le_inf"] = running + self._buckets[-1]
+
+            return {
+                "pool_size": pool.size() if pool else None,
+                "checked_out": pool.checkedout() if pool else None,
+                "checked_in": pool.checkedin() if pool else None,
+                "overflow_in_use": max(pool.overflow(), 0) if pool else None,
+                "max_overflow": getattr(pool, "_max_overflow", None),
+                **self._counters,
+                "checkout_wait_ms": {
+                    "count": self._wait_count,
+                    "avg": round(self._wait_total / self._wait_count, 3) if self._wait_count else 0.0,
+                    "max": round(self._wait_max, 3),
+                    "histogram": histogram
+                }
+            }
+
+class _TimedPoolMixin:
+    """Times _do_get, the step that blocks while the pool is exhausted"""
+
+    _metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self._metrics is not None:
+                self._metrics.incr("checkout_timeouts")
+            raise
+        finally:
+            if self._metrics is not None:
+                self._metrics.observe_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool, keep reporting to the same metrics
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        if self._metrics is not None:
+            self._metrics.pool = pool
+        return pool
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+def instrument_engine(name: str, engine) -> PoolMetrics:
+    """Attach pool event listeners to a sync engine (use get_async_engine().sync_engine for async)"""
+    metrics = PoolMetrics(name)
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, _TimedPoolMixin):
+        engine.pool._metrics = metrics
+
+    event.listen(engine, "checkout", lambda *args: metrics.incr("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.incr("checkins"))
+    event.listen(engine, "connect", lambda *args: metrics.incr("connections_created"))
+    event.listen(engine, "close", lambda *args: metrics.incr("connections_closed"))
+    event.listen(engine, "close_detached", lambda *args: metrics.incr("connections_closed"))
+    event.listen(engine, "invalidate", lambda *args: metrics.incr("connections_invalidated"))
+
+    pool_metrics[name] = metrics
+    return metrics
+
+def snapshot_all() -> Dict[str, Dict]:
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
@@ -0,0 +1,55 @@
+import threading
+import time
+from typing import Callable, Dict
+
+class DatabaseReadiness:
+    """
+    Readiness state for the /ready probe.
+
+    A successful check is trusted for `success_ttl` seconds. After a failure the
+    database is not contacted again until an exponentially growing backoff
+    (`initial_backoff` doubling up to `max_backoff`) has passed, so probes stay
+    cheap while the database is down. Only one check runs at a time; concurrent
+    probes get the last known state.
+    """
+
+    def __init__(self, check: Callable[[], Dict], success_ttl: float = 5.0,
+                 initial_backoff: float = 1.0, max_backoff: float = 30.0):
+        self._check = check
+        self.success_ttl = success_ttl
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._ready = False
+        self._info: Dict = {}
+        self._error = "not checked yet"
+        self._failures = 0
+        self._next_check_at = 0.0
+
+    def _state(self) -> Dict:
+        state = {"ready": self._ready, "consecutive_failures": self._failures}
+        if self._ready:
+            state.update(self._info)
+        else:
+            state["error"] = self._error
+            state["retry_after"] = max(0.0, round(self._next_check_at - time.monotonic(), 1))
+        return state
+
+    def status(self) -> Dict:
+        if time.monotonic() < self._next_check_at or not self._lock.acquire(blocking=False):
+            return self._state()
+        try:
+            try:
+                self._info = self._check()
+                self._ready = True
+                self._failures = 0
+                self._next_check_at = time.monotonic() + self.success_ttl
+            except Exception as e:
+                self._ready = False
+                self._error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                backoff = min(self.initial_backoff * 2 ** self._failures, self.max_backoff)
+                self._failures += 1
+                self._next_check_at = time.monotonic() + backoff
+            return self._state()
+        finally:
+            self._lock.release()
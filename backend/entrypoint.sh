@@ -20,4 +20,15 @@ else
   echo "⚠ Skipping DB wait (WAIT_FOR_DB=$WAIT_FOR_DB)"
 fi
 
+# Esquema de BD: paso explícito, fuera del arranque del servidor. Por defecto el
+# pod arranca uvicorn directamente; las migraciones se aplican una vez por
+# despliegue con `python -m database.migrate` como job o init container (misma
+# imagen y DATABASE_URL). RUN_MIGRATIONS=true las aplica aquí (desarrollo local).
+if [ "${RUN_MIGRATIONS:-false}" = "true" ]; then
+  echo "⏳ Aplicando migraciones..."
+  python -m database.migrate || exit 1
+else
+  echo "⚠ Skipping migrations (RUN_MIGRATIONS=$RUN_MIGRATIONS)"
+fi
+
 exec uvicorn main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
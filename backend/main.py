@@ -1,36 +1,54 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import sys
-from sqlalchemy import inspect, text
 
 sys.path.append("/app")
 
-from database.connection import engine, Base
-from database.models import Staff, Patient, CertificationPeriod, Document, Signature
+from database.connection import check_connection, env_flag
+from database.readiness import DatabaseReadiness
 from auth import auth_router
-from routes import create_router, search_router, update_router, delete_router
+from auth.security_manager import security_manager
+from scheduling.rollover import start_rollover_scheduler
+from routes.upload_limits import UploadSizeLimitMiddleware, MAX_DOCUMENT_UPLOAD_BYTES, MULTIPART_OVERHEAD_BYTES
+from routes import create_router, search_router, update_router, delete_router, metrics_router, export_router
 
 app = FastAPI()
 
+# Oversized uploads are refused before the multipart body is parsed. Added
+# before CORS so CORS stays outermost and the 413 carries its headers
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={"/documents/upload": MAX_DOCUMENT_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES}
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"], 
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 # Security system enabled without WebSocket notifications
 NOTIFICATIONS_ENABLED = False
 print("🔐 [MAIN] Security System Active (WebSocket disabled)")
 
+db_readiness = DatabaseReadiness(check_connection)
+
+# Startup does not wait on the database: the schema is managed by
+# `python -m database.migrate`, availability is reported by /ready and
+# background jobs retry on their own
 @app.on_event("startup")
 async def startup():
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SET search_path TO public;"))
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tablas creadas o ya existentes.")
+        # Barrido periódico del estado de seguridad (memoria acotada)
+        security_manager.start_sweeper()
+
+        # Rollover diario de periodos de certificación (is_active + patient_current_cert)
+        if env_flag("CERT_ROLLOVER_ENABLED", True):
+            start_rollover_scheduler()
         
         # Security system active (WebSocket notifications disabled)
         print("🔐 [STARTUP] Security system ready - WebSocket notifications disabled")
@@ -42,12 +60,25 @@ app.include_router(create_router)
 app.include_router(search_router)
 app.include_router(update_router)
 app.include_router(delete_router)
+app.include_router(metrics_router, tags=["Metrics"])
+app.include_router(export_router, tags=["Export"])
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
 @app.get("/")
 async def root():
     return {"message": "API is running"}
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up, regardless of the database"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """Readiness: database reachable (checks back off exponentially while it is down)"""
+    state = db_readiness.status()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,5 +2,7 @@ from .create_endpoints import router as create_router
 from .search_endpoints import router as search_router
 from .update_endpoints import router as update_router
 from .delete_endpoints import router as delete_router
+from .metrics_endpoints import router as metrics_router
+from .export_endpoints import router as export_router
 
-__all__ = ["create_router", "search_router", "update_router", "delete_router"]
\ No newline at end of file
+__all__ = ["create_router", "search_router", "update_router", "delete_router", "metrics_router", "export_router"]
\ No newline at end of file
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+import anyio
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from storage import object_storage
+
+# Content-addressed files never change under the same ETag
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single "bytes=" range, None to serve the whole
+    file (no header, multiple ranges or a unit we don't know). Raises ValueError
+    when the range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range starts past the end of the file")
+    return start, end
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def range_allowed(request: Request, etag: str, last_modified_header: str) -> bool:
+    """If-Range: honour Range only while the client's copy is current (strong ETags only)"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified_header
+
+async def conditional_file_response(
+    request: Request,
+    key: str,
+    media_type: str,
+    content_hash: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serve a stored object with validators, 304s and single byte ranges
+    (200/206/304/416). Raises FileNotFoundError when the key is missing.
+
+    Objects with a content hash get a strong ETag and are cached as immutable;
+    without one the ETag is weak (size and mtime) and clients revalidate.
+    """
+    info = await anyio.to_thread.run_sync(object_storage.stat, key)
+    size = info.size
+    if content_hash:
+        etag, cache_control = f'"{content_hash}"', IMMUTABLE_CACHE_CONTROL
+    else:
+        etag, cache_control = f'W/"{size:x}-{int(info.modified.timestamp()):x}"', REVALIDATE_CACHE_CONTROL
+
+    last_modified = last_modified or info.modified
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    last_modified_header = formatdate(last_modified.timestamp(), usegmt=True)
+
+    response_headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Last-Modified": last_modified_header,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes"
+    }
+
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=response_headers)
+
+    byte_range = None
+    if range_allowed(request, etag, last_modified_header):
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    response_headers["Content-Length"] = str(length)
+    # Blocking iterator: StreamingResponse pulls each chunk in the threadpool
+    body = await anyio.to_thread.run_sync(object_storage.open_read, key, start, length)
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type=media_type,
+        headers=response_headers
+    )
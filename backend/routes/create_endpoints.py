@@ -1,9 +1,12 @@
-import os, shutil, re, json
+import os, re, hashlib, uuid
+import anyio
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 from datetime import datetime, timedelta, date
-from database.connection import get_db
+from database.connection import get_db, AsyncSessionLocal
 from database.models import (
     Staff, StaffAssignment, 
     Patient, 
@@ -20,7 +23,7 @@ from schemas import (
     CertificationPeriodResponse,
     DocumentResponse, 
     ExerciseCreate, ExerciseResponse, PatientExerciseAssignmentCreate, 
-    VisitCreate, VisitResponse,
+    VisitCreate, VisitResponse, VisitBulkCreate, VisitScheduleSpec,
     VisitNoteCreate, VisitNoteResponse,
     NoteSectionCreate, NoteSectionResponse,
     NoteTemplateCreate, NoteTemplateResponse,
@@ -28,48 +31,48 @@ from schemas import (
     SignatureCreate, SignatureResponse)
 from auth.security import hash_password
 from auth.auth_middleware import role_required, get_current_user
+from .template_cache import template_cache
+from .patient_search import patient_search_index
+from .upload_limits import MAX_DOCUMENT_UPLOAD_BYTES
+from scheduling.rollover import refresh_current_certs
+from storage import object_storage, blob_key, staging_path, place_blob, remove_file, lock_blob_async
+from storage.strokes import encode_strokes, decode_strokes, strokes_svg, SVG_SIMPLIFY_TOLERANCE
+from scheduling import (
+    DISCIPLINE_ROLES, DISCIPLINE_BY_ROLE, APPROVED_VISITS_FIELD,
+    compile_frequency, period_weeks, plan_visit_dates, MAX_FREQUENCY_WEEKS)
 
 router = APIRouter()
 
-def determine_note_status(sections_data, template, db):
-    if not sections_data or len(sections_data) == 0:
-        return "Scheduled"
-    
-    template_sections = db.query(NoteTemplateSection).filter(
-        NoteTemplateSection.template_id == template.id
-    ).all()
-    
-    total_sections = len(template_sections)
-    sections_with_data = 0
-    
-    for ts in template_sections:
-        section = db.query(NoteSection).filter(NoteSection.id == ts.section_id).first()
-        if section and section.section_name in sections_data:
-            section_data = sections_data[section.section_name]
-            
-            if section_data and isinstance(section_data, dict):
-                has_data = False
-                for key, value in section_data.items():
-                    if value is not None:
-                        if isinstance(value, str) and value.strip():
-                            has_data = True
-                            break
-                        elif isinstance(value, (int, float)) and value > 0:
-                            has_data = True
-                            break
-                        elif isinstance(value, bool) and value:
-                            has_data = True
-                            break
-                        elif isinstance(value, list) and len(value) > 0:
-                            has_data = True
-                            break
-                        elif isinstance(value, dict) and any(v for v in value.values() if v):
-                            has_data = True
-                            break
-                
-                if has_data:
-                    sections_with_data += 1
-    
+def section_has_data(section_data) -> bool:
+    if not section_data or not isinstance(section_data, dict):
+        return False
+
+    for key, value in section_data.items():
+        if value is not None:
+            if isinstance(value, str) and value.strip():
+                return True
+            elif isinstance(value, (int, float)) and value > 0:
+                return True
+            elif isinstance(value, bool) and value:
+                return True
+            elif isinstance(value, list) and len(value) > 0:
+                return True
+            elif isinstance(value, dict) and any(v for v in value.values() if v):
+                return True
+    return False
+
+# section_bitmap is a signed BIGINT
+MAX_BITMAP_SECTIONS = 63
+
+def compute_section_bitmap(sections_data, section_names) -> int:
+    bitmap = 0
+    for position, name in enumerate(section_names):
+        if name in sections_data and section_has_data(sections_data[name]):
+            bitmap |= 1 << position
+    return bitmap
+
+def status_from_bitmap(bitmap: int, total_sections: int) -> str:
+    sections_with_data = bin(bitmap).count("1")
     if sections_with_data == 0:
         return "Scheduled"
     elif sections_with_data == total_sections:
@@ -77,66 +80,67 @@ def determine_note_status(sections_data, template, db):
     else:
         return "Pending"
 
-def ensure_signature_directory(patient_id: int) -> str:
-    """Ensure patient signature directory exists and return path"""
-    patient_dir = os.path.join(SIGNATURES_BASE_PATH, str(patient_id))
-    os.makedirs(patient_dir, exist_ok=True)
-    return patient_dir
+def score_note(sections_data, template, db):
+    """Return (status, section_bitmap) for a full sections_data payload"""
+    if not sections_data or len(sections_data) == 0:
+        return "Scheduled", 0
 
-def generate_signature_filename(signature_id: int, file_type: str) -> str:
-    """Generate filename for signature files"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"signature_{signature_id}_{timestamp}.{file_type}"
+    section_names = template_cache.get_section_names(template.id, db)
+    bitmap = compute_section_bitmap(sections_data, section_names)
+    status = status_from_bitmap(bitmap, len(section_names))
 
-def generate_svg_from_strokes(signature_metadata: dict) -> str:
-    """Generate SVG from JSON strokes data"""
-    strokes = signature_metadata.get('strokes', [])
-    dimensions = signature_metadata.get('dimensions', {'width': 400, 'height': 200})
-    
-    if not strokes:
-        return ''
-    
-    width = dimensions.get('width', 400)
-    height = dimensions.get('height', 200)
-    
-    # Build SVG path data
-    path_data = ''
-    for stroke in strokes:
-        if stroke and len(stroke) > 0:
-            # Move to first point
-            first_point = stroke[0]
-            path_data += f"M{first_point['x']},{first_point['y']}"
-            
-            # Line to subsequent points
-            for point in stroke[1:]:
-                path_data += f"L{point['x']},{point['y']}"
-    
-    # Generate SVG string
-    svg_content = f'''<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">
-    <path d="{path_data}" stroke="#333" stroke-width="2" fill="none" stroke-linecap="round" stroke-linejoin="round"/>
-</svg>'''
-    
-    return svg_content
+    if len(section_names) > MAX_BITMAP_SECTIONS:
+        return status, None
+    return status, bitmap
 
-def save_signature_files(signature_metadata: dict, file_path_base: str) -> tuple:
-    """Save JSON and SVG files, return (json_path, svg_path)"""
-    json_path = f"{file_path_base}.json"
-    svg_path = f"{file_path_base}.svg"
-    
-    # Save JSON metadata
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(signature_metadata, f, indent=2, ensure_ascii=False)
-    
-    # Generate and save SVG
-    svg_content = generate_svg_from_strokes(signature_metadata)
-    if svg_content:
-        with open(svg_path, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
-    
-    return json_path, svg_path
+def determine_note_status(sections_data, template, db):
+    return score_note(sections_data, template, db)[0]
 
-BASE_STORAGE_PATH = "/app/storage/docs"
-SIGNATURES_BASE_PATH = "/app/storage/signatures"
+def reset_section_bitmaps(db: Session):
+    """Stored bitmaps follow template section order, drop them when templates change"""
+    db.query(VisitNote).filter(VisitNote.section_bitmap.isnot(None)).update(
+        {VisitNote.section_bitmap: None}, synchronize_session=False
+    )
+
+def split_signature_metadata(signature_metadata: dict) -> tuple:
+    """(metadata without strokes, encoded stroke_data); raises 400 on malformed strokes"""
+    try:
+        stroke_data = encode_strokes(
+            signature_metadata.get('strokes', []),
+            signature_metadata.get('dimensions')
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metadata = {key: value for key, value in signature_metadata.items() if key != 'strokes'}
+    return metadata, stroke_data
+
+def full_signature_metadata(signature: Signature) -> dict:
+    """Stored metadata with the strokes decoded back in"""
+    if signature.stroke_data is None:
+        return signature.signature_metadata
+    strokes, _ = decode_strokes(signature.stroke_data)
+    return {**signature.signature_metadata, 'strokes': strokes}
+
+def generate_svg_from_strokes(signature_metadata: dict) -> str:
+    """Generate SVG from JSON strokes data"""
+    _, stroke_data = split_signature_metadata(signature_metadata)
+    return strokes_svg(stroke_data, SVG_SIMPLIFY_TOLERANCE)
+
+def signature_svg(signature: Signature) -> str:
+    """Explicit svg_preview if one was set, else rendered from the stored strokes"""
+    if signature.svg_preview:
+        return signature.svg_preview
+    if signature.stroke_data is None:
+        return generate_svg_from_strokes(signature.signature_metadata)
+    return strokes_svg(signature.stroke_data, SVG_SIMPLIFY_TOLERANCE)
+
+def signature_response(signature: Signature) -> SignatureResponse:
+    """Response with the strokes decoded back into signature_metadata and the SVG rendered"""
+    response = SignatureResponse.model_validate(signature)
+    return response.model_copy(update={
+        'signature_metadata': full_signature_metadata(signature),
+        'svg_preview': signature_svg(signature)
+    })
 
 #====================== STAFF ======================#
 
@@ -248,7 +252,10 @@ def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
         is_active=True
     )
     db.add(cert_period)
+    db.flush()
+    refresh_current_certs(db, patient_ids=[new_patient.id])
     db.commit()
+    patient_search_index.invalidate()
 
     return PatientResponse.model_validate(new_patient)
 
@@ -259,12 +266,48 @@ def sanitize_filename(filename: str) -> str:
     name = re.sub(r'[^\w\d-]', '_', name)
     return f"{name}{ext.lower()}"
 
+# Bytes read from the upload per await, and the leading bytes of every PDF
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+
+async def store_upload(file: UploadFile) -> tuple:
+    """
+    Stream an upload into the blob staging area in chunks, hashing as it goes.
+    Returns (staged path, sha256 hex, size); the caller places it with place_blob.
+    """
+    temp_path = await anyio.to_thread.run_sync(staging_path)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if size == 0 and not chunk.startswith(PDF_MAGIC):
+                    raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+                size += len(chunk)
+                if size > MAX_DOCUMENT_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds the {MAX_DOCUMENT_UPLOAD_BYTES // (1024 * 1024)} MB limit."
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(remove_file, temp_path)
+        raise
+    finally:
+        await file.close()
+
+    return temp_path, digest.hexdigest(), size
+
 @router.post("/documents/upload", response_model=DocumentResponse)
-def upload_document(
+async def upload_document(
     file: UploadFile = File(...),
     patient_id: int = Form(None),
-    staff_id: int = Form(None),
-    db: Session = Depends(get_db)
+    staff_id: int = Form(None)
 ):
     if patient_id and staff_id:
         raise HTTPException(status_code=400, detail="Provide only patient_id or staff_id, not both.")
@@ -274,26 +317,37 @@ def upload_document(
         raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
     clean_name = sanitize_filename(file.filename)
-    entity = "patients" if patient_id else "staff"
-    entity_id = patient_id or staff_id
-    folder_path = os.path.join(BASE_STORAGE_PATH, entity, str(entity_id))
-    os.makedirs(folder_path, exist_ok=True)
-    file_path = os.path.join(folder_path, clean_name)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    new_doc = Document(
-        patient_id=patient_id,
-        staff_id=staff_id,
-        file_name=clean_name,
-        file_path=file_path,
-        uploaded_at=datetime.utcnow()
-    )
-    db.add(new_doc)
-    db.commit()
-    db.refresh(new_doc)
-    return new_doc
+    staged_path, content_hash, size = await store_upload(file)
+
+    # The session is only held for the insert, not for the transfer
+    async with AsyncSessionLocal() as db:
+        created = False
+        try:
+            # Held until commit, so a concurrent delete can't unlink the blob this row is about to reuse
+            await lock_blob_async(db, blob_key(content_hash))
+            file_path, created = await anyio.to_thread.run_sync(place_blob, staged_path, content_hash)
+
+            new_doc = Document(
+                patient_id=patient_id,
+                staff_id=staff_id,
+                file_name=clean_name,
+                file_path=file_path,
+                content_hash=content_hash,
+                size_bytes=size,
+                uploaded_at=datetime.utcnow()
+            )
+            db.add(new_doc)
+            await db.commit()
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(remove_file, staged_path)
+                if created:
+                    await anyio.to_thread.run_sync(object_storage.delete, file_path)
+                await db.rollback()
+            raise
+
+        await db.refresh(new_doc)
+        return new_doc
 
 #====================== EXERCISES ======================#
 
@@ -331,54 +385,47 @@ def create_certification_period(patient_id: int, start_date: date, db: Session =
         is_active=is_active
     )
     db.add(new_cert)
+    db.flush()
+    refresh_current_certs(db, patient_ids=[patient_id])
     db.commit()
     db.refresh(new_cert)
     return new_cert
 
 #====================== VISITS ======================#
 
+MAX_BULK_VISITS = 200
+
 @router.post("/visits/assign", response_model=VisitResponse)
 def create_visit(data: VisitCreate, db: Session = Depends(get_db)):
     staff = db.query(Staff).filter(Staff.id == data.staff_id).first()
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found")
 
+    # Locked until commit so concurrent schedulers can't both pass the limit check below
     cert = db.query(CertificationPeriod).filter(
         CertificationPeriod.patient_id == data.patient_id,
         CertificationPeriod.start_date <= data.visit_date,
         CertificationPeriod.end_date >= data.visit_date
-    ).first()
+    ).with_for_update().first()
     if not cert:
         raise HTTPException(status_code=404, detail="No certification period found for given date")
 
     # Validate approved visit limits
     therapy_type = staff.role.upper()
-    discipline_map = {
-        'PT': 'pt_approved_visits',
-        'PTA': 'pt_approved_visits',
-        'OT': 'ot_approved_visits', 
-        'COTA': 'ot_approved_visits',
-        'ST': 'st_approved_visits',
-        'STA': 'st_approved_visits'
-    }
-    
-    approved_field = discipline_map.get(therapy_type)
-    if approved_field:
-        approved_limit = getattr(cert, approved_field, 0)
+    discipline = DISCIPLINE_BY_ROLE.get(therapy_type)
+    if discipline:
+        approved_limit = getattr(cert, APPROVED_VISITS_FIELD[discipline], 0)
         if approved_limit > 0:
             # Count existing visits for this discipline in the certification period
             existing_visits = db.query(Visit).filter(
                 Visit.certification_period_id == cert.id,
-                Visit.therapy_type.in_(['PT', 'PTA'] if therapy_type in ['PT', 'PTA'] 
-                                     else ['OT', 'COTA'] if therapy_type in ['OT', 'COTA']
-                                     else ['ST', 'STA'])
+                Visit.therapy_type.in_(DISCIPLINE_ROLES[discipline])
             ).count()
             
             if existing_visits >= approved_limit:
-                discipline_name = 'PT' if therapy_type in ['PT', 'PTA'] else 'OT' if therapy_type in ['OT', 'COTA'] else 'ST'
                 raise HTTPException(
                     status_code=400, 
-                    detail=f"Cannot schedule visit: {discipline_name} approved visits limit ({approved_limit}) reached. Current visits: {existing_visits}"
+                    detail=f"Cannot schedule visit: {discipline} approved visits limit ({approved_limit}) reached. Current visits: {existing_visits}"
                 )
 
     visit = Visit(
@@ -396,6 +443,172 @@ def create_visit(data: VisitCreate, db: Session = Depends(get_db)):
     db.refresh(visit)
     return visit
 
+def expand_visit_schedule(spec: VisitScheduleSpec, db: Session) -> List[VisitCreate]:
+    """
+    Visit dates for a schedule: a frequency string, or the same weekdays for a
+    number of weeks. Dates stop at the end of the cert period holding start_date;
+    an open-ended x/week frequency without weeks runs to that end.
+    """
+    if spec.weekdays is not None and any(day not in range(7) for day in spec.weekdays):
+        raise HTTPException(status_code=400, detail="Weekdays must be between 0 (Mon) and 6 (Sun).")
+    if spec.weeks is not None and not 1 <= spec.weeks <= MAX_FREQUENCY_WEEKS:
+        raise HTTPException(status_code=400, detail=f"weeks must be between 1 and {MAX_FREQUENCY_WEEKS}.")
+
+    cert = db.query(CertificationPeriod).filter(
+        CertificationPeriod.patient_id == spec.patient_id,
+        CertificationPeriod.start_date <= spec.start_date,
+        CertificationPeriod.end_date >= spec.start_date
+    ).first()
+    if not cert:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No certification period found for patient {spec.patient_id} on {spec.start_date}"
+        )
+
+    if spec.frequency is not None:
+        try:
+            plan = compile_frequency(spec.frequency)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid frequency: {e}")
+        if spec.weeks:
+            weeks = spec.weeks
+        elif plan.repeat_weekly is not None:
+            weeks = period_weeks(spec.start_date, cert.end_date)
+        else:
+            weeks = len(plan.weekly)
+        try:
+            visit_dates = plan_visit_dates(plan, spec.start_date, weeks, spec.weekdays, cert.end_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        if not spec.weeks or not spec.weekdays:
+            raise HTTPException(status_code=400, detail="Schedule needs a frequency, or weeks >= 1 and weekdays.")
+        weekdays = set(spec.weekdays)
+        visit_dates = [
+            day for day in (spec.start_date + timedelta(days=offset) for offset in range(spec.weeks * 7))
+            if day.weekday() in weekdays and day <= cert.end_date
+        ]
+
+    return [
+        VisitCreate(
+            patient_id=spec.patient_id,
+            staff_id=spec.staff_id,
+            visit_date=visit_date,
+            visit_type=spec.visit_type,
+            status=spec.status,
+            scheduled_time=spec.scheduled_time
+        )
+        for visit_date in visit_dates
+    ]
+
+@router.post("/visits/bulk", response_model=List[VisitResponse])
+def create_visits_bulk(data: VisitBulkCreate, db: Session = Depends(get_db)):
+    """Schedule many visits in one transaction; nothing is saved if any visit is rejected"""
+    if (data.visits is None) == (data.schedule is None):
+        raise HTTPException(status_code=400, detail="Provide either visits or schedule, not both.")
+
+    requested = data.visits if data.visits is not None else expand_visit_schedule(data.schedule, db)
+    if not requested:
+        raise HTTPException(status_code=400, detail="No visits to schedule.")
+    if len(requested) > MAX_BULK_VISITS:
+        raise HTTPException(status_code=400, detail=f"Cannot schedule more than {MAX_BULK_VISITS} visits at once.")
+
+    staff_ids = {item.staff_id for item in requested}
+    staff_by_id = {staff.id: staff for staff in db.query(Staff).filter(Staff.id.in_(staff_ids)).all()}
+    missing_staff = sorted(staff_ids - staff_by_id.keys())
+    if missing_staff:
+        raise HTTPException(status_code=404, detail=f"Staff not found: {missing_staff}")
+
+    # Every cert period that can contain one of the requested dates, in one query
+    patient_ids = {item.patient_id for item in requested}
+    certs = db.query(CertificationPeriod).filter(
+        CertificationPeriod.patient_id.in_(patient_ids),
+        CertificationPeriod.start_date <= max(item.visit_date for item in requested),
+        CertificationPeriod.end_date >= min(item.visit_date for item in requested)
+    ).order_by(CertificationPeriod.start_date).all()
+
+    certs_by_patient = {}
+    for cert in certs:
+        certs_by_patient.setdefault(cert.patient_id, []).append(cert)
+
+    def find_cert(item):
+        for cert in certs_by_patient.get(item.patient_id, []):
+            if cert.start_date <= item.visit_date <= cert.end_date:
+                return cert
+        return None
+
+    planned = []
+    for item in requested:
+        cert = find_cert(item)
+        if not cert:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No certification period found for patient {item.patient_id} on {item.visit_date}"
+            )
+        planned.append((item, cert, staff_by_id[item.staff_id].role.upper()))
+
+    # Validate approved visit limits: existing visits per cert and discipline from one aggregate query
+    new_counts = {}
+    for item, cert, therapy_type in planned:
+        discipline = DISCIPLINE_BY_ROLE.get(therapy_type)
+        if discipline:
+            key = (cert.id, discipline)
+            new_counts[key] = new_counts.get(key, 0) + 1
+
+    existing_counts = {}
+    if new_counts:
+        # Lock the limited cert periods (in id order, so overlapping requests can't
+        # deadlock) and re-read their limits; the count and inserts below then run
+        # with no other scheduler adding visits to them until commit
+        db.query(CertificationPeriod).filter(
+            CertificationPeriod.id.in_({cert_id for cert_id, _ in new_counts})
+        ).order_by(CertificationPeriod.id).with_for_update().populate_existing().all()
+
+        rows = db.query(
+            Visit.certification_period_id, Visit.therapy_type, func.count(Visit.id)
+        ).filter(
+            Visit.certification_period_id.in_({cert_id for cert_id, _ in new_counts})
+        ).group_by(Visit.certification_period_id, Visit.therapy_type).all()
+        for cert_id, therapy_type, count in rows:
+            discipline = DISCIPLINE_BY_ROLE.get((therapy_type or '').upper())
+            if discipline:
+                key = (cert_id, discipline)
+                existing_counts[key] = existing_counts.get(key, 0) + count
+
+    certs_by_id = {cert.id: cert for cert in certs}
+    for (cert_id, discipline), count in new_counts.items():
+        approved_limit = getattr(certs_by_id[cert_id], APPROVED_VISITS_FIELD[discipline], 0)
+        existing_visits = existing_counts.get((cert_id, discipline), 0)
+        if approved_limit > 0 and existing_visits + count > approved_limit:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot schedule visits: {discipline} approved visits limit ({approved_limit}) for certification period {cert_id} would be exceeded. Current visits: {existing_visits}, requested: {count}"
+            )
+
+    visits = [
+        Visit(
+            patient_id=item.patient_id,
+            staff_id=item.staff_id,
+            certification_period_id=cert.id,
+            visit_date=item.visit_date,
+            visit_type=item.visit_type,
+            therapy_type=therapy_type,
+            status=item.status,
+            scheduled_time=item.scheduled_time
+        )
+        for item, cert, therapy_type in planned
+    ]
+    try:
+        db.add_all(visits)
+        db.flush()
+        # Build the response before commit expires the rows
+        response = [VisitResponse.model_validate(visit) for visit in visits]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return response
+
 @router.post("/visit-notes/", response_model=VisitNoteResponse)
 def create_visit_note(note_data: VisitNoteCreate, db: Session = Depends(get_db)):
     
@@ -423,18 +636,13 @@ def create_visit_note(note_data: VisitNoteCreate, db: Session = Depends(get_db))
     sections_data = note_data.sections_data
     if not sections_data or len(sections_data) == 0:
         # Create empty sections with names when no data provided
-        sections = db.query(NoteTemplateSection).filter(
-            NoteTemplateSection.template_id == template.id
-        ).order_by(NoteTemplateSection.position.asc()).all()
-        sections_data = {}
-        for s in sections:
-            section = db.query(NoteSection).filter(NoteSection.id == s.section_id).first()
-            if section:
-                sections_data[section.section_name] = {}
+        sections_data = {
+            name: {} for name in template_cache.get_section_names(template.id, db)
+        }
     # Note: Frontend should always send section names, not IDs
     # If we receive IDs, they will be handled in future iterations
     
-    note_status = determine_note_status(sections_data, template, db)
+    note_status, section_bitmap = score_note(sections_data, template, db)
     
     staff = db.query(Staff).filter(Staff.id == visit.staff_id).first()
     therapist_name = staff.name if staff else "Unknown Therapist"
@@ -443,6 +651,7 @@ def create_visit_note(note_data: VisitNoteCreate, db: Session = Depends(get_db))
         visit_id=note_data.visit_id,
         status=note_status,
         sections_data=sections_data,
+        section_bitmap=section_bitmap,
         therapist_name=therapist_name
     )
     db.add(note)
@@ -451,7 +660,12 @@ def create_visit_note(note_data: VisitNoteCreate, db: Session = Depends(get_db))
     if visit:
         visit.status = note_status
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request created the note between the check above and this insert
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Note already exists for this visit")
     db.refresh(note)
     
     return note
@@ -479,6 +693,8 @@ def create_template(template_data: NoteTemplateCreate, db: Session = Depends(get
     for i, section_id in enumerate(template_data.section_ids):
         db.add(NoteTemplateSection(template_id=new_template.id, section_id=section_id, position=i))
     
+    # The new template can become the one existing notes are scored against
+    reset_section_bitmaps(db)
     db.commit()
     return new_template
 
@@ -537,11 +753,10 @@ def create_signature(
     if not signable:
         raise HTTPException(status_code=404, detail=f"{signature_data.signable_type.replace('_', ' ').title()} not found")
     
+    # Strokes are kept once, packed; JSON and SVG are rebuilt from them on read
+    metadata, stroke_data = split_signature_metadata(signature_data.signature_metadata)
+    
     try:
-        # Generate SVG preview from strokes
-        svg_preview = generate_svg_from_strokes(signature_data.signature_metadata)
-        
-        # Create signature record first to get ID
         db_signature = Signature(
             patient_id=signature_data.patient_id,
             entity_type=signature_data.entity_type,
@@ -549,34 +764,16 @@ def create_signature(
             entity_id=signature_data.entity_id,
             signable_type=signature_data.signable_type,
             signable_id=signature_data.signable_id,
-            signature_metadata=signature_data.signature_metadata,
-            svg_preview=svg_preview,
-            file_path=""  # Will be updated after file creation
+            signature_metadata=metadata,
+            stroke_data=stroke_data,
+            file_path=""  # No files: everything is in stroke_data
         )
         
         db.add(db_signature)
-        db.flush()  # Get the ID without committing
-        
-        # Create patient signature directory
-        patient_dir = ensure_signature_directory(signature_data.patient_id)
-        
-        # Generate file paths
-        filename_base = generate_signature_filename(db_signature.id, "")[:-1]  # Remove the dot
-        file_path_base = os.path.join(patient_dir, filename_base)
-        
-        # Save signature files
-        json_path, svg_path = save_signature_files(
-            signature_data.signature_metadata,
-            file_path_base
-        )
-        
-        # Update file path in database
-        db_signature.file_path = file_path_base
-        
         db.commit()
         db.refresh(db_signature)
         
-        return db_signature
+        return signature_response(db_signature)
         
     except Exception as e:
         db.rollback()
@@ -1,5 +1,4 @@
 from fastapi import APIRouter, HTTPException, Depends
-import os
 from sqlalchemy.orm import Session
 from database.connection import get_db
 from database.models import ( 
@@ -14,6 +13,11 @@ from database.models import (
     Visit,
     VisitNote,
     CommunicationRecord)
+from .template_cache import template_cache
+from .create_endpoints import reset_section_bitmaps
+from auth.principal_cache import principal_cache
+from scheduling.rollover import refresh_current_certs
+from storage import release_document_file, delete_unreferenced_blob
 
 router = APIRouter()
 
@@ -24,8 +28,10 @@ def delete_staff(staff_id: int, db: Session = Depends(get_db)):
     staff = db.query(Staff).filter(Staff.id == staff_id).first()
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found.")
+    username = staff.username
     db.delete(staff)
     db.commit()
+    principal_cache.invalidate(username)
     return
 
 @router.delete("/unassign-staff")
@@ -125,7 +131,9 @@ def delete_section(section_id: int, db: Session = Depends(get_db)):
         db.commit()
     
     db.delete(section)
+    reset_section_bitmaps(db)
     db.commit()
+    template_cache.invalidate()
     return {"detail": "Section deleted"}
 
 #///////////////////////// PATIENTS //////////////////////////#
@@ -144,7 +152,10 @@ def delete_certification_period(cert_id: int, db: Session = Depends(get_db)):
             detail="Cannot delete certification period with existing visits."
         )
 
+    patient_id = cert.patient_id
     db.delete(cert)
+    db.flush()
+    refresh_current_certs(db, patient_ids=[patient_id])
     db.commit()
     return {"detail": "Certification period deleted successfully."}
 
@@ -156,17 +167,25 @@ def delete_document(doc_id: int, db: Session = Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found.")
 
-    if doc.file_path and os.path.isfile(doc.file_path):
+    try:
+        # The file goes only with the last Document referencing it
+        orphaned_key = release_document_file(db, doc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to delete document: {str(e)}"
+        )
+
+    # Only once the row is gone for good; a failure here just leaves an unreferenced blob
+    if orphaned_key:
         try:
-            os.remove(doc.file_path)
+            delete_unreferenced_blob(db, orphaned_key)
         except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to delete physical file: {str(e)}"
-            )
+            db.rollback()
+            print(f"⚠️ [STORAGE] Could not remove unreferenced blob {orphaned_key}: {e}")
 
-    db.delete(doc)
-    db.commit()
     return {"detail": "Document deleted successfully."}
 
 #///////////////////////// EXERCISES //////////////////////////#
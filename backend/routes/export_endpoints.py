@@ -0,0 +1,143 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select, exists
+from sqlalchemy.orm import aliased
+from typing import Optional
+from database.connection import AsyncSessionLocal
+from database.models import Patient, CertificationPeriod, Visit, VisitNote
+from auth.auth_middleware import get_current_user
+
+router = APIRouter()
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+#====================== SERIALIZATION ======================#
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Unsupported export value: {type(value).__name__}")
+
+def encode_record(record_type: str, row) -> str:
+    return json.dumps({"type": record_type, **row._mapping}, default=_json_default, separators=(",", ":"))
+
+#====================== QUERIES ======================#
+
+def billing_export_queries(agency_id: Optional[int], start_date: Optional[date], end_date: Optional[date], include_hidden: bool):
+    """(record type, statement) pairs, each selected as plain table rows"""
+    patient_filters = []
+    if agency_id is not None:
+        patient_filters.append(Patient.agency_id == agency_id)
+
+    def overlapping(period):
+        filters = []
+        if start_date:
+            filters.append(period.end_date >= start_date)
+        if end_date:
+            filters.append(period.start_date <= end_date)
+        return filters
+
+    cert_filters = overlapping(CertificationPeriod)
+    if cert_filters:
+        # Only patients with a cert period overlapping the range
+        period = aliased(CertificationPeriod)
+        patient_filters.append(
+            exists().where(period.patient_id == Patient.id, *overlapping(period)).correlate(Patient)
+        )
+
+    visit_filters = []
+    if start_date:
+        visit_filters.append(Visit.visit_date >= start_date)
+    if end_date:
+        visit_filters.append(Visit.visit_date <= end_date)
+    if not include_hidden:
+        visit_filters.append(Visit.is_hidden == False)
+
+    patients = select(Patient.__table__).where(*patient_filters).order_by(Patient.id)
+
+    cert_periods = (
+        select(CertificationPeriod.__table__)
+        .join(Patient, Patient.id == CertificationPeriod.patient_id)
+        .where(*patient_filters, *cert_filters)
+        .order_by(CertificationPeriod.id)
+    )
+
+    visits = (
+        select(Visit.__table__)
+        .join(Patient, Patient.id == Visit.patient_id)
+        .where(*patient_filters, *visit_filters)
+        .order_by(Visit.id)
+    )
+
+    visit_notes = (
+        select(VisitNote.__table__)
+        .join(Visit, Visit.id == VisitNote.visit_id)
+        .join(Patient, Patient.id == Visit.patient_id)
+        .where(*patient_filters, *visit_filters)
+        .order_by(VisitNote.id)
+    )
+
+    return [
+        ("patient", patients),
+        ("cert_period", cert_periods),
+        ("visit", visits),
+        ("visit_note", visit_notes)
+    ]
+
+async def stream_records(queries):
+    # The request's dependency session is closed before the body is streamed,
+    # so the generator owns its session for the lifetime of the response
+    async with AsyncSessionLocal() as db:
+        for record_type, statement in queries:
+            result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for partition in result.partitions():
+                yield record_type, partition
+
+async def ndjson_lines(queries):
+    async for record_type, rows in stream_records(queries):
+        yield "".join(encode_record(record_type, row) + "\n" for row in rows)
+
+async def json_array(queries):
+    yield "["
+    first = True
+    async for record_type, rows in stream_records(queries):
+        chunk = ",\n".join(encode_record(record_type, row) for row in rows)
+        yield chunk if first else ",\n" + chunk
+        first = False
+    yield "]\n"
+
+#====================== BILLING EXPORT ======================#
+
+@router.get("/export/billing")
+def export_billing(
+    agency_id: Optional[int] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    include_hidden: bool = Query(False),
+    format: str = Query("ndjson", regex="^(ndjson|json)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream patients, cert periods, visits and visit notes, one record per line.
+    Rows are read through a server-side cursor so memory does not grow with the export."""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date.")
+
+    queries = billing_export_queries(agency_id, start_date, end_date, include_hidden)
+    filename = f"billing-export-{date.today().isoformat()}.{format}"
+
+    if format == "json":
+        body, media_type = json_array(queries), "application/json"
+    else:
+        body, media_type = ndjson_lines(queries), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
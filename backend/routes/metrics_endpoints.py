@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from auth.auth_middleware import METRICS_ROLES, role_required
+from database.pool_metrics import snapshot_all
+
+router = APIRouter()
+
+#====================== DATABASE POOL ======================#
+
+@router.get("/metrics/db-pool", dependencies=[Depends(role_required(METRICS_ROLES))])
+def get_db_pool_metrics():
+    """Checked-out connections, overflow, checkout wait histogram and churn per engine"""
+    return snapshot_all()
@@ -0,0 +1,121 @@
+import re
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy import select, func, or_, literal, Text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Patient
+
+# Relative weight of a match in each searched column
+SEARCH_WEIGHTS = {
+    "full_name": 1.0,
+    "physician": 0.6,
+    "address": 0.4
+}
+
+# pg_trgm's default word_similarity_threshold, mirrored by the in-memory index
+MIN_SIMILARITY = 0.6
+
+_WORD_SPLIT = re.compile(r"[^\w]+")
+
+def trigrams(value: Optional[str]) -> FrozenSet[str]:
+    """Trigrams the way pg_trgm builds them: lower-cased words padded with two spaces before and one after"""
+    grams = set()
+    for word in _WORD_SPLIT.split((value or "").lower()):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+def word_similarity(query: FrozenSet[str], target: FrozenSet[str]) -> float:
+    """Share of the query's trigrams found in the target (an upper bound of pg_trgm's word_similarity)"""
+    if not query or not target:
+        return 0.0
+    return len(query & target) / len(query)
+
+#====================== POSTGRESQL ======================#
+
+def trigram_search_clauses(q: str):
+    """(match filter, rank expression) served by the ix_patients_*_trgm GIN indexes"""
+    term = literal(q, Text)
+    columns = [getattr(Patient, name) for name in SEARCH_WEIGHTS]
+    match = or_(*[term.op("<%")(column) for column in columns])
+    rank = func.greatest(*[
+        func.coalesce(func.word_similarity(term, column), 0) * weight
+        for column, weight in zip(columns, SEARCH_WEIGHTS.values())
+    ])
+    return match, rank
+
+#====================== IN-MEMORY FALLBACK ======================#
+
+class PatientTrigramIndex:
+    """
+    In-process trigram index over patient name, physician and address, used
+    when the database has no pg_trgm (SQLite test runs). Built on first search
+    and rebuilt after invalidate().
+    """
+
+    def __init__(self):
+        self._entries: Optional[Dict[int, Tuple[FrozenSet[str], ...]]] = None
+        self._postings: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a build that raced with it is not stored
+        self._generation = 0
+        self.builds = 0
+        self.invalidations = 0
+
+    async def _ensure_built(self, db: AsyncSession):
+        with self._lock:
+            if self._entries is not None:
+                return
+            generation = self._generation
+
+        rows = (await db.execute(
+            select(Patient.id, *[getattr(Patient, name) for name in SEARCH_WEIGHTS])
+        )).all()
+        entries = {row[0]: tuple(trigrams(value) for value in row[1:]) for row in rows}
+        postings: Dict[str, set] = {}
+        for patient_id, column_grams in entries.items():
+            for grams in column_grams:
+                for gram in grams:
+                    postings.setdefault(gram, set()).add(patient_id)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries, self._postings = entries, postings
+                self.builds += 1
+
+    async def search(self, q: str, db: AsyncSession) -> Dict[int, float]:
+        """Patient id -> rank for every patient above MIN_SIMILARITY"""
+        await self._ensure_built(db)
+        query = trigrams(q)
+        with self._lock:
+            entries, postings = self._entries or {}, self._postings
+
+        candidates = set()
+        for gram in query:
+            candidates |= postings.get(gram, set())
+
+        ranked = {}
+        for patient_id in candidates:
+            scores = [word_similarity(query, grams) for grams in entries[patient_id]]
+            if max(scores) >= MIN_SIMILARITY:
+                ranked[patient_id] = max(score * weight for score, weight in zip(scores, SEARCH_WEIGHTS.values()))
+        return ranked
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries = None
+            self._postings = {}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "indexed_patients": len(self._entries) if self._entries is not None else None,
+                "trigrams": len(self._postings),
+                "builds": self.builds,
+                "invalidations": self.invalidations
+            }
+
+patient_search_index = PatientTrigramIndex()
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-import os, json, re
-from datetime import date
-from fastapi.responses import FileResponse, HTMLResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+import json, re
+from datetime import date, timedelta
+from fastapi.responses import HTMLResponse
+from sqlalchemy import select, func, and_, or_, case
+from sqlalchemy.orm import joinedload, selectinload, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
-from database.connection import get_db
+from database.connection import get_async_db
 from database.models import (
     Staff, StaffAssignment,
     Patient, 
     Exercise, PatientExerciseAssignment, 
     Visit, VisitNote,
-    CertificationPeriod,
+    CertificationPeriod, PatientCurrentCert,
     Document,
     NoteSection, NoteTemplate, NoteTemplateSection,
     CommunicationRecord, Signature)
@@ -26,6 +29,13 @@ from schemas import (
     NoteTemplateWithSectionsResponse,
     CommunicationRecordResponse, SignatureResponse)
 from auth.auth_middleware import get_current_user
+from .template_cache import template_cache
+from .patient_search import trigram_search_clauses, patient_search_index
+from .conditional_file import conditional_file_response
+from .create_endpoints import signature_response, full_signature_metadata, signature_svg
+from scheduling import (
+    DISCIPLINE_ROLES, DISCIPLINE_BY_ROLE, APPROVED_VISITS_FIELD, FREQUENCY_FIELD,
+    compile_frequency, period_weeks, week_of)
 
 router = APIRouter()
 
@@ -91,40 +101,40 @@ def get_primary_phone_number(contact_info):
 #====================== STAFF ======================#
 
 @router.get("/staff/", response_model=List[StaffResponse])
-def get_active_staff(db: Session = Depends(get_db)):
-    staff_list = db.query(Staff).filter(Staff.is_active == True).all()
+async def get_active_staff(db: AsyncSession = Depends(get_async_db)):
+    staff_list = (await db.scalars(select(Staff).where(Staff.is_active == True))).all()
     return [StaffResponse.model_validate(staff) for staff in staff_list]
 
 @router.get("/patient/{patient_id}/assigned-staff")
-def get_assigned_staff(patient_id: int, cert_period_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
+async def get_assigned_staff(patient_id: int, cert_period_id: Optional[int] = Query(None), db: AsyncSession = Depends(get_async_db)):
     """Get assigned staff with frequencies from selected cert period"""
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     # If no cert_period_id provided, use active one
     if not cert_period_id:
-        cert_period = db.query(CertificationPeriod).filter(
+        cert_period = (await db.scalars(select(CertificationPeriod).where(
             CertificationPeriod.patient_id == patient_id,
             CertificationPeriod.is_active == True
-        ).first()
+        ).limit(1))).first()
         if not cert_period:
             raise HTTPException(status_code=404, detail="No active certification period found")
         cert_period_id = cert_period.id
     else:
-        cert_period = db.query(CertificationPeriod).filter(
-            CertificationPeriod.id == cert_period_id
-        ).first()
+        cert_period = await db.get(CertificationPeriod, cert_period_id)
         if not cert_period:
             raise HTTPException(status_code=404, detail="Certification period not found")
     
     # Get global staff assignments
-    assignments = db.query(StaffAssignment).options(joinedload(StaffAssignment.staff)).filter(
-        StaffAssignment.patient_id == patient_id
-    ).all()
+    assignments = (await db.scalars(
+        select(StaffAssignment)
+        .options(joinedload(StaffAssignment.staff))
+        .where(StaffAssignment.patient_id == patient_id)
+    )).all()
     
     # Get all active staff
-    all_staff = db.query(Staff).filter(Staff.is_active == True).all()
+    all_staff = (await db.scalars(select(Staff).where(Staff.is_active == True))).all()
     
     # Organize by discipline with frequencies from selected cert period  
     disciplines = {
@@ -197,137 +207,188 @@ def get_assigned_staff(patient_id: int, cert_period_id: Optional[int] = Query(No
 
 #====================== PATIENTS ======================#
 
-@router.get("/patients/", response_model=List[PatientResponse])
-def get_all_patients(db: Session = Depends(get_db)):
-    patients = db.query(Patient).all()
-    
-    response_patients = []
+def query_patient_roster():
+    """Patients with agency name and current cert dates, loaded in a single statement"""
+    agency = aliased(Staff)
     today = date.today()
 
-    for patient in patients:
-        agency_name = None
-        if patient.agency_id:
-            agency = db.query(Staff).filter(Staff.id == patient.agency_id).first()
-            if agency:
-                agency_name = agency.name
-        
-        current_cert = (
-            db.query(CertificationPeriod)
-            .filter(
-                CertificationPeriod.patient_id == patient.id,
-                CertificationPeriod.start_date <= today,
-                CertificationPeriod.end_date >= today
-            )
-            .order_by(CertificationPeriod.start_date.desc())
-            .first()
+    return (
+        select(
+            Patient,
+            agency.name.label("agency_name"),
+            PatientCurrentCert.start_date.label("cert_start_date"),
+            PatientCurrentCert.end_date.label("cert_end_date")
         )
+        .outerjoin(agency, agency.id == Patient.agency_id)
+        # Rebuilt daily by scheduling/rollover.py; the date guard hides a row
+        # that expired before the next rollover ran
+        .outerjoin(PatientCurrentCert, and_(
+            PatientCurrentCert.patient_id == Patient.id,
+            PatientCurrentCert.start_date <= today,
+            PatientCurrentCert.end_date >= today
+        ))
+    )
 
-        patient_data = patient.__dict__.copy()
-        patient_data['agency_name'] = agency_name
-        patient_data['primary_phone'] = get_primary_phone_number(patient.contact_info)
-        patient_data['cert_start_date'] = current_cert.start_date if current_cert else None
-        patient_data['cert_end_date'] = current_cert.end_date if current_cert else None
-        
-        response_patients.append(PatientResponse(**patient_data))
+def build_patient_response(patient, agency_name, cert_start_date, cert_end_date) -> PatientResponse:
+    patient_data = patient.__dict__.copy()
+    patient_data['agency_name'] = agency_name
+    patient_data['primary_phone'] = get_primary_phone_number(patient.contact_info)
+    patient_data['cert_start_date'] = cert_start_date
+    patient_data['cert_end_date'] = cert_end_date
+    return PatientResponse(**patient_data)
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def patient_listing_filters(
+    is_active: Optional[bool] = None,
+    agency_id: Optional[int] = None,
+    urgency_level: Optional[str] = None,
+    clinical_grouping: Optional[str] = None,
+    name_prefix: Optional[str] = None
+) -> list:
+    filters = []
+    if is_active is not None:
+        filters.append(Patient.is_active == is_active)
+    if agency_id is not None:
+        filters.append(Patient.agency_id == agency_id)
+    if urgency_level:
+        filters.append(Patient.urgency_level == urgency_level)
+    if clinical_grouping:
+        filters.append(Patient.clinical_grouping == clinical_grouping)
+    if name_prefix:
+        # Matches ix_patients_lower_full_name (text_pattern_ops) on PostgreSQL
+        filters.append(func.lower(Patient.full_name).like(
+            f"{escape_like(name_prefix.strip().lower())}%", escape="\\"
+        ))
+    return filters
 
-    return response_patients
+@router.get("/patients/", response_model=List[PatientResponse])
+async def get_all_patients(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    after_id: Optional[int] = Query(None, description="Keyset cursor: last patient id of the previous page"),
+    is_active: Optional[bool] = Query(None),
+    agency_id: Optional[int] = Query(None),
+    urgency_level: Optional[str] = Query(None),
+    clinical_grouping: Optional[str] = Query(None),
+    name_prefix: Optional[str] = Query(None, min_length=1),
+    include_total: bool = Query(True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List patients ordered by id. Pass limit/after_id to page through the roster;
+    the next cursor and total are returned in X-Next-Cursor and X-Total-Count."""
+    filters = patient_listing_filters(is_active, agency_id, urgency_level, clinical_grouping, name_prefix)
+
+    if include_total:
+        total = await db.scalar(select(func.count(Patient.id)).where(*filters))
+        response.headers["X-Total-Count"] = str(total)
+
+    query = query_patient_roster().where(*filters)
+    if after_id is not None:
+        query = query.where(Patient.id > after_id)
+    query = query.order_by(Patient.id.asc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    rows = (await db.execute(query)).all()
+
+    if limit is not None and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1][0].id)
+
+    return [build_patient_response(*row) for row in rows]
+
+# Declared before /patients/{patient_id} so "search" is not parsed as an id
+@router.get("/patients/search", response_model=List[PatientResponse])
+async def search_patients(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    is_active: Optional[bool] = Query(None),
+    agency_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fuzzy search on name, physician and address, best matches first"""
+    q = q.strip()
+    filters = patient_listing_filters(is_active, agency_id)
+
+    if db.bind.dialect.name == "postgresql":
+        match, rank = trigram_search_clauses(q)
+        rows = (await db.execute(
+            query_patient_roster()
+            .where(match, *filters)
+            .order_by(rank.desc(), Patient.id.asc())
+            .limit(limit)
+        )).all()
+        return [build_patient_response(*row) for row in rows]
+
+    ranked = await patient_search_index.search(q, db)
+    if not ranked:
+        return []
+    rows = (await db.execute(
+        query_patient_roster().where(Patient.id.in_(ranked.keys()), *filters)
+    )).all()
+    rows.sort(key=lambda row: (-ranked[row[0].id], row[0].id))
+    return [build_patient_response(*row) for row in rows[:limit]]
 
 @router.get("/patients/{patient_id}", response_model=PatientResponse)
-def get_patient_by_id(patient_id: int, db: Session = Depends(get_db)):
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
+async def get_patient_by_id(patient_id: int, db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(query_patient_roster().where(Patient.id == patient_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    today = date.today()
-
-    current_cert = (
-        db.query(CertificationPeriod)
-        .filter(
-            CertificationPeriod.patient_id == patient_id,
-            CertificationPeriod.start_date <= today,
-            CertificationPeriod.end_date >= today
-        )
-        .order_by(CertificationPeriod.start_date.desc())
-        .first()
-    )
-
-    agency_name = None
-    if patient.agency_id:
-        agency = db.query(Staff).filter(Staff.id == patient.agency_id).first()
-        if agency:
-            agency_name = agency.name
-
-    response_data = {
-        "id": patient.id,
-        "full_name": patient.full_name,
-        "birthday": patient.birthday,
-        "gender": patient.gender,
-        "address": patient.address,
-        "contact_info": patient.contact_info,
-        "primary_phone": get_primary_phone_number(patient.contact_info),
-        "insurance": patient.insurance,
-        "physician": patient.physician,
-        "agency_name": agency_name,
-        "nursing_diagnosis": patient.nursing_diagnosis,
-        "urgency_level": patient.urgency_level,
-        "prior_level_of_function": patient.prior_level_of_function,
-        "homebound_status": patient.homebound_status,
-        "weight_bearing_status": patient.weight_bearing_status,
-        "referral_reason": patient.referral_reason,
-        "weight": patient.weight,
-        "height": patient.height,
-        "past_medical_history": patient.past_medical_history,
-        "clinical_grouping": patient.clinical_grouping,
-        "required_disciplines": patient.required_disciplines,
-        "is_active": patient.is_active,
-        "cert_start_date": current_cert.start_date if current_cert else None,
-        "cert_end_date": current_cert.end_date if current_cert else None,
-    }
-
-    return PatientResponse(**response_data)
+    return build_patient_response(*row)
 
 @router.get("/staff/{staff_id}/assigned-patients", response_model=List[PatientResponse])
-def get_assigned_patients(staff_id: int, db: Session = Depends(get_db)):
-    assignments = db.query(StaffAssignment).filter(StaffAssignment.staff_id == staff_id).all()
+async def get_assigned_patients(staff_id: int, db: AsyncSession = Depends(get_async_db)):
+    assignments = (await db.scalars(
+        select(StaffAssignment)
+        .options(selectinload(StaffAssignment.patient))
+        .where(StaffAssignment.staff_id == staff_id)
+    )).all()
     patients = [a.patient for a in assignments if a.patient.is_active]
     return patients
 
 #====================== EXERCISES ======================#
 
 @router.get("/exercises/", response_model=List[ExerciseResponse])
-def get_exercises(discipline: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(Exercise)
+async def get_exercises(discipline: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(Exercise)
     if discipline:
-        query = query.filter(Exercise.discipline == discipline)
-    return query.all()
+        query = query.where(Exercise.discipline == discipline)
+    return (await db.scalars(query)).all()
 
 @router.get("/patients/{patient_id}/exercises/", response_model=List[PatientExerciseAssignmentResponse])
-def get_exercises_of_patient(patient_id: int, db: Session = Depends(get_db)):
-    return db.query(PatientExerciseAssignment).filter(PatientExerciseAssignment.patient_id == patient_id).all()
+async def get_exercises_of_patient(patient_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(
+        select(PatientExerciseAssignment).where(PatientExerciseAssignment.patient_id == patient_id)
+    )).all()
 
 #====================== VISITS ======================#
 
+def derive_visit_status(visit_status: Optional[str], note_id: Optional[int], note_status: Optional[str]) -> Optional[str]:
+    """Status shown for a visit, taking its note into account"""
+    if note_id is not None and visit_status == "Scheduled":
+        # If visit has a note and is still "Scheduled", update to "Completed"
+        return "Completed"
+    if note_id is not None and note_status == "Completed":
+        # If note exists and is completed, ensure visit is marked as completed
+        return "Completed"
+    return visit_status
+
 @router.get("/visits/certperiod/{cert_id}", response_model=List[VisitResponse])
-def get_visits_by_certification_period(cert_id: int, db: Session = Depends(get_db)):
-    visits = db.query(Visit).filter(
-        Visit.certification_period_id == cert_id,
-        Visit.is_hidden == False
-    ).all()
-    
-    visit_responses = []
-    for visit in visits:
-        note = db.query(VisitNote).filter(VisitNote.visit_id == visit.id).first()
-        
-        final_status = visit.status
-        if note and visit.status == "Scheduled":
-            # If visit has a note and is still "Scheduled", update to "Completed"
-            final_status = "Completed"
-        elif note and note.status == "Completed":
-            # If note exists and is completed, ensure visit is marked as completed
-            final_status = "Completed"
-        
-        # Create response with note information
-        visit_response = VisitResponse(
+async def get_visits_by_certification_period(cert_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(
+        select(Visit, VisitNote.id.label("note_id"), VisitNote.status.label("note_status"))
+        .outerjoin(VisitNote, VisitNote.visit_id == Visit.id)
+        .where(
+            Visit.certification_period_id == cert_id,
+            Visit.is_hidden == False
+        )
+    )).all()
+
+    return [
+        VisitResponse(
             id=visit.id,
             patient_id=visit.patient_id,
             staff_id=visit.staff_id,
@@ -335,27 +396,25 @@ def get_visits_by_certification_period(cert_id: int, db: Session = Depends(get_d
             visit_date=visit.visit_date,
             visit_type=visit.visit_type,
             therapy_type=visit.therapy_type,
-            status=final_status,
+            status=derive_visit_status(visit.status, note_id, note_status),
             scheduled_time=visit.scheduled_time,
-            note_id=note.id if note else None
+            note_id=note_id
         )
-        
-        visit_responses.append(visit_response)
-    
-    return visit_responses
+        for visit, note_id, note_status in rows
+    ]
 
 @router.get("/visits/certperiod/{cert_id}/deleted", response_model=List[VisitResponse])
-def get_deleted_visits(cert_id: int, db: Session = Depends(get_db)):
-    return db.query(Visit).filter(
+async def get_deleted_visits(cert_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(Visit).where(
         Visit.certification_period_id == cert_id,
         Visit.is_hidden == True
-    ).all()
+    ))).all()
 
 #====================== VISIT NOTES ======================#
 
 @router.get("/visit-notes/{visit_id}", response_model=VisitNoteResponse)
-def get_visit_note(visit_id: int, db: Session = Depends(get_db)):
-    note = db.query(VisitNote).filter(VisitNote.visit_id == visit_id).first()
+async def get_visit_note(visit_id: int, db: AsyncSession = Depends(get_async_db)):
+    note = (await db.scalars(select(VisitNote).where(VisitNote.visit_id == visit_id).limit(1))).first()
 
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
@@ -369,21 +428,20 @@ def get_visit_note(visit_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/templates/{discipline}/{visit_type}", response_model=NoteTemplateWithSectionsResponse)
-def get_specific_template(discipline: str, visit_type: str, db: Session = Depends(get_db)):
-    template = db.query(NoteTemplate).filter(
+async def get_specific_template(discipline: str, visit_type: str, db: AsyncSession = Depends(get_async_db)):
+    template = (await db.scalars(select(NoteTemplate).where(
         NoteTemplate.discipline == discipline,
         NoteTemplate.note_type == visit_type
-    ).first()
+    ).limit(1))).first()
 
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
 
-    template_sections = (
-        db.query(NoteTemplateSection, NoteSection)
+    template_sections = (await db.execute(
+        select(NoteTemplateSection, NoteSection)
         .join(NoteSection, NoteTemplateSection.section_id == NoteSection.id)
-        .filter(NoteTemplateSection.template_id == template.id)
-        .all()
-    )
+        .where(NoteTemplateSection.template_id == template.id)
+    )).all()
 
     sections_with_details = []
     for template_section, section in template_sections:
@@ -407,16 +465,21 @@ def get_specific_template(discipline: str, visit_type: str, db: Session = Depend
     )
 
 @router.get("/note-sections", response_model=List[NoteSectionResponse])
-def get_all_sections(db: Session = Depends(get_db)):
-    return db.query(NoteSection).all()
+async def get_all_sections(db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(NoteSection))).all()
+
+@router.get("/note-templates/cache-stats")
+def get_template_cache_stats():
+    """Hit/miss counters of the template structure cache used for note status"""
+    return template_cache.stats()
 
 #====================== DOCUMENTS ======================#
 
 @router.get("/documents/", response_model=List[DocumentResponse])
-def get_documents_by_entity(
+async def get_documents_by_entity(
     patient_id: Optional[int] = Query(None),
     staff_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if patient_id and staff_id:
         raise HTTPException(status_code=400, detail="Provide only patient_id or staff_id, not both.")
@@ -424,59 +487,139 @@ def get_documents_by_entity(
         raise HTTPException(status_code=400, detail="You must specify either patient_id or staff_id.")
 
     if patient_id:
-        return db.query(Document).filter(Document.patient_id == patient_id).all()
+        return (await db.scalars(select(Document).where(Document.patient_id == patient_id))).all()
 
-    return db.query(Document).filter(Document.staff_id == staff_id).all()
+    return (await db.scalars(select(Document).where(Document.staff_id == staff_id))).all()
 
 @router.get("/documents/{doc_id}/preview")
-def preview_document(doc_id: int, db: Session = Depends(get_db)):
-    doc = db.query(Document).filter(Document.id == doc_id).first()
+async def preview_document(doc_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    doc = await db.get(Document, doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    if not os.path.isfile(doc.file_path):
+    # ETag, 304 and byte ranges so PDF viewers can fetch pages progressively
+    try:
+        return await conditional_file_response(
+            request,
+            doc.file_path,
+            media_type="application/pdf",
+            content_hash=doc.content_hash,
+            last_modified=doc.uploaded_at,
+            headers={
+                "Content-Disposition": f'inline; filename="{doc.file_name}"',
+                "X-Frame-Options": "SAMEORIGIN"
+            }
+        )
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Physical file not found")
 
-    return FileResponse(
-        path=doc.file_path,
-        media_type="application/pdf",
-        filename=doc.file_name,
-        headers={
-            "Content-Disposition": f'inline; filename="{doc.file_name}"',
-            "X-Frame-Options": "SAMEORIGIN"
-        }
-    )
-
 #====================== CERTIFICATION PERIODS ======================#
 
 @router.get("/patient/{patient_id}/cert-periods", response_model=List[CertificationPeriodResponse])
-def get_cert_periods_by_patient(patient_id: int, db: Session = Depends(get_db)):
-    return db.query(CertificationPeriod).filter(
+async def get_cert_periods_by_patient(patient_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(CertificationPeriod).where(
         CertificationPeriod.patient_id == patient_id
-    ).order_by(CertificationPeriod.start_date.desc()).all()
+    ).order_by(CertificationPeriod.start_date.desc()))).all()
+
+@router.get("/cert-periods/{cert_id}/planned-schedule")
+async def get_planned_schedule(cert_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Week-by-week planned visits from each discipline's frequency against scheduled and completed visits"""
+    cert = await db.get(CertificationPeriod, cert_id)
+    if not cert:
+        raise HTTPException(status_code=404, detail="Certification period not found")
+
+    # Same rule as derive_visit_status, evaluated in SQL
+    completed = or_(
+        Visit.status == "Completed",
+        and_(VisitNote.id.is_not(None), Visit.status == "Scheduled"),
+        VisitNote.status == "Completed"
+    )
+    rows = (await db.execute(
+        select(
+            Visit.therapy_type,
+            Visit.visit_date,
+            func.count(Visit.id),
+            func.sum(case((completed, 1), else_=0))
+        )
+        .outerjoin(VisitNote, VisitNote.visit_id == Visit.id)
+        .where(
+            Visit.certification_period_id == cert_id,
+            Visit.is_hidden == False
+        )
+        .group_by(Visit.therapy_type, Visit.visit_date)
+    )).all()
+
+    total_weeks = period_weeks(cert.start_date, cert.end_date)
+    scheduled = {discipline: [0] * total_weeks for discipline in DISCIPLINE_ROLES}
+    completed_counts = {discipline: [0] * total_weeks for discipline in DISCIPLINE_ROLES}
+    for therapy_type, visit_date, visit_count, completed_count in rows:
+        discipline = DISCIPLINE_BY_ROLE.get((therapy_type or '').upper())
+        week = week_of(cert.start_date, visit_date)
+        if discipline and 0 <= week < total_weeks:
+            scheduled[discipline][week] += visit_count
+            completed_counts[discipline][week] += completed_count or 0
+
+    disciplines = {}
+    for discipline in DISCIPLINE_ROLES:
+        frequency = getattr(cert, FREQUENCY_FIELD[discipline])
+        try:
+            plan = compile_frequency(frequency)
+            planned, error = plan.weeks(total_weeks), None
+        except ValueError as e:
+            plan, planned, error = None, [0] * total_weeks, str(e)
+
+        disciplines[discipline] = {
+            'frequency': frequency,
+            'frequency_error': error,
+            'approved_visits': getattr(cert, APPROVED_VISITS_FIELD[discipline]) or 0,
+            'planned': sum(planned),
+            'prn': plan.prn if plan else 0,
+            'scheduled': sum(scheduled[discipline]),
+            'completed': sum(completed_counts[discipline]),
+            'weeks': [
+                {
+                    'week': week + 1,
+                    'start_date': cert.start_date + timedelta(weeks=week),
+                    'end_date': min(cert.start_date + timedelta(weeks=week, days=6), cert.end_date),
+                    'planned': planned[week],
+                    'scheduled': scheduled[discipline][week],
+                    'completed': completed_counts[discipline][week]
+                }
+                for week in range(total_weeks)
+            ]
+        }
+
+    return {
+        'certification_period_id': cert.id,
+        'start_date': cert.start_date,
+        'end_date': cert.end_date,
+        'disciplines': disciplines
+    }
 
 @router.get("/communication-records/cert-period/{cert_period_id}", response_model=List[CommunicationRecordResponse])
-def get_communication_records_by_cert_period(cert_period_id: int, db: Session = Depends(get_db)):
-    records = db.query(CommunicationRecord).filter(
-        CommunicationRecord.certification_period_id == cert_period_id
-    ).order_by(CommunicationRecord.created_at.desc()).all()
+async def get_communication_records_by_cert_period(cert_period_id: int, db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(
+        select(CommunicationRecord, Staff.name)
+        .outerjoin(Staff, Staff.id == CommunicationRecord.created_by)
+        .where(CommunicationRecord.certification_period_id == cert_period_id)
+        .order_by(CommunicationRecord.created_at.desc())
+    )).all()
     
     results = []
-    for record in records:
-        staff = db.query(Staff).filter(Staff.id == record.created_by).first()
+    for record, staff_name in rows:
         response_data = record.__dict__.copy()
-        response_data["staff_name"] = staff.name if staff else None
+        response_data["staff_name"] = staff_name
         results.append(response_data)
     
     return results
 
 @router.get("/communication-records/{record_id}", response_model=CommunicationRecordResponse)
-def get_communication_record(record_id: int, db: Session = Depends(get_db)):
-    record = db.query(CommunicationRecord).filter(CommunicationRecord.id == record_id).first()
+async def get_communication_record(record_id: int, db: AsyncSession = Depends(get_async_db)):
+    record = await db.get(CommunicationRecord, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Communication record not found")
     
-    staff = db.query(Staff).filter(Staff.id == record.created_by).first()
+    staff = await db.get(Staff, record.created_by)
     response_data = record.__dict__.copy()
     response_data["staff_name"] = staff.name if staff else None
     
@@ -484,8 +627,15 @@ def get_communication_record(record_id: int, db: Session = Depends(get_db)):
 
 #====================== SIGNATURES ======================#
 
+async def signature_list_response(signatures, include_strokes: bool) -> list:
+    """List items shaped like GET /signatures/{id}; without strokes, the stored rows as-is"""
+    if not include_strokes:
+        return signatures
+    # Decoding strokes and rendering SVGs is CPU work, keep it off the event loop
+    return await run_in_threadpool(lambda: [signature_response(signature) for signature in signatures])
+
 @router.get("/signatures/search", response_model=List[SignatureResponse])
-def search_signatures(
+async def search_signatures(
     patient_id: Optional[int] = Query(None),
     entity_type: Optional[str] = Query(None),
     entity_id: Optional[int] = Query(None),
@@ -493,97 +643,96 @@ def search_signatures(
     signable_id: Optional[int] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    include_strokes: bool = Query(True, description="False skips strokes and svg_preview for a lighter listing"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Search signatures with filters"""
     
-    query = db.query(Signature)
+    query = select(Signature)
     
     # Apply filters
     if patient_id:
-        query = query.filter(Signature.patient_id == patient_id)
+        query = query.where(Signature.patient_id == patient_id)
     
     if entity_type:
-        query = query.filter(Signature.entity_type == entity_type)
+        query = query.where(Signature.entity_type == entity_type)
     
     if entity_id:
-        query = query.filter(Signature.entity_id == entity_id)
+        query = query.where(Signature.entity_id == entity_id)
     
     if signable_type:
-        query = query.filter(Signature.signable_type == signable_type)
+        query = query.where(Signature.signable_type == signable_type)
     
     if signable_id:
-        query = query.filter(Signature.signable_id == signable_id)
+        query = query.where(Signature.signable_id == signable_id)
     
     # Order by creation date (most recent first)
     query = query.order_by(Signature.created_at.desc())
     
     # Apply pagination
-    signatures = query.offset(offset).limit(limit).all()
+    signatures = (await db.scalars(query.offset(offset).limit(limit))).all()
     
-    return signatures
+    return await signature_list_response(signatures, include_strokes)
 
 @router.get("/signatures/{signature_id}", response_model=SignatureResponse)
-def get_signature(signature_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+async def get_signature(signature_id: int, db: AsyncSession = Depends(get_async_db), current_user: dict = Depends(get_current_user)):
     """Get signature by ID"""
     
-    signature = db.query(Signature).filter(Signature.id == signature_id).first()
+    signature = await db.get(Signature, signature_id)
     if not signature:
         raise HTTPException(status_code=404, detail="Signature not found")
     
-    return signature
+    return signature_response(signature)
 
 @router.get("/patients/{patient_id}/signatures", response_model=List[SignatureResponse])
-def get_patient_signatures(
+async def get_patient_signatures(
     patient_id: int,
     limit: int = Query(20, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    include_strokes: bool = Query(True, description="False skips strokes and svg_preview for a lighter listing"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all signatures for a specific patient"""
     
     # Verify patient exists
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    signatures = (db.query(Signature)
-                 .filter(Signature.patient_id == patient_id)
+    signatures = (await db.scalars(select(Signature)
+                 .where(Signature.patient_id == patient_id)
                  .order_by(Signature.created_at.desc())
                  .offset(offset)
-                 .limit(limit)
-                 .all())
+                 .limit(limit))).all()
     
-    return signatures
+    return await signature_list_response(signatures, include_strokes)
 
 @router.get("/signatures/{signature_id}/files")
-def get_signature_files(
+async def get_signature_files(
     signature_id: int,
     file_type: str = Query(..., regex="^(json|svg)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get signature file content (JSON or SVG)"""
     
-    signature = db.query(Signature).filter(Signature.id == signature_id).first()
+    signature = await db.get(Signature, signature_id)
     if not signature:
         raise HTTPException(status_code=404, detail="Signature not found")
     
-    file_path = f"{signature.file_path}.{file_type}"
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail=f"{file_type.upper()} file not found")
-    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
+        # Rebuilt from the packed strokes; decoding is CPU work, keep it off the event loop
         if file_type == "json":
-            return {"content": json.loads(content)}
+            return {"content": await run_in_threadpool(full_signature_metadata, signature)}
         else:  # svg
+            content = await run_in_threadpool(signature_svg, signature)
+            if not content:
+                raise HTTPException(status_code=404, detail="SVG file not found")
             return {"content": content, "content_type": "image/svg+xml"}
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading {file_type} file: {str(e)}")
\ No newline at end of file
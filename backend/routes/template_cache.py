@@ -0,0 +1,80 @@
+import threading
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from database.models import NoteSection, NoteTemplateSection
+
+# (section_name, is_required) in template order
+TemplateStructure = Tuple[Tuple[str, bool], ...]
+
+class TemplateStructureCache:
+    """In-process cache of the ordered section layout of each note template"""
+
+    def __init__(self):
+        self._structures: Dict[int, TemplateStructure] = {}
+        self._positions: Dict[TemplateStructure, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced with it is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_structure(self, template_id: int, db: Session) -> TemplateStructure:
+        with self._lock:
+            structure = self._structures.get(template_id)
+            if structure is not None:
+                self.hits += 1
+                return structure
+            self.misses += 1
+            generation = self._generation
+
+        rows = (
+            db.query(NoteSection.section_name, NoteSection.is_required)
+            .join(NoteTemplateSection, NoteTemplateSection.section_id == NoteSection.id)
+            .filter(NoteTemplateSection.template_id == template_id)
+            .order_by(NoteTemplateSection.position.asc(), NoteTemplateSection.id.asc())
+            .all()
+        )
+        structure = tuple((name, bool(is_required)) for name, is_required in rows)
+
+        with self._lock:
+            if generation == self._generation:
+                self._structures[template_id] = structure
+        return structure
+
+    def get_section_names(self, template_id: int, db: Session) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.get_structure(template_id, db))
+
+    def get_section_positions(self, template_id: int, db: Session) -> Dict[str, int]:
+        """Section name -> bit position used by VisitNote.section_bitmap"""
+        structure = self.get_structure(template_id, db)
+        with self._lock:
+            positions = self._positions.get(structure)
+            if positions is None:
+                positions = {name: i for i, (name, _) in enumerate(structure)}
+                self._positions[structure] = positions
+            return positions
+
+    def invalidate(self, template_id: Optional[int] = None) -> None:
+        """Drop one template, or every template when a shared section changed"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if template_id is None:
+                self._structures.clear()
+            else:
+                self._structures.pop(template_id, None)
+            self._positions.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_templates": len(self._structures),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+template_cache = TemplateStructureCache()
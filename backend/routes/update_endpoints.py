@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, Body, Query
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List, Dict
 from datetime import date, datetime, timedelta
-import json, os
+import json
 from database.connection import get_db
 from database.models import (
     Staff, 
@@ -18,12 +18,19 @@ from schemas import (
     ExerciseResponse, PatientUpdate,
     NoteSectionResponse, NoteSectionUpdate,
     NoteTemplateUpdate, NoteTemplateResponse,
-    VisitNoteResponse, VisitNoteUpdate,
+    VisitNoteResponse, VisitNoteUpdate, VisitNotePatch,
     CommunicationRecordUpdate, CommunicationRecordResponse,
     SignatureUpdate, SignatureResponse)
 from auth.security import hash_password
 from auth.auth_middleware import role_required, get_current_user
-from .create_endpoints import determine_note_status
+from auth.principal_cache import principal_cache
+from .create_endpoints import (
+    score_note, section_has_data, status_from_bitmap,
+    compute_section_bitmap, reset_section_bitmaps, MAX_BITMAP_SECTIONS,
+    split_signature_metadata, signature_response)
+from .template_cache import template_cache
+from .patient_search import patient_search_index
+from scheduling.rollover import refresh_current_certs
 
 router = APIRouter()
 
@@ -48,6 +55,7 @@ def update_staff_info(
     staff = db.query(Staff).filter(Staff.id == staff_id).first()
     if not staff:
         raise HTTPException(status_code=404, detail="Staff not found.")
+    previous_username = staff.username
 
     if email:
         existing_email = db.query(Staff).filter(Staff.email == email, Staff.id != staff_id).first()
@@ -83,6 +91,8 @@ def update_staff_info(
         staff.password = hash_password(password)
 
     db.commit()
+    principal_cache.invalidate(previous_username)
+    principal_cache.invalidate(staff.username)
     db.refresh(staff)
 
     return {"message": "Staff updated successfully.", "staff_id": staff.id}
@@ -183,6 +193,8 @@ def update_patient_info(
 
     db.commit()
     db.refresh(patient)
+    if full_name is not None or physician is not None or address is not None:
+        patient_search_index.invalidate()
 
     return {"message": "Patient updated successfully.", "patient_id": patient.id}
 
@@ -207,6 +219,7 @@ def update_visit(
         raise HTTPException(status_code=404, detail="Visit not found")
 
     original_visit_type = visit.visit_type
+    original_therapy_type = visit.therapy_type
 
     update_fields = {
         "patient_id": patient_id,
@@ -223,6 +236,12 @@ def update_visit(
         if value is not None:
             setattr(visit, field, value)
 
+    # The note's bitmap follows the template picked by therapy and visit type
+    if (visit.visit_type, visit.therapy_type) != (original_visit_type, original_therapy_type):
+        db.query(VisitNote).filter(VisitNote.visit_id == visit.id).update(
+            {VisitNote.section_bitmap: None}, synchronize_session=False
+        )
+
     db.commit()
     db.refresh(visit)
 
@@ -297,8 +316,11 @@ def update_section(section_id: int, data: NoteSectionUpdate, db: Session = Depen
     for field, value in data.dict(exclude_unset=True).items():
         setattr(section, field, value)
 
+    reset_section_bitmaps(db)
     db.commit()
     db.refresh(section)
+    # A section can belong to any number of templates
+    template_cache.invalidate()
     return section
 
 @router.put("/note-templates/{template_id}", response_model=NoteTemplateResponse)
@@ -341,8 +363,10 @@ def update_template(
             NoteTemplateSection.section_id.in_(remove_section_ids)
         ).delete(synchronize_session=False)
 
+    reset_section_bitmaps(db)
     db.commit()
     db.refresh(template)
+    template_cache.invalidate(template.id)
     return template
 
 @router.put("/visit-notes/{note_id}", response_model=VisitNoteResponse)
@@ -361,6 +385,7 @@ def update_visit_note(note_id: int, data: VisitNoteUpdate, db: Session = Depends
 
     if data.sections_data is not None:
         note.sections_data = data.sections_data
+        note.section_bitmap = None
         
         visit = db.query(Visit).filter(Visit.id == note.visit_id).first()
         if visit:
@@ -375,14 +400,78 @@ def update_visit_note(note_id: int, data: VisitNoteUpdate, db: Session = Depends
             ).first()
             
             if template:
-                auto_status = determine_note_status(data.sections_data, template, db)
+                auto_status, section_bitmap = score_note(data.sections_data, template, db)
                 note.status = auto_status
+                note.section_bitmap = section_bitmap
                 visit.status = auto_status
 
     db.commit()
     db.refresh(note)
     
     
+    return note
+
+@router.patch("/visit-notes/{note_id}", response_model=VisitNoteResponse)
+def patch_visit_note(note_id: int, data: VisitNotePatch, db: Session = Depends(get_db)):
+    """Merge a delta of one or more sections and rescore only those sections"""
+    # Row lock: concurrent autosaves of one note merge one after the other
+    # instead of each merging into the same stale sections_data
+    note = (
+        db.query(VisitNote)
+        .filter(VisitNote.id == note_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if not note:
+        raise HTTPException(status_code=404, detail="Visit note not found")
+
+    sections_data = dict(note.sections_data or {})
+    for section_name, delta in data.sections.items():
+        current = sections_data.get(section_name)
+        merged = dict(current) if isinstance(current, dict) else {}
+        merged.update(delta)
+        sections_data[section_name] = merged
+    # Reassign so the JSON column is flagged as modified
+    note.sections_data = sections_data
+
+    visit = db.query(Visit).filter(Visit.id == note.visit_id).first()
+    template = None
+    if visit:
+        template = db.query(NoteTemplate).filter_by(
+            discipline=visit.therapy_type.upper(),
+            note_type=visit.visit_type,
+            is_active=True
+        ).first()
+
+    if template:
+        positions = template_cache.get_section_positions(template.id, db)
+
+        if len(positions) > MAX_BITMAP_SECTIONS:
+            auto_status, section_bitmap = score_note(sections_data, template, db)
+        else:
+            section_bitmap = note.section_bitmap
+            if section_bitmap is None:
+                # First incremental save, or templates changed since the last one
+                section_bitmap = compute_section_bitmap(sections_data, positions)
+            else:
+                for section_name in data.sections:
+                    position = positions.get(section_name)
+                    if position is None:
+                        continue
+                    if section_has_data(sections_data[section_name]):
+                        section_bitmap |= 1 << position
+                    else:
+                        section_bitmap &= ~(1 << position)
+            auto_status = status_from_bitmap(section_bitmap, len(positions))
+
+        note.status = auto_status
+        note.section_bitmap = section_bitmap
+        visit.status = auto_status
+
+    db.commit()
+    db.refresh(note)
+
     return note
 
 #====================== CERTIFICATION PERIODS ======================#
@@ -436,6 +525,10 @@ def update_certification_period(cert_id: int, cert_update: CertificationPeriodUp
     patient_active = cert.patient.is_active if cert.patient else False
     cert.is_active = patient_active and (cert.start_date <= today <= cert.end_date)
 
+    if "start_date" in update_data or "end_date" in update_data:
+        db.flush()
+        refresh_current_certs(db, today, patient_ids=[cert.patient_id])
+
     db.commit()
     db.refresh(cert)
     return cert
@@ -509,45 +602,29 @@ def update_signature(
     if not signature:
         raise HTTPException(status_code=404, detail="Signature not found")
     
+    if signature_update.signature_metadata is not None:
+        metadata, stroke_data = split_signature_metadata(signature_update.signature_metadata)
+    
     try:
         # Update fields
         if signature_update.entity_name is not None:
             signature.entity_name = signature_update.entity_name
         
         if signature_update.signature_metadata is not None:
-            signature.signature_metadata = signature_update.signature_metadata
-            
-            # Regenerate SVG from new strokes data
-            from .create_endpoints import generate_svg_from_strokes
-            new_svg = generate_svg_from_strokes(signature_update.signature_metadata)
-            signature.svg_preview = new_svg
-            
-            # Update JSON file
-            json_path = f"{signature.file_path}.json"
-            if os.path.exists(json_path):
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(signature_update.signature_metadata, f, indent=2, ensure_ascii=False)
-            
-            # Update SVG file
-            svg_path = f"{signature.file_path}.svg"
-            if new_svg:
-                with open(svg_path, 'w', encoding='utf-8') as f:
-                    f.write(new_svg)
+            signature.signature_metadata = metadata
+            signature.stroke_data = stroke_data
+            # New strokes: drop any explicit SVG so it is rendered from them
+            signature.svg_preview = None
         
         if signature_update.svg_preview is not None:
             signature.svg_preview = signature_update.svg_preview
-            
-            # Update SVG file
-            svg_path = f"{signature.file_path}.svg"
-            with open(svg_path, 'w', encoding='utf-8') as f:
-                f.write(signature_update.svg_preview)
         
         signature.updated_at = datetime.utcnow()
         
         db.commit()
         db.refresh(signature)
         
-        return signature
+        return signature_response(signature)
         
     except Exception as e:
         db.rollback()
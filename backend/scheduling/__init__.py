@@ -0,0 +1,20 @@
+from .disciplines import (
+    DISCIPLINE_ROLES,
+    DISCIPLINE_BY_ROLE,
+    APPROVED_VISITS_FIELD,
+    FREQUENCY_FIELD
+)
+from .frequency import (
+    FrequencyPlan,
+    compile_frequency,
+    period_weeks,
+    week_of,
+    plan_visit_dates,
+    MAX_FREQUENCY_WEEKS
+)
+
+__all__ = [
+    "DISCIPLINE_ROLES", "DISCIPLINE_BY_ROLE", "APPROVED_VISITS_FIELD", "FREQUENCY_FIELD",
+    "FrequencyPlan", "compile_frequency", "period_weeks", "week_of", "plan_visit_dates",
+    "MAX_FREQUENCY_WEEKS"
+]
@@ -0,0 +1,19 @@
+# Staff roles that schedule visits under each discipline (therapist and assistant)
+DISCIPLINE_ROLES = {
+    'PT': ['PT', 'PTA'],
+    'OT': ['OT', 'COTA'],
+    'ST': ['ST', 'STA']
+}
+DISCIPLINE_BY_ROLE = {role: discipline for discipline, roles in DISCIPLINE_ROLES.items() for role in roles}
+
+# CertificationPeriod columns per discipline
+APPROVED_VISITS_FIELD = {
+    'PT': 'pt_approved_visits',
+    'OT': 'ot_approved_visits',
+    'ST': 'st_approved_visits'
+}
+FREQUENCY_FIELD = {
+    'PT': 'pt_frequency',
+    'OT': 'ot_frequency',
+    'ST': 'st_frequency'
+}
@@ -0,0 +1,130 @@
+"""
+Visit frequency strings used on certification periods.
+
+    "2w4"          2 visits a week for 4 weeks
+    "2w4, 1w4"     segments run one after another
+    "3x/week"      3 visits every week until the end of the period
+    "PRN" / "2 PRN" / "PRN x3"
+                   as-needed visits; counted but not placed on the calendar
+
+Compiled plans are immutable and memoized, so the same handful of strings
+shared by every certification period are only parsed once per process.
+"""
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+_SEGMENT_SPLIT = re.compile(r"[,;]")
+_WEEKS_PATTERN = re.compile(r"^(\d+)\s*w\s*(\d+)$")
+_PER_WEEK_PATTERN = re.compile(r"^(\d+)\s*x?\s*(?:/|per|a)?\s*(?:w|wk|week)$")
+_PRN_PATTERN = re.compile(r"^(?:(\d+)\s*x?\s*prn|prn(?:\s*x?\s*(\d+))?)$")
+
+# Longest plan accepted: a 60-day certification period spans 9 (partial) weeks
+MAX_FREQUENCY_WEEKS = 10
+
+# Spread of visit days (0 = Monday) for N visits in a week, weekdays first
+DEFAULT_VISIT_DAYS = {
+    1: (2,),
+    2: (1, 3),
+    3: (0, 2, 4),
+    4: (0, 1, 3, 4),
+    5: (0, 1, 2, 3, 4),
+    6: (0, 1, 2, 3, 4, 5),
+    7: (0, 1, 2, 3, 4, 5, 6)
+}
+
+class FrequencyPlan(NamedTuple):
+    weekly: Tuple[int, ...]        # visits per week for the fixed "NwM" segments
+    repeat_weekly: Optional[int]   # "Nx/week" visits for every week after them
+    prn: int                       # as-needed visits
+
+    def weeks(self, total_weeks: int) -> List[int]:
+        """Planned visits for each week of a period that is total_weeks long"""
+        planned = list(self.weekly[:total_weeks])
+        if self.repeat_weekly is not None:
+            planned += [self.repeat_weekly] * (total_weeks - len(planned))
+        return planned + [0] * (total_weeks - len(planned))
+
+    def total(self, total_weeks: int) -> int:
+        return sum(self.weeks(total_weeks))
+
+@lru_cache(maxsize=512)
+def compile_frequency(frequency: Optional[str]) -> FrequencyPlan:
+    """Parse a frequency string; raises ValueError for anything unrecognized"""
+    weekly: List[int] = []
+    repeat_weekly = None
+    prn = 0
+
+    for segment in _SEGMENT_SPLIT.split((frequency or "").strip().lower()):
+        segment = segment.strip()
+        if not segment:
+            continue
+
+        match = _WEEKS_PATTERN.match(segment)
+        if match:
+            if repeat_weekly is not None:
+                raise ValueError(f"'{segment}' cannot follow an open-ended x/week segment")
+            visits, weeks = int(match.group(1)), int(match.group(2))
+            if visits > 7:
+                raise ValueError(f"'{segment}' has more than 7 visits a week")
+            if len(weekly) + weeks > MAX_FREQUENCY_WEEKS:
+                raise ValueError(f"'{frequency}' runs longer than {MAX_FREQUENCY_WEEKS} weeks")
+            weekly.extend([visits] * weeks)
+            continue
+
+        match = _PER_WEEK_PATTERN.match(segment)
+        if match:
+            if repeat_weekly is not None:
+                raise ValueError(f"Only one open-ended x/week segment is allowed: '{frequency}'")
+            repeat_weekly = int(match.group(1))
+            if repeat_weekly > 7:
+                raise ValueError(f"'{segment}' has more than 7 visits a week")
+            continue
+
+        match = _PRN_PATTERN.match(segment)
+        if match:
+            prn += int(match.group(1) or match.group(2) or 1)
+            continue
+
+        raise ValueError(f"Unrecognized frequency segment '{segment}'")
+
+    return FrequencyPlan(weekly=tuple(weekly), repeat_weekly=repeat_weekly, prn=prn)
+
+def period_weeks(start_date: date, end_date: date) -> int:
+    """Number of (possibly partial) 7-day weeks from start_date through end_date"""
+    return (end_date - start_date).days // 7 + 1
+
+def week_of(start_date: date, visit_date: date) -> int:
+    """Zero-based week index of visit_date, with weeks counted from start_date"""
+    return (visit_date - start_date).days // 7
+
+def visit_days(visits: int, preferred: Optional[List[int]] = None) -> Tuple[int, ...]:
+    """Weekdays to use for a week with the given number of visits"""
+    if visits <= 0:
+        return ()
+    if preferred:
+        days = tuple(sorted(set(preferred)))
+        if len(days) < visits:
+            raise ValueError(f"{visits} visits a week need at least {visits} weekdays, got {len(days)}")
+        return days[:visits]
+    return DEFAULT_VISIT_DAYS[visits]
+
+def plan_visit_dates(plan: FrequencyPlan, start_date: date, total_weeks: int,
+                     preferred_days: Optional[List[int]] = None, end_date: Optional[date] = None) -> List[date]:
+    """
+    Concrete visit dates for a plan, one 7-day week at a time from start_date.
+    Dates after end_date (the cert period's last day) are dropped, so a final
+    partial week never spills past the period.
+    """
+    if total_weeks > MAX_FREQUENCY_WEEKS:
+        raise ValueError(f"Cannot plan more than {MAX_FREQUENCY_WEEKS} weeks of visits")
+    dates = []
+    for week, visits in enumerate(plan.weeks(total_weeks)):
+        days = set(visit_days(visits, preferred_days))
+        week_start = start_date + timedelta(weeks=week)
+        dates.extend(
+            day for day in (week_start + timedelta(days=offset) for offset in range(7))
+            if day.weekday() in days and (end_date is None or day <= end_date)
+        )
+    return dates
@@ -0,0 +1,165 @@
+"""
+Daily certification period rollover.
+
+Once a day (and at startup, to catch up) every CertificationPeriod.is_active is
+recomputed in a single UPDATE and patient_current_cert is rebuilt, so patient
+reads join one precomputed row instead of range-scanning cert periods.
+
+Writes that change a patient's cert periods call refresh_current_certs() for
+that patient inside their own transaction.
+
+Run once by hand or from cron:
+
+    python -m scheduling.rollover
+"""
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select, update, delete, func, and_, literal, text
+from sqlalchemy.orm import Session
+from database.connection import SessionLocal
+from database.models import Patient, CertificationPeriod, PatientCurrentCert
+
+# Seconds after local midnight to run, and between retries after a failure
+ROLLOVER_DELAY_SECONDS = int(os.getenv("CERT_ROLLOVER_DELAY_SECONDS", "60"))
+ROLLOVER_RETRY_SECONDS = int(os.getenv("CERT_ROLLOVER_RETRY_SECONDS", "300"))
+
+# pg_try_advisory_xact_lock key so only one worker runs each rollover
+ROLLOVER_LOCK_ID = 72_019_311
+
+_rollover_task: Optional[asyncio.Task] = None
+
+def roll_over_active_flags(db: Session, today: date) -> int:
+    """Set is_active = patient active and today inside the period, for rows where it drifted"""
+    should_be_active = and_(
+        func.coalesce(Patient.is_active, False),
+        CertificationPeriod.start_date <= today,
+        CertificationPeriod.end_date >= today
+    )
+    result = db.execute(
+        update(CertificationPeriod)
+        .where(
+            CertificationPeriod.patient_id == Patient.id,
+            CertificationPeriod.is_active.is_distinct_from(should_be_active)
+        )
+        .values(is_active=should_be_active)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def _upsert(db: Session):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(PatientCurrentCert)
+
+def refresh_current_certs(db: Session, today: Optional[date] = None, patient_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Rebuild patient_current_cert rows (all, or only patient_ids) from certification_periods.
+
+    Upserts the covering cert per patient and then drops rows for patients left
+    without one, so overlapping refreshes of the same patient (two requests, or
+    a request and the daily rollover) never collide on the primary key.
+    """
+    today = today or date.today()
+    patient_ids = None if patient_ids is None else [pid for pid in patient_ids if pid is not None]
+
+    stale = delete(PatientCurrentCert)
+    covering = [
+        CertificationPeriod.patient_id.is_not(None),
+        CertificationPeriod.start_date <= today,
+        CertificationPeriod.end_date >= today
+    ]
+    if patient_ids is not None:
+        if not patient_ids:
+            return
+        stale = stale.where(PatientCurrentCert.patient_id.in_(patient_ids))
+        covering.append(CertificationPeriod.patient_id.in_(patient_ids))
+
+    # Same choice as the old per-request query: latest start_date covering today
+    ranked = (
+        select(
+            CertificationPeriod.patient_id,
+            CertificationPeriod.id,
+            CertificationPeriod.start_date,
+            CertificationPeriod.end_date,
+            func.row_number().over(
+                partition_by=CertificationPeriod.patient_id,
+                order_by=CertificationPeriod.start_date.desc()
+            ).label("rn")
+        )
+        .where(*covering)
+        .subquery()
+    )
+
+    upsert = _upsert(db).from_select(
+        ["patient_id", "certification_period_id", "start_date", "end_date", "as_of"],
+        select(ranked.c.patient_id, ranked.c.id, ranked.c.start_date, ranked.c.end_date, literal(today))
+        .where(ranked.c.rn == 1)
+    )
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[PatientCurrentCert.patient_id],
+            set_={
+                "certification_period_id": upsert.excluded.certification_period_id,
+                "start_date": upsert.excluded.start_date,
+                "end_date": upsert.excluded.end_date,
+                "as_of": upsert.excluded.as_of
+            }
+        )
+    )
+    db.execute(
+        stale.where(PatientCurrentCert.patient_id.not_in(select(ranked.c.patient_id)))
+        .execution_options(synchronize_session=False)
+    )
+
+def run_daily_rollover(today: Optional[date] = None) -> Dict:
+    """Recompute is_active and rebuild patient_current_cert in one transaction"""
+    today = today or date.today()
+    db = SessionLocal()
+    try:
+        if db.bind.dialect.name == "postgresql":
+            acquired = db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ROLLOVER_LOCK_ID}).scalar()
+            if not acquired:
+                db.rollback()
+                return {"skipped": "rollover already running in another worker"}
+
+        changed = roll_over_active_flags(db, today)
+        refresh_current_certs(db, today)
+        current = db.query(func.count(PatientCurrentCert.patient_id)).scalar()
+        db.commit()
+        return {"as_of": today.isoformat(), "is_active_changed": changed, "current_certs": current}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+#====================== SCHEDULER ======================#
+
+def seconds_until_next_run(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now()
+    next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(seconds=ROLLOVER_DELAY_SECONDS)
+    return (next_run - now).total_seconds()
+
+async def _rollover_loop():
+    while True:
+        try:
+            result = await asyncio.to_thread(run_daily_rollover)
+            print(f"📅 [ROLLOVER] Cert periods rolled over: {result}")
+            delay = seconds_until_next_run()
+        except Exception as e:
+            print(f"⚠️ [ROLLOVER] Cert period rollover failed, retrying in {ROLLOVER_RETRY_SECONDS}s: {e}")
+            delay = ROLLOVER_RETRY_SECONDS
+        await asyncio.sleep(delay)
+
+def start_rollover_scheduler() -> None:
+    """Run the rollover now and after every local midnight (call from app startup)"""
+    global _rollover_task
+    if _rollover_task is None or _rollover_task.done():
+        _rollover_task = asyncio.get_running_loop().create_task(_rollover_loop())
+
+if __name__ == "__main__":
+    print(run_daily_rollover())
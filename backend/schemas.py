@@ -133,6 +133,8 @@ class DocumentResponse(BaseModel):
     staff_id: Optional[int] = None
     file_name: str
     file_path: str
+    content_hash: Optional[str] = None
+    size_bytes: Optional[int] = None
     uploaded_at: datetime
 
     class Config:
@@ -182,6 +184,21 @@ class VisitCreate(BaseModel):
     status: Optional[str] = "Scheduled"
     scheduled_time: Optional[str] = None
 
+class VisitScheduleSpec(BaseModel):
+    patient_id: int
+    staff_id: int
+    visit_type: str
+    start_date: date
+    weeks: Optional[int] = None
+    weekdays: Optional[List[int]] = None  # 0 = Monday ... 6 = Sunday
+    frequency: Optional[str] = None  # e.g. "2w4, 1w4"; weekdays then only picks the days
+    status: Optional[str] = "Scheduled"
+    scheduled_time: Optional[str] = None
+
+class VisitBulkCreate(BaseModel):
+    visits: Optional[List[VisitCreate]] = None
+    schedule: Optional[VisitScheduleSpec] = None
+
 class VisitUpdate(BaseModel):
     patient_id: Optional[int] = None
     staff_id: Optional[int] = None
@@ -279,6 +296,10 @@ class VisitNoteUpdate(BaseModel):
     status: Optional[str] = None
     sections_data: Optional[dict] = None
 
+class VisitNotePatch(BaseModel):
+    # Section name -> fields to merge into that section
+    sections: Dict[str, dict]
+
 class VisitNoteResponse(BaseModel):
     id: int
     visit_id: int
@@ -0,0 +1,30 @@
+from .backends import (
+    ObjectInfo,
+    StorageBackend,
+    LocalStorageBackend,
+    S3StorageBackend,
+    create_storage_backend,
+    object_storage
+)
+from .blobs import (
+    DOCUMENTS_PREFIX,
+    BLOB_PREFIX,
+    blob_key,
+    staging_path,
+    place_blob,
+    remove_file,
+    lock_blob,
+    lock_blob_async,
+    reference_count,
+    release_document_file,
+    delete_unreferenced_blob
+)
+
+__all__ = [
+    "ObjectInfo", "StorageBackend", "LocalStorageBackend", "S3StorageBackend",
+    "create_storage_backend", "object_storage",
+    "DOCUMENTS_PREFIX", "BLOB_PREFIX",
+    "blob_key", "staging_path", "place_blob", "remove_file",
+    "lock_blob", "lock_blob_async", "reference_count", "release_document_file",
+    "delete_unreferenced_blob"
+]
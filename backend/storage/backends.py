@@ -0,0 +1,250 @@
+"""
+Object storage for documents and signatures.
+
+Files are addressed by keys relative to the storage root ("docs/blobs/ab/cd/...",
+"signatures/12/signature_40_...") and stored in Document.file_path and
+Signature.file_path. The local driver maps keys under a directory (a shared
+volume); the S3 driver stores them in a bucket, so replicas need no shared disk.
+Any S3-compatible service works, e.g. MinIO through S3_ENDPOINT_URL.
+
+Select the backend with STORAGE_BACKEND=local|s3 (default local).
+
+The methods are blocking (boto3 is); async routes call them through a thread.
+"""
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple, Optional
+
+LOCAL_STORAGE_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "/app/storage")
+
+# Bytes per chunk when streaming an object out
+READ_CHUNK_SIZE = 256 * 1024
+
+class ObjectInfo(NamedTuple):
+    size: int
+    modified: datetime
+
+#====================== INTERFACE ======================#
+
+class StorageBackend:
+    """Key/object storage; missing keys raise FileNotFoundError"""
+
+    name = "abstract"
+
+    def put_file(self, local_path: str, key: str) -> None:
+        """Store a local file under key, streaming it; the local file is consumed"""
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def open_read(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        """Stream length bytes (default: to the end) from offset start"""
+        raise NotImplementedError
+
+    def get_bytes(self, key: str) -> bytes:
+        return b"".join(self.open_read(key))
+
+    def stat(self, key: str) -> ObjectInfo:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def copy(self, source_key: str, key: str) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove key; deleting a missing key is not an error"""
+        raise NotImplementedError
+
+#====================== LOCAL FILESYSTEM ======================#
+
+class LocalStorageBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_ROOT):
+        self.root = os.path.abspath(root)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage root: {key!r}")
+        return path
+
+    def _temp_path(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.part")
+
+    def put_file(self, local_path: str, key: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(local_path, path)
+        except OSError:
+            # Staged on another filesystem: copy next to the target, then rename into place
+            temp_path = self._temp_path(path)
+            shutil.copyfile(local_path, temp_path)
+            os.replace(temp_path, path)
+            os.remove(local_path)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        path = self.path(key)
+        temp_path = self._temp_path(path)
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def open_read(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        f = open(self.path(key), "rb")
+
+        def chunks():
+            remaining = length
+            with f:
+                f.seek(start)
+                while remaining is None or remaining > 0:
+                    chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+        # Opened eagerly so a missing key raises here rather than mid-response
+        return chunks()
+
+    def stat(self, key: str) -> ObjectInfo:
+        result = os.stat(self.path(key))
+        return ObjectInfo(result.st_size, datetime.fromtimestamp(result.st_mtime, timezone.utc))
+
+    def copy(self, source_key: str, key: str) -> None:
+        source, path = self.path(source_key), self.path(key)
+        temp_path = self._temp_path(path)
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+#====================== S3 ======================#
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3 or S3-compatible bucket. Configured from S3_BUCKET, S3_PREFIX,
+    S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID and S3_SECRET_ACCESS_KEY (or the
+    usual AWS credential chain). A custom endpoint uses path-style addressing.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        prefix: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 (pip install boto3)") from e
+
+        self.bucket = bucket or os.getenv("S3_BUCKET")
+        if not self.bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        self.prefix = (prefix if prefix is not None else os.getenv("S3_PREFIX", "")).strip("/")
+        endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL") or None
+
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region or os.getenv("S3_REGION") or None,
+            aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID") or None,
+            aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY") or None,
+            config=Config(
+                s3={"addressing_style": "path" if endpoint_url else "auto"},
+                retries={"max_attempts": 5, "mode": "standard"}
+            )
+        )
+
+    def object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _not_found(self, error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def put_file(self, local_path: str, key: str) -> None:
+        # upload_file streams from disk and switches to multipart for large files
+        self.client.upload_file(local_path, self.bucket, self.object_key(key))
+        os.remove(local_path)
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self.object_key(key), Body=data, **extra)
+
+    def open_read(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        if length == 0:
+            return iter(())
+        extra = {}
+        if start or length is not None:
+            end = "" if length is None else start + length - 1
+            extra["Range"] = f"bytes={start}-{end}"
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self.object_key(key), **extra)["Body"]
+        except self._client_error as e:
+            if self._not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+        def chunks():
+            try:
+                yield from body.iter_chunks(READ_CHUNK_SIZE)
+            finally:
+                body.close()
+
+        return chunks()
+
+    def stat(self, key: str) -> ObjectInfo:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except self._client_error as e:
+            if self._not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        return ObjectInfo(head["ContentLength"], head["LastModified"])
+
+    def copy(self, source_key: str, key: str) -> None:
+        # Server-side, multipart for large objects
+        self.client.copy({"Bucket": self.bucket, "Key": self.object_key(source_key)}, self.bucket, self.object_key(key))
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+#====================== FACTORY ======================#
+
+def create_storage_backend(backend: Optional[str] = None) -> StorageBackend:
+    backend = (backend or os.getenv("STORAGE_BACKEND", "local")).lower()
+    if backend == "s3":
+        storage = S3StorageBackend()
+        print(f"🗄️ [STORAGE] Using S3 bucket '{storage.bucket}'")
+        return storage
+    if backend != "local":
+        print(f"⚠️ [STORAGE] Unknown STORAGE_BACKEND '{backend}', using local storage")
+    return LocalStorageBackend()
+
+object_storage = create_storage_backend()
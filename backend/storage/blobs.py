@@ -0,0 +1,107 @@
+"""
+Content-addressed document blobs.
+
+Every uploaded file is stored once under docs/blobs/<aa>/<bb>/<sha256>, whatever
+entity it is attached to. Documents with the same contents share the blob and
+their file_path; the rows pointing at a key are its reference count, so a blob
+is deleted only when the last Document referencing it is deleted.
+
+Uploads and deletes of the same blob are serialized with a transaction-level
+advisory lock on its key, so a delete can't remove a blob that a concurrent
+upload has just decided to reuse.
+"""
+import os
+import re
+import uuid
+from typing import Optional, Tuple
+from sqlalchemy import select, func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Document
+from .backends import LOCAL_STORAGE_ROOT, object_storage
+
+DOCUMENTS_PREFIX = "docs"
+BLOB_PREFIX = f"{DOCUMENTS_PREFIX}/blobs"
+
+# Uploads are spooled here before they are stored; the default sits on the
+# local storage volume so placing a blob there is a rename
+STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", os.path.join(LOCAL_STORAGE_ROOT, ".staging"))
+
+# First key of the two-key pg_advisory_xact_lock taken per blob key
+BLOB_LOCK_NAMESPACE = 72_019_312
+
+_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+def blob_key(content_hash: str) -> str:
+    if not _SHA256_HEX.match(content_hash or ""):
+        raise ValueError(f"Not a SHA-256 hex digest: {content_hash!r}")
+    return f"{BLOB_PREFIX}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+def staging_path() -> str:
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    return os.path.join(STAGING_DIR, f"{uuid.uuid4().hex}.part")
+
+def place_blob(staged_path: str, content_hash: str) -> Tuple[str, bool]:
+    """
+    Store a fully written staged file as its blob, or drop it if that blob
+    already exists. Returns (blob key, whether a new blob was created).
+    Call with the blob's lock held.
+    """
+    key = blob_key(content_hash)
+    if object_storage.exists(key):
+        os.remove(staged_path)
+        return key, False
+    object_storage.put_file(staged_path, key)
+    return key, True
+
+def remove_file(path: str) -> None:
+    if path and os.path.isfile(path):
+        os.remove(path)
+
+#====================== REFERENCES ======================#
+
+_LOCK_SQL = text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:path))")
+
+def lock_blob(db: Session, key: str) -> None:
+    """Hold the blob's lock until the current transaction ends (no-op off PostgreSQL)"""
+    if db.bind.dialect.name == "postgresql":
+        db.execute(_LOCK_SQL, {"namespace": BLOB_LOCK_NAMESPACE, "path": key})
+
+async def lock_blob_async(db: AsyncSession, key: str) -> None:
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(_LOCK_SQL, {"namespace": BLOB_LOCK_NAMESPACE, "path": key})
+
+def reference_count(db: Session, key: str) -> int:
+    return db.execute(select(func.count(Document.id)).where(Document.file_path == key)).scalar_one()
+
+def release_document_file(db: Session, doc: Document) -> Optional[str]:
+    """
+    Delete doc inside the caller's transaction. Returns its file's key when no
+    other Document references it any more; pass that to delete_unreferenced_blob
+    once the transaction has committed, so a rollback never loses the file.
+    """
+    key = doc.file_path
+    if key:
+        lock_blob(db, key)
+    db.delete(doc)
+    db.flush()
+
+    if not key or reference_count(db, key) > 0:
+        return None
+    return key
+
+def delete_unreferenced_blob(db: Session, key: str) -> bool:
+    """
+    Remove key's object if still no Document references it, in a transaction
+    of its own: the count is re-checked under the blob's lock because an upload
+    may have reused the blob after the deleting transaction committed.
+    """
+    try:
+        lock_blob(db, key)
+        if reference_count(db, key) > 0:
+            return False
+        object_storage.delete(key)
+        return True
+    finally:
+        # Ends the transaction and releases the lock
+        db.commit()
@@ -0,0 +1,97 @@
+"""
+One-off move of documents stored before content addressing into the blob store.
+
+Each distinct object under docs/{patients,staff}/{id} is hashed and copied to
+its blob key (a hard link on local storage, a server-side copy on S3); every
+Document row pointing at it gets the blob key, content_hash and size_bytes, and
+the original is deleted once the rows are committed. Identical files collapse
+into one blob. Safe to re-run: rows already pointing at a blob are skipped.
+
+    python -m storage.dedupe            # migrate and delete the originals
+    python -m storage.dedupe --dry-run  # report what would be reclaimed
+"""
+import argparse
+import hashlib
+from typing import Dict, Tuple
+from sqlalchemy import select, update
+from database.connection import SessionLocal
+from database.models import Document
+from .backends import object_storage
+from .blobs import BLOB_PREFIX, blob_key, lock_blob
+
+def object_digest(key: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in object_storage.open_read(key):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def dedupe_documents(dry_run: bool = False) -> Dict:
+    db = SessionLocal()
+    stats = {"files": 0, "documents": 0, "blobs_created": 0, "bytes_reclaimed": 0, "missing": []}
+    seen_hashes = set()
+    try:
+        keys = db.execute(
+            select(Document.file_path).where(Document.file_path.is_not(None)).distinct()
+        ).scalars().all()
+
+        for key in keys:
+            if key.startswith(BLOB_PREFIX + "/"):
+                continue
+            try:
+                content_hash, size = object_digest(key)
+            except FileNotFoundError:
+                stats["missing"].append(key)
+                continue
+
+            stats["files"] += 1
+            target = blob_key(content_hash)
+            if dry_run:
+                if content_hash in seen_hashes or object_storage.exists(target):
+                    stats["bytes_reclaimed"] += size
+                else:
+                    stats["blobs_created"] += 1
+                seen_hashes.add(content_hash)
+                continue
+
+            lock_blob(db, target)
+            created = not object_storage.exists(target)
+            if created:
+                object_storage.copy(key, target)
+            stats["documents"] += db.execute(
+                update(Document)
+                .where(Document.file_path == key)
+                .values(file_path=target, content_hash=content_hash, size_bytes=size)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+
+            object_storage.delete(key)
+            if created:
+                stats["blobs_created"] += 1
+            else:
+                stats["bytes_reclaimed"] += size
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m storage.dedupe")
+    parser.add_argument("--dry-run", action="store_true", help="hash and report without moving anything")
+    args = parser.parse_args(argv)
+
+    stats = dedupe_documents(dry_run=args.dry_run)
+    prefix = "[DRY RUN] " if args.dry_run else ""
+    print(
+        f"📦 [DEDUPE] {prefix}{stats['files']} files, {stats['documents']} documents relinked, "
+        f"{stats['blobs_created']} blobs created, {stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed"
+    )
+    for key in stats["missing"]:
+        print(f"⚠️ [DEDUPE] Missing file left untouched: {key}")
+
+if __name__ == "__main__":
+    main()
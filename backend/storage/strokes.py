@@ -0,0 +1,236 @@
+"""
+Compact binary encoding of signature strokes.
+
+Signature.stroke_data holds the pen strokes the client sends as
+[[{"x", "y", "timestamp"}, ...], ...]; JSON and SVG are rebuilt from it on
+demand. Layout, all little-endian:
+
+    header   "<4sBBHHHIIq": magic b"STK1", version, flags, scale, width,
+             height, stroke count, point count, first timestamp (epoch ms)
+    lengths  int32[strokes]      points per stroke
+    dx, dy   int16[points] each  (int32 with FLAG_WIDE) coordinate deltas
+    dt       int32[points]       timestamp deltas in ms, only with FLAG_TIMESTAMPS
+
+Coordinates are quantized to 1/scale px. Deltas run over the flattened point
+sequence starting from (0, 0) and t0, so a running sum restores them:
+
+    x = np.cumsum(np.frombuffer(data, "<i2", points, offset)) / scale
+"""
+import math
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STROKE_MAGIC = b"STK1"
+STROKE_VERSION = 1
+_HEADER = struct.Struct("<4sBBHHHIIq")
+
+FLAG_TIMESTAMPS = 0x01
+FLAG_WIDE = 0x02
+
+# Coordinate units per pixel (0.1 px precision)
+COORDINATE_SCALE = 10
+
+DEFAULT_DIMENSIONS = {"width": 400, "height": 200}
+
+# Ramer-Douglas-Peucker tolerance (px) for SVGs rendered on request; off (0, every point kept) unless set
+SVG_SIMPLIFY_TOLERANCE = float(os.getenv("SIGNATURE_SVG_TOLERANCE", "0"))
+
+_INT16 = (-32768, 32767)
+_INT32 = (-2**31, 2**31 - 1)
+_INT64 = (-2**63, 2**63 - 1)
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _deltas(values: Sequence[int], start: int = 0) -> List[int]:
+    previous, out = start, []
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
+
+def _in_range(values: Sequence[int], bounds: Tuple[int, int]) -> bool:
+    return all(bounds[0] <= value <= bounds[1] for value in values)
+
+def _quantize(value, scale: int) -> int:
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"non-finite coordinate {value}")
+    return round(value * scale)
+
+def _number(value: int, scale: int):
+    """Quantized coordinate back to an int when it is whole, else a float"""
+    return value // scale if value % scale == 0 else value / scale
+
+#====================== ENCODE / DECODE ======================#
+
+def encode_strokes(strokes: list, dimensions: Optional[Dict] = None, scale: int = COORDINATE_SCALE) -> bytes:
+    """
+    Pack strokes into the binary layout above. Raises ValueError on malformed
+    points, on a mix of timestamped and untimestamped points, and on values
+    the layout can't hold (non-finite coordinates, coordinate or timestamp
+    deltas beyond int32).
+    """
+    dimensions = {**DEFAULT_DIMENSIONS, **(dimensions or {})}
+    try:
+        width, height = int(dimensions["width"]), int(dimensions["height"])
+        strokes = [stroke for stroke in strokes or [] if stroke]
+        points = [point for stroke in strokes for point in stroke]
+        xs = [_quantize(point["x"], scale) for point in points]
+        ys = [_quantize(point["y"], scale) for point in points]
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Malformed signature strokes: {e}") from e
+    if not (0 <= width <= 0xFFFF and 0 <= height <= 0xFFFF):
+        raise ValueError("Signature dimensions out of range")
+
+    timestamps = [point.get("timestamp") for point in points]
+    timed = [isinstance(ts, (int, float)) and not isinstance(ts, bool) for ts in timestamps]
+    # Timestamps are stored for every point or none; dropping them from the whole signature would lose data silently
+    if any(timed) and not all(timed):
+        raise ValueError("Malformed signature timestamps: either every point or no point carries a numeric timestamp")
+    flags = 0
+    t0, dt = 0, []
+    if points and all(timed):
+        flags |= FLAG_TIMESTAMPS
+        try:
+            timestamps = [int(ts) for ts in timestamps]
+        except (ValueError, OverflowError) as e:
+            raise ValueError(f"Malformed signature timestamps: {e}") from e
+        t0 = timestamps[0]
+        dt = _deltas(timestamps, t0)
+        if not (_INT64[0] <= t0 <= _INT64[1] and _in_range(dt, _INT32)):
+            raise ValueError("Signature timestamps out of range")
+
+    dx, dy = _deltas(xs), _deltas(ys)
+    if not _in_range(dx, _INT16) or not _in_range(dy, _INT16):
+        flags |= FLAG_WIDE
+        if not _in_range(dx, _INT32) or not _in_range(dy, _INT32):
+            raise ValueError("Signature coordinates out of range")
+    coordinate_type = "i" if flags & FLAG_WIDE else "h"
+
+    parts = [
+        _HEADER.pack(STROKE_MAGIC, STROKE_VERSION, flags, scale, width, height, len(strokes), len(points), t0),
+        _little_endian(array("i", [len(stroke) for stroke in strokes])),
+        _little_endian(array(coordinate_type, dx)),
+        _little_endian(array(coordinate_type, dy))
+    ]
+    if flags & FLAG_TIMESTAMPS:
+        parts.append(_little_endian(array("i", dt)))
+    return b"".join(parts)
+
+def decode_header(data: bytes) -> Dict:
+    magic, version, flags, scale, width, height, stroke_count, point_count, t0 = _HEADER.unpack_from(data)
+    if magic != STROKE_MAGIC or version != STROKE_VERSION:
+        raise ValueError("Not an encoded stroke buffer")
+    return {
+        "flags": flags, "scale": scale, "width": width, "height": height,
+        "strokes": stroke_count, "points": point_count, "t0": t0
+    }
+
+def decode_points(data: bytes) -> Tuple[Dict, List[int], List[int], List[int], Optional[List[int]]]:
+    """(header, stroke lengths, quantized xs, quantized ys, timestamps or None)"""
+    header = decode_header(data)
+    coordinate_type = "i" if header["flags"] & FLAG_WIDE else "h"
+    coordinate_size = array(coordinate_type).itemsize
+    n = header["points"]
+
+    offset = _HEADER.size
+    lengths_size = header["strokes"] * 4
+    lengths = _from_little_endian("i", data[offset:offset + lengths_size]).tolist()
+    offset += lengths_size
+    xs = list(accumulate(_from_little_endian(coordinate_type, data[offset:offset + n * coordinate_size])))
+    offset += n * coordinate_size
+    ys = list(accumulate(_from_little_endian(coordinate_type, data[offset:offset + n * coordinate_size])))
+    offset += n * coordinate_size
+
+    timestamps = None
+    if header["flags"] & FLAG_TIMESTAMPS:
+        timestamps = list(accumulate(_from_little_endian("i", data[offset:offset + n * 4]), initial=header["t0"]))[1:]
+    return header, lengths, xs, ys, timestamps
+
+def decode_strokes(data: bytes) -> Tuple[list, Dict]:
+    """Strokes in the client's JSON shape, and the stored dimensions"""
+    header, lengths, xs, ys, timestamps = decode_points(data)
+    scale = header["scale"]
+    strokes, start = [], 0
+    for length in lengths:
+        stroke = []
+        for i in range(start, start + length):
+            point = {"x": _number(xs[i], scale), "y": _number(ys[i], scale)}
+            if timestamps is not None:
+                point["timestamp"] = timestamps[i]
+            stroke.append(point)
+        strokes.append(stroke)
+        start += length
+    return strokes, {"width": header["width"], "height": header["height"]}
+
+#====================== SVG ======================#
+
+def simplify_indices(xs: Sequence[int], ys: Sequence[int], tolerance: float) -> List[int]:
+    """Ramer-Douglas-Peucker: indices of the points kept within tolerance (same units as xs/ys)"""
+    n = len(xs)
+    if n < 3 or tolerance <= 0:
+        return list(range(n))
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    tolerance_sq = tolerance * tolerance
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        bx, by = xs[last] - ax, ys[last] - ay
+        length_sq = bx * bx + by * by
+
+        farthest, farthest_sq = -1, tolerance_sq
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if length_sq:
+                cross = px * by - py * bx
+                distance_sq = cross * cross / length_sq
+            else:
+                distance_sq = px * px + py * py
+            if distance_sq > farthest_sq:
+                farthest, farthest_sq = i, distance_sq
+
+        if farthest != -1:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [i for i in range(n) if keep[i]]
+
+def strokes_svg(data: bytes, tolerance: float = 0.0) -> str:
+    """SVG for encoded strokes, simplified to within tolerance px; '' when there are no points"""
+    header, lengths, xs, ys, _ = decode_points(data)
+    if not header["points"]:
+        return ""
+    scale = header["scale"]
+
+    segments, start = [], 0
+    for length in lengths:
+        sx, sy = xs[start:start + length], ys[start:start + length]
+        kept = simplify_indices(sx, sy, tolerance * scale)
+        coordinates = [f"{_number(sx[i], scale)},{_number(sy[i], scale)}" for i in kept]
+        segments.append("M" + "L".join(coordinates))
+        start += length
+
+    width, height = header["width"], header["height"]
+    return (
+        f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">\n'
+        f'    <path d="{"".join(segments)}" stroke="#333" stroke-width="2" fill="none" stroke-linecap="round" stroke-linejoin="round"/>\n'
+        f'</svg>'
+    )
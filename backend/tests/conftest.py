@@ -0,0 +1,97 @@
+"""
+Fixtures: a throwaway SQLite database behind the app's async session, and a
+statement counter on it. The models live in the "public" schema, so a second
+SQLite file is attached under that name.
+
+Needs pytest, httpx and aiosqlite on top of requirements.txt:
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+from typing import List
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# database.connection builds its engines from these at import; the tests never connect through them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+pytest.importorskip("aiosqlite")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base, get_async_db, get_db
+import database.models  # noqa: F401  registers the tables on Base.metadata
+
+@pytest.fixture
+def engines(tmp_path):
+    """(sync engine, async engine) on the same fresh SQLite database"""
+    main_path, public_path = tmp_path / "main.sqlite", tmp_path / "public.sqlite"
+
+    def attach_public(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"ATTACH DATABASE '{public_path}' AS public")
+        cursor.close()
+
+    sync_engine = create_engine(f"sqlite:///{main_path}")
+    event.listen(sync_engine, "connect", attach_public)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{main_path}")
+    event.listen(async_engine.sync_engine, "connect", attach_public)
+
+    Base.metadata.create_all(sync_engine)
+    yield sync_engine, async_engine
+    sync_engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+@pytest.fixture
+def db(engines):
+    session = sessionmaker(bind=engines[0], autoflush=False)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def statements(engines) -> List[str]:
+    """SQL statements the app issues through the async engine, in order"""
+    issued: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    event.listen(engines[1].sync_engine, "before_cursor_execute", record)
+    yield issued
+    event.remove(engines[1].sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def sync_session_factory(engines):
+    """Sessions handed to sync routes (get_db)"""
+    return sessionmaker(bind=engines[0], autocommit=False, autoflush=False)
+
+@pytest.fixture
+def client(engines, sync_session_factory):
+    from main import app
+    from routes.template_cache import template_cache
+
+    async_session_factory = async_sessionmaker(engines[1], class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def test_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    def test_db():
+        session = sync_session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_async_db] = test_async_db
+    app.dependency_overrides[get_db] = test_db
+    # Template ids restart with every database
+    template_cache.invalidate()
+    # Not entered as a context manager: startup (sweeper, rollover scheduler) stays off
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -0,0 +1,20 @@
+"""/metrics/db-pool is gated like the other metrics endpoints"""
+import pytest
+from auth.auth_middleware import get_current_user
+from database.models import Staff
+
+@pytest.fixture
+def as_role(client):
+    from main import app
+
+    def login(role):
+        app.dependency_overrides[get_current_user] = lambda: Staff(username=role, role=role)
+    return login
+
+def test_db_pool_metrics_need_a_token(client):
+    assert client.get("/metrics/db-pool").status_code == 401
+
+@pytest.mark.parametrize("role, status", [("PT", 403), ("agency", 403), ("admin", 200), ("Developer", 200)])
+def test_db_pool_metrics_need_a_metrics_role(client, as_role, role, status):
+    as_role(role)
+    assert client.get("/metrics/db-pool").status_code == status
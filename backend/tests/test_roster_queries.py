@@ -0,0 +1,58 @@
+"""GET /patients/ loads the roster in a constant number of statements, however many patients there are"""
+from datetime import date, timedelta
+from database.models import CertificationPeriod, Patient, Staff
+from scheduling.rollover import refresh_current_certs
+
+def seed_patients(db, count: int, agency_name: str = "Agency") -> None:
+    today = date.today()
+    agency = Staff(name=agency_name, email=f"{agency_name}@example.com", username=agency_name, password="x", role="agency")
+    db.add(agency)
+    db.flush()
+    for i in range(count):
+        patient = Patient(
+            full_name=f"{agency_name} patient {i}", birthday=date(1950, 1, 1), gender="F", address="1 Main St",
+            agency_id=agency.id, contact_info={"primary#": "5550000000"}
+        )
+        db.add(patient)
+        db.flush()
+        # An expired period and the current one, so the roster has to pick
+        db.add(CertificationPeriod(patient_id=patient.id, start_date=today - timedelta(days=70), end_date=today - timedelta(days=11)))
+        db.add(CertificationPeriod(patient_id=patient.id, start_date=today - timedelta(days=10), end_date=today + timedelta(days=49)))
+    db.commit()
+    refresh_current_certs(db)
+    db.commit()
+
+def roster_statement_count(client, statements, **params) -> int:
+    statements.clear()
+    response = client.get("/patients/", params=params)
+    assert response.status_code == 200
+    return len(statements)
+
+def test_roster_statement_count_does_not_grow_with_patients(client, db, statements):
+    seed_patients(db, 3, "small")
+    small = roster_statement_count(client, statements)
+
+    seed_patients(db, 40, "large")
+    large = roster_statement_count(client, statements)
+
+    # One count for X-Total-Count and one roster select
+    assert small == large == 2
+
+def test_roster_rows_carry_agency_and_current_cert(client, db, statements):
+    seed_patients(db, 5, "agency")
+    today = date.today()
+
+    assert roster_statement_count(client, statements, include_total=False) == 1
+    patients = client.get("/patients/").json()
+    assert len(patients) == 5
+    for patient in patients:
+        assert patient["agency_name"] == "agency"
+        assert patient["primary_phone"] == "(555) 000-0000"
+        assert patient["cert_start_date"] == str(today - timedelta(days=10))
+        assert patient["cert_end_date"] == str(today + timedelta(days=49))
+
+def test_roster_page_is_one_statement_per_page(client, db, statements):
+    seed_patients(db, 25, "paged")
+
+    assert roster_statement_count(client, statements, limit=10, include_total=False) == 1
+    assert roster_statement_count(client, statements, limit=10, after_id=10, include_total=False) == 1
@@ -0,0 +1,125 @@
+"""Security state stays bounded, and swept without stalling the loop, when an attacker sprays many usernames"""
+import asyncio
+import threading
+import time
+import pytest
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+import auth.security_manager as security_module
+from auth.security_manager import BankLevelSecurityManager
+from auth.security_store import InMemorySecurityStateStore, SecurityStateStore, SQLSecurityStateStore
+
+TRACKED = 25
+
+def login_request(ip: str) -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/auth/login", "headers": [],
+        "client": (ip, 40000), "query_string": b""
+    })
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(security_module, "NOTIFICATIONS_ENABLED", False)
+    manager = BankLevelSecurityManager(InMemorySecurityStateStore())
+    manager.config["tracking_limits"].update(tracked_usernames=TRACKED, tracked_ips=TRACKED)
+    return manager
+
+def test_username_spray_keeps_key_count_bounded(manager):
+    for i in range(400):
+        manager.record_failed_attempt(login_request(f"203.0.{i // 250}.{i % 250}"), f"nobody-{i}")
+
+    for namespace in ("failed_attempts", "user_ip_history", "ip_usernames"):
+        assert manager._store.count(namespace) == TRACKED
+
+    # The newest keys survive
+    assert manager._store.contains("failed_attempts", "nobody-399")
+    assert not manager._store.contains("failed_attempts", "nobody-0")
+
+def test_account_under_attack_survives_the_spray(manager):
+    target = "victim"
+    for i in range(200):
+        if i % 10 == 0:
+            manager.record_failed_attempt(login_request("198.51.100.7"), target)
+        manager.record_failed_attempt(login_request(f"203.0.113.{i % 250}"), f"nobody-{i}")
+
+    assert manager._store.contains("failed_attempts", target)
+
+def test_sql_store_evicts_least_recently_written(engines):
+    store = SQLSecurityStateStore()
+    store._session_factory = sessionmaker(bind=engines[0], autoflush=False)
+
+    for i in range(12):
+        store.append("failed_attempts", f"user-{i}", float(i), max_len=5, max_keys=5)
+    store.append("failed_attempts", "user-7", 99.0, max_len=5, max_keys=5)
+    store.append("failed_attempts", "user-12", 12.0, max_len=5, max_keys=5)
+
+    assert store.count("failed_attempts") == 5
+    assert set(store.items("failed_attempts")) == {"user-7", "user-9", "user-10", "user-11", "user-12"}
+
+def test_sweep_yields_to_the_event_loop_between_batches(manager):
+    manager.config["tracking_limits"]["sweep_batch"] = 100
+    stale = 1.0  # epoch seconds, far outside the window
+    for i in range(2000):
+        manager._store.set("failed_attempts", f"nobody-{i}", [stale])
+        manager._store.set("ip_usernames", f"203.0.113.{i}", {f"nobody-{i}": stale})
+    manager._store.set("failed_attempts", "recent", [time.time()])
+
+    async def sweep_while_serving():
+        ticks = 0
+        sweep = asyncio.ensure_future(manager.sweep_async())
+        while not sweep.done():
+            ticks += 1
+            await asyncio.sleep(0)
+        return ticks, sweep.result()
+
+    ticks, removed = asyncio.run(sweep_while_serving())
+
+    # One tick per batch at least: other tasks run while the sweep is in progress
+    assert ticks >= 2 * 2000 // 100
+    assert removed["failed_attempts"] == 2000 and removed["ip_index"] == 2000
+    assert manager._store.keys("failed_attempts") == ["recent"]
+    assert manager._store.count("ip_usernames") == 0
+
+def test_incomplete_store_fails_when_created():
+    class NoMutateStore(SecurityStateStore):
+        def get(self, namespace, key, default=None): return default
+        def set(self, namespace, key, value): pass
+        def delete(self, namespace, key): return False
+        def pop(self, namespace, key, default=None): return default
+        def items(self, namespace): return {}
+
+    with pytest.raises(TypeError, match="_mutate"):
+        NoMutateStore()
+
+def test_gateway_resolves_at_startup_and_off_the_request_path(manager, monkeypatch, capsys):
+    gateways = iter(["10.0.0.1", "10.0.0.1", "10.0.0.2"])
+    readers = []
+
+    def read_default_gateway():
+        readers.append(threading.get_ident())
+        return next(gateways)
+    monkeypatch.setattr(manager, "_read_default_gateway", read_default_gateway)
+
+    def wait_for_refresh(previous: float):
+        deadline = time.monotonic() + 5
+        while manager._gateway_resolved_at == previous and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    async def startup():
+        manager.start_sweeper()
+        manager._cleanup_task.cancel()
+    asyncio.run(startup())
+    wait_for_refresh(0.0)
+    assert manager._get_real_ip(login_request("127.0.0.1")) == "10.0.0.1"
+
+    # Past the TTL the cached value is served while a thread refreshes it
+    for expected in ["10.0.0.1", "10.0.0.1"]:
+        manager._gateway_resolved_at -= manager._gateway_ip_ttl + 1
+        previous = manager._gateway_resolved_at
+        assert manager._get_gateway_ip() == expected
+        wait_for_refresh(previous)
+    assert manager._get_gateway_ip() == "10.0.0.2"
+
+    assert len(readers) == 3 and threading.get_ident() not in readers
+    # Logged on the first resolution and on the change only
+    assert capsys.readouterr().out.count("Gateway del host resuelto") == 2
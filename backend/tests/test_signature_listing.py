@@ -0,0 +1,52 @@
+"""Signature list endpoints return strokes and an SVG, like GET /signatures/{id}, unless told not to"""
+from datetime import date
+import pytest
+from auth.auth_middleware import get_current_user
+from database.models import Patient, Signature, Staff
+from routes.create_endpoints import split_signature_metadata
+
+STROKES = [
+    [{"x": 10, "y": 20, "timestamp": 1700000000000}, {"x": 15.5, "y": 22, "timestamp": 1700000000016}],
+    [{"x": 40, "y": 60, "timestamp": 1700000000300}, {"x": 42, "y": 61, "timestamp": 1700000000316}]
+]
+
+@pytest.fixture
+def patient_id(client, db):
+    from main import app
+    app.dependency_overrides[get_current_user] = lambda: None
+
+    agency = Staff(name="Agency", email="agency@example.com", username="agency", password="x", role="agency")
+    db.add(agency)
+    db.flush()
+    patient = Patient(full_name="Patient", birthday=date(1950, 1, 1), gender="F", address="1 Main St", agency_id=agency.id)
+    db.add(patient)
+    db.flush()
+    metadata, stroke_data = split_signature_metadata({"strokes": STROKES, "dimensions": {"width": 400, "height": 200}})
+    db.add(Signature(
+        patient_id=patient.id, entity_type="patient", entity_name="Patient", entity_id=patient.id,
+        signable_type="visit_note", signable_id=1, signature_metadata=metadata, stroke_data=stroke_data,
+        file_path="signatures/1/signature.json"
+    ))
+    db.commit()
+    return patient.id
+
+@pytest.mark.parametrize("path", ["/patients/{patient_id}/signatures", "/signatures/search?patient_id={patient_id}"])
+def test_list_items_match_the_single_signature_response(client, patient_id, path):
+    listed = client.get(path.format(patient_id=patient_id))
+    assert listed.status_code == 200
+    [item] = listed.json()
+
+    single = client.get(f"/signatures/{item['id']}").json()
+    assert item == single
+    assert item["signature_metadata"]["strokes"] == STROKES
+    assert item["svg_preview"].startswith("<svg")
+
+@pytest.mark.parametrize("path", ["/patients/{patient_id}/signatures", "/signatures/search?patient_id={patient_id}"])
+def test_include_strokes_false_skips_strokes_and_svg(client, patient_id, path):
+    separator = "&" if "?" in path else "?"
+    listed = client.get(path.format(patient_id=patient_id) + f"{separator}include_strokes=false")
+    assert listed.status_code == 200
+    [item] = listed.json()
+
+    assert "strokes" not in item["signature_metadata"]
+    assert item["svg_preview"] is None
@@ -0,0 +1,21 @@
+"""Stroke encoding: timestamps are stored for every point or rejected, never dropped"""
+import pytest
+from fastapi import HTTPException
+from routes.create_endpoints import split_signature_metadata
+from storage.strokes import decode_strokes, encode_strokes
+
+TIMED = [[{"x": 1, "y": 2, "timestamp": 1000}, {"x": 3, "y": 4, "timestamp": 1016}], [{"x": 5, "y": 6, "timestamp": 1300}]]
+UNTIMED = [[{"x": 1, "y": 2}, {"x": 3, "y": 4}], [{"x": 5, "y": 6}]]
+
+@pytest.mark.parametrize("strokes", [TIMED, UNTIMED])
+def test_round_trip(strokes):
+    decoded, _ = decode_strokes(encode_strokes(strokes))
+    assert decoded == strokes
+
+def test_mixed_timestamps_are_rejected():
+    mixed = [TIMED[0], UNTIMED[1]]
+    with pytest.raises(ValueError, match="timestamp"):
+        encode_strokes(mixed)
+    with pytest.raises(HTTPException) as raised:
+        split_signature_metadata({"strokes": mixed})
+    assert raised.value.status_code == 400
@@ -0,0 +1,70 @@
+"""PATCH /visit-notes/{id}: overlapping autosave deltas merge, and the note row is locked while merging"""
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from database.models import (
+    CertificationPeriod, NoteSection, NoteTemplate, NoteTemplateSection, Patient, Staff, Visit, VisitNote
+)
+
+SECTIONS = ["Vitals", "Pain", "Plan"]
+
+@pytest.fixture
+def note_id(db):
+    today = date.today()
+    agency = Staff(name="Agency", email="agency@example.com", username="agency", password="x", role="agency")
+    therapist = Staff(name="Therapist", email="pt@example.com", username="pt", password="x", role="PT")
+    db.add_all([agency, therapist])
+    db.flush()
+    patient = Patient(full_name="Patient", birthday=date(1950, 1, 1), gender="F", address="1 Main St", agency_id=agency.id)
+    db.add(patient)
+    db.flush()
+    cert = CertificationPeriod(patient_id=patient.id, start_date=today - timedelta(days=5), end_date=today + timedelta(days=55))
+    db.add(cert)
+    db.flush()
+    visit = Visit(
+        patient_id=patient.id, staff_id=therapist.id, certification_period_id=cert.id,
+        visit_date=today, visit_type="Initial Evaluation", therapy_type="PT"
+    )
+    template = NoteTemplate(discipline="PT", note_type="Initial Evaluation")
+    sections = [NoteSection(section_name=name) for name in SECTIONS]
+    db.add_all([visit, template, *sections])
+    db.flush()
+    db.add_all([NoteTemplateSection(template_id=template.id, section_id=section.id, position=i) for i, section in enumerate(sections)])
+    note = VisitNote(visit_id=visit.id, sections_data={}, therapist_name="Therapist")
+    db.add(note)
+    db.commit()
+    return note.id
+
+def patch(client, note_id, sections):
+    response = client.patch(f"/visit-notes/{note_id}", json={"sections": sections})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_overlapping_deltas_both_survive(client, db, note_id):
+    patch(client, note_id, {"Vitals": {"bp": "120/80"}, "Pain": {"level": 3}})
+    note = patch(client, note_id, {"Vitals": {"pulse": 72}})
+
+    assert note["sections_data"]["Vitals"] == {"bp": "120/80", "pulse": 72}
+    assert note["sections_data"]["Pain"] == {"level": 3}
+    assert note["status"] == "Pending"
+    assert db.get(VisitNote, note_id).section_bitmap == 0b011
+
+    note = patch(client, note_id, {"Pain": {"level": 0}, "Plan": {"goals": "walk"}})
+    assert db.get(VisitNote, note_id).section_bitmap == 0b101
+    assert note["status"] == "Pending"
+
+def test_note_is_loaded_for_update(client, sync_session_factory, note_id):
+    statements = []
+
+    def record(orm_execute_state):
+        statements.append(str(orm_execute_state.statement.compile(dialect=postgresql.dialect())))
+
+    event.listen(sync_session_factory, "do_orm_execute", record)
+    try:
+        patch(client, note_id, {"Plan": {"goals": "walk"}})
+    finally:
+        event.remove(sync_session_factory, "do_orm_execute", record)
+
+    note_loads = [sql for sql in statements if "FROM public.visit_notes" in sql]
+    assert note_loads and note_loads[0].rstrip().endswith("FOR UPDATE")